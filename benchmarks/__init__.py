@@ -0,0 +1,3 @@
+"""
+Benchmarks for the latex2docx pipeline on synthetic documents.
+"""
@@ -0,0 +1,139 @@
+"""
+Time each TexConverter stage on a synthetic document.
+
+The pure-Python stages (preprocessing, TikZ extraction and replacement) run
+without any TeX installation. Figure compilation and pandoc are timed only
+with ``--all-stages`` and when their tools are installed.
+
+Usage:
+    python -m benchmarks.bench_pipeline --figures 200 --size-mb 5 --repeat 3
+"""
+
+import argparse
+import json
+import logging
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from benchmarks.synthetic import DocumentSpec, add_spec_arguments, spec_from_args, write_project
+from latex2docx.converter import STAGES, TexConverter
+
+# Stages that need external tools -> tools they call
+TOOL_STAGES = {
+    'compile_tikz': ('pdflatex',),
+    'convert_to_docx': ('pandoc',),
+}
+
+
+def runnable_stages(all_stages: bool = False) -> List[str]:
+    """Stages to time: pure-Python ones, plus tool stages whose tools exist."""
+    stages = []
+    for stage in STAGES:
+        tools = TOOL_STAGES.get(stage)
+        if tools and not (all_stages and all(shutil.which(tool) for tool in tools)):
+            continue
+        stages.append(stage)
+    return stages
+
+
+def time_stages(main_tex: Path, stages: List[str], jobs: Optional[int] = None) -> Dict[str, float]:
+    """
+    Run ``stages`` once in order on a fresh converter.
+    
+    Returns:
+        Wall time in seconds per stage
+    """
+    converter = TexConverter(
+        main_tex,
+        main_tex.with_suffix('.docx'),
+        jobs=jobs,
+        use_cache=False,
+        force=True,
+        keep_intermediates=False,
+        # Only problems are logged; the report is the output
+        log_level=logging.WARNING,
+    )
+    timings = {}
+    for stage in stages:
+        start = time.perf_counter()
+        getattr(converter, stage)()
+        timings[stage] = time.perf_counter() - start
+    return timings
+
+
+def run_benchmark(
+    spec: DocumentSpec,
+    repeat: int = 3,
+    all_stages: bool = False,
+    jobs: Optional[int] = None,
+    work_dir: Optional[Path] = None,
+) -> Dict[str, object]:
+    """
+    Generate a document and time its stages ``repeat`` times.
+    
+    Returns:
+        Report with the document spec, its size and min/median/max per stage
+    """
+    stages = runnable_stages(all_stages)
+    with tempfile.TemporaryDirectory(prefix='latex2docx-bench-', dir=work_dir) as scratch:
+        main_tex = write_project(Path(scratch), spec)
+        size = main_tex.stat().st_size
+        runs = [time_stages(main_tex, stages, jobs) for _ in range(repeat)]
+    
+    results = {}
+    for stage in stages:
+        samples = [run[stage] for run in runs]
+        results[stage] = {
+            'min': min(samples),
+            'median': statistics.median(samples),
+            'max': max(samples),
+        }
+    return {
+        'spec': vars(spec),
+        'bytes': size,
+        'repeat': repeat,
+        'stages': results,
+        'skipped': [stage for stage in STAGES if stage not in stages],
+    }
+
+
+def print_report(report: Dict[str, object]) -> None:
+    """Print a per-stage timing table."""
+    spec = report['spec']
+    print(f"Document: {report['bytes'] / (1024 * 1024):.2f} MB, "
+          f"{spec['figures']} figures, \\ab depth {spec['ab_depth']}, "
+          f"{spec['plot_points']} points per plot")
+    print(f"{'Stage':<18}  {'min':>9}  {'median':>9}  {'max':>9}")
+    for stage, stats in report['stages'].items():
+        print(f"{stage:<18}  {stats['min']:>8.3f}s  {stats['median']:>8.3f}s  "
+              f"{stats['max']:>8.3f}s")
+    for stage in report['skipped']:
+        print(f"{stage:<18}  skipped (needs --all-stages and its tools)")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the conversion stages')
+    add_spec_arguments(parser)
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per stage')
+    parser.add_argument('--all-stages', action='store_true',
+                        help='Also time figure compilation and pandoc if installed')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Figure workers for --all-stages')
+    parser.add_argument('--json', metavar='FILE', help='Also write the report as JSON')
+    args = parser.parse_args()
+    
+    report = run_benchmark(
+        spec_from_args(args), args.repeat, args.all_stages, args.jobs
+    )
+    print_report(report)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2), encoding='utf-8')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,182 @@
+"""
+Synthetic LaTeX document generator for benchmarks.
+
+Usage:
+    python -m benchmarks.synthetic OUT_DIR --figures 200 --size-mb 5
+"""
+
+import argparse
+import random
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List
+
+PREAMBLE = r"""\documentclass{article}
+\usepackage{amsmath}
+\usepackage{tikz}
+\usepackage{pgfplots}
+\pgfplotsset{compat=1.18}
+\newcommand{\ab}[1]{\left(#1\right)}
+
+\begin{document}
+"""
+
+WORDS = (
+    'signal noise model sample estimate variance kernel boundary flux '
+    'density gradient measure operator spectrum residual'
+).split()
+
+
+@dataclass
+class DocumentSpec:
+    """Parameters of a synthetic document."""
+    
+    figures: int = 20
+    plot_points: int = 100
+    ab_depth: int = 3
+    size_mb: float = 1.0
+    seed: int = 0
+
+
+def nested_ab(depth: int, rng: random.Random) -> str:
+    """Return a formula with ``depth`` nested ``\\ab`` groups of mixed kinds."""
+    openers = [('(', ')'), ('[', ']'), ('\\{', '\\}'), ('|', '|')]
+    formula = rng.choice('xyz')
+    for level in range(depth):
+        opener, closer = openers[level % len(openers)]
+        formula = f'{rng.choice("abc")} + f({level}) \\ab{opener}{formula}{closer}'
+    return f'${formula}$'
+
+
+def paragraph(spec: DocumentSpec, rng: random.Random) -> str:
+    """One paragraph of prose with inline math."""
+    sentences = []
+    for _ in range(6):
+        words = ' '.join(rng.choice(WORDS) for _ in range(12))
+        sentences.append(f'The {words} {nested_ab(spec.ab_depth, rng)}.')
+    return ' '.join(sentences)
+
+
+def figure(index: int, spec: DocumentSpec) -> str:
+    """A labelled figure; even ones plot a data file, odd ones are drawings."""
+    if index % 2 == 0:
+        body = (
+            '\\begin{axis}\n'
+            f'\\addplot table {{data/plot{index:04d}.dat}};\n'
+            '\\end{axis}\n'
+        )
+    else:
+        body = ''.join(
+            f'\\draw ({step},0) -- ({step + 1},{(step * index) % 5}) '
+            f'node[above] {{$p_{{{step}}}$}};\n'
+            for step in range(8)
+        )
+    return (
+        '\\begin{figure}\n'
+        '\\centering\n'
+        f'\\begin{{tikzpicture}}\n{body}\\end{{tikzpicture}}\n'
+        f'\\caption{{Synthetic figure {index}}}\n'
+        f'\\label{{fig:synthetic{index:04d}}}\n'
+        '\\end{figure}\n'
+    )
+
+
+def plot_data(index: int, points: int) -> str:
+    """Two-column table read by figure ``index``."""
+    rows = [f'{i} {(i * (index + 1)) % 97 / 7:.4f}' for i in range(points)]
+    return 'x y\n' + '\n'.join(rows) + '\n'
+
+
+def generate_document(spec: DocumentSpec) -> str:
+    """
+    Build the LaTeX source of a synthetic document.
+    
+    Figures are spread evenly between paragraphs; paragraphs are added until
+    the document reaches ``spec.size_mb``.
+    """
+    rng = random.Random(spec.seed)
+    target = int(spec.size_mb * 1024 * 1024)
+    paragraphs: List[str] = []
+    size = len(PREAMBLE)
+    while size < target or len(paragraphs) < spec.figures:
+        text = paragraph(spec, rng)
+        paragraphs.append(text)
+        size += len(text) + 2
+    
+    parts = [PREAMBLE]
+    step = max(1, len(paragraphs) // max(1, spec.figures))
+    placed = 0
+    for index, text in enumerate(paragraphs):
+        if index % 50 == 0:
+            parts.append(f'\\section{{Part {index // 50 + 1}}}\n')
+        parts.append(text + '\n\n')
+        if index % step == 0 and placed < spec.figures:
+            parts.append(figure(placed, spec))
+            placed += 1
+    parts.append('\\end{document}\n')
+    return ''.join(parts)
+
+
+def generate_data(spec: DocumentSpec) -> Dict[str, str]:
+    """Data files (relative path -> contents) read by the plot figures."""
+    return {
+        f'data/plot{index:04d}.dat': plot_data(index, spec.plot_points)
+        for index in range(0, spec.figures, 2)
+    }
+
+
+def write_project(directory: Path, spec: DocumentSpec) -> Path:
+    """
+    Write ``main.tex`` and its data files into ``directory``.
+    
+    Returns:
+        Path to main.tex
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for name, content in generate_data(spec).items():
+        path = directory / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding='utf-8')
+    main = directory / 'main.tex'
+    main.write_text(generate_document(spec), encoding='utf-8')
+    return main
+
+
+def add_spec_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the document parameters to a command line parser."""
+    parser.add_argument('--figures', type=int, default=20, help='TikZ figures')
+    parser.add_argument('--plot-points', type=int, default=100,
+                        help='Rows per pgfplots data file')
+    parser.add_argument('--ab-depth', type=int, default=3,
+                        help='Nesting depth of \\ab groups in formulas')
+    parser.add_argument('--size-mb', type=float, default=1.0,
+                        help='Approximate document size in MB')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+
+
+def spec_from_args(args: argparse.Namespace) -> DocumentSpec:
+    """DocumentSpec from parsed ``add_spec_arguments`` options."""
+    return DocumentSpec(
+        figures=args.figures,
+        plot_points=args.plot_points,
+        ab_depth=args.ab_depth,
+        size_mb=args.size_mb,
+        seed=args.seed,
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Write a synthetic LaTeX project')
+    parser.add_argument('out_dir', help='Directory for main.tex and data/')
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+    
+    main_tex = write_project(Path(args.out_dir), spec_from_args(args))
+    size = main_tex.stat().st_size / (1024 * 1024)
+    print(f"Wrote {main_tex} ({size:.2f} MB)")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
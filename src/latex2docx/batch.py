@@ -0,0 +1,150 @@
+"""
+Batch conversion of many documents in one process.
+"""
+
+import glob
+import logging
+import os
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from latex2docx.converter import TexConverter
+
+
+@dataclass
+class BatchResult:
+    """Outcome of converting one document."""
+    
+    input_path: Path
+    output_path: Path
+    seconds: float = 0.0
+    error: Optional[str] = None
+    
+    @property
+    def ok(self) -> bool:
+        """True if the document converted without errors."""
+        return self.error is None
+
+
+class BatchConverter:
+    """Convert many documents with one shared figure pool and cache."""
+    
+    def __init__(
+        self,
+        inputs: Iterable[str | Path],
+        out_dir: Optional[str | Path] = None,
+        verbose: bool = False,
+        jobs: Optional[int] = None,
+        **converter_options,
+    ):
+        """
+        Initialize batch.
+        
+        Args:
+            inputs: Input LaTeX files
+            out_dir: Directory for the DOCX files, mirroring the input tree
+                (next to each input if None)
+            verbose: Show the full per-document pipeline log
+            jobs: Worker count for figures and for documents (CPU count if None)
+            converter_options: Passed on to every TexConverter (with
+                ``clean``, each document is cleaned up after converting)
+        """
+        self.inputs = [Path(path) for path in inputs]
+        self.out_dir = Path(out_dir) if out_dir else None
+        self.verbose = verbose
+        self.jobs = jobs or os.cpu_count() or 1
+        self.converter_options = converter_options
+        self.results: List[BatchResult] = []
+    
+    @staticmethod
+    def expand_patterns(patterns: Iterable[str]) -> List[Path]:
+        """Expand glob patterns (``**`` is recursive) into sorted unique files."""
+        found = set()
+        for pattern in patterns:
+            matches = glob.glob(pattern, recursive=True) or [pattern]
+            found.update(Path(match) for match in matches if Path(match).is_file())
+        return sorted(found)
+    
+    def output_for(self, input_path: Path) -> Path:
+        """DOCX path for an input, keeping the layout below the common root."""
+        if self.out_dir is None:
+            return input_path.with_suffix('.docx')
+        parents = [str(path.parent.absolute()) for path in self.inputs]
+        root = Path(os.path.commonpath(parents)) if parents else Path.cwd()
+        relative = input_path.absolute().relative_to(root)
+        return self.out_dir / relative.with_suffix('.docx')
+    
+    def _convert(self, input_path: Path, pool: Executor) -> BatchResult:
+        """Convert one document, recording its time and any error."""
+        result = BatchResult(input_path, self.output_for(input_path))
+        start = time.perf_counter()
+        try:
+            result.output_path.parent.mkdir(parents=True, exist_ok=True)
+            converter = TexConverter(
+                input_path,
+                result.output_path,
+                verbose=self.verbose,
+                jobs=self.jobs,
+                executor=pool,
+                # Only problems are logged unless verbose; progress is the table
+                log_level=None if self.verbose else logging.WARNING,
+                **self.converter_options
+            )
+            converter.run_stages()
+            if converter.clean_after:
+                converter.cleanup()
+        except Exception as e:
+            result.error = str(e) or type(e).__name__
+        result.seconds = time.perf_counter() - start
+        status = '✓' if result.ok else '✗'
+        print(f"  {status} {input_path} ({result.seconds:.1f} s)")
+        return result
+    
+    def run(self) -> int:
+        """Convert every document and print a summary table."""
+        if not self.inputs:
+            print("No input files matched")
+            return 1
+        
+        print(f"Converting {len(self.inputs)} documents with {self.jobs} workers")
+        print("")
+        
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.jobs) as figure_pool, \
+                ThreadPoolExecutor(max_workers=self.jobs) as document_pool:
+            # Every document has its own figure directories, so documents
+            # in one directory can be converted concurrently too
+            futures = [
+                document_pool.submit(self._convert, path, figure_pool)
+                for path in self.inputs
+            ]
+            by_path = {future.result().input_path: future.result() for future in futures}
+        
+        self.results = [by_path[path] for path in self.inputs]
+        self._print_summary(time.perf_counter() - start)
+        return 0 if all(result.ok for result in self.results) else 1
+    
+    def _print_summary(self, total_seconds: float) -> None:
+        """Print per-document timings and failures."""
+        width = max(len(str(result.input_path)) for result in self.results)
+        width = max(width, len('Document'))
+        
+        print("")
+        print("=" * 50)
+        print("  Batch Summary")
+        print("=" * 50)
+        print(f"{'Document':<{width}}  {'Status':<6}  {'Time':>8}")
+        for result in self.results:
+            status = 'ok' if result.ok else 'FAILED'
+            print(f"{str(result.input_path):<{width}}  {status:<6}  "
+                  f"{result.seconds:>7.1f}s")
+        
+        failures = [result for result in self.results if not result.ok]
+        print("")
+        print(f"Converted: {len(self.results) - len(failures)}/{len(self.results)}"
+              f"  Total: {total_seconds:.1f} s")
+        for result in failures:
+            print(f"  ✗ {result.input_path}: {result.error}")
@@ -0,0 +1,295 @@
+"""
+Persistent content-addressed cache for compiled TikZ figures.
+"""
+
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Bump when the key layout changes so old entries are never reused.
+CACHE_VERSION = '1'
+
+# POSIX record locks are per process, so threads of one process are
+# serialized by a lock per path before taking the file lock: path ->
+# [lock, number of threads holding or waiting for it]. Entries are dropped
+# when unused, and _THREAD_LOCKS_GUARD protects the dict itself.
+_THREAD_LOCKS: Dict[str, list] = {}
+_THREAD_LOCKS_GUARD = threading.Lock()
+
+
+def _read_umask() -> int:
+    """The process umask, read without changing it where possible."""
+    try:
+        for line in Path('/proc/self/status').read_text().splitlines():
+            if line.startswith('Umask:'):
+                return int(line.split()[1], 8)
+    except (OSError, ValueError):
+        pass
+    # Setting the umask to read it races with threads creating files, which
+    # is why it is only done once, at import
+    mask = os.umask(0o022)
+    os.umask(mask)
+    return mask
+
+
+# Mode of published files, as if they had been created with open(): temporary
+# files come out 0600 and would stay private to the user after the rename.
+FILE_MODE = 0o666 & ~_read_umask()
+
+# Lock files are always writable by the group, so jobs of other users in a
+# shared (setgid) cache directory can open them for locking.
+LOCK_MODE = FILE_MODE | 0o660
+
+# Directories the figure cache creates: group-writable and setgid, so the
+# entries every job adds belong to the cache's group
+SHARED_DIR_MODE = (0o777 & ~_read_umask()) | 0o2070
+
+
+def default_cache_dir() -> Path:
+    """Return the cache directory ($LATEX2DOCX_CACHE_DIR or XDG cache)."""
+    override = os.environ.get('LATEX2DOCX_CACHE_DIR')
+    if override:
+        return Path(override)
+    base = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+    return Path(base) / 'latex2docx'
+
+
+@lru_cache(maxsize=None)
+def tool_version(tool: str) -> str:
+    """Return the first line of ``tool --version`` ('' if unavailable)."""
+    try:
+        result = subprocess.run(
+            [tool, '--version'],
+            capture_output=True,
+            text=True
+        )
+    except OSError:
+        return ''
+    lines = (result.stdout or '').splitlines()
+    return lines[0].strip() if lines else ''
+
+
+@contextmanager
+def _atomic_target(target: Path) -> Iterator[object]:
+    """Yield a binary file that replaces ``target`` once it is closed.
+    
+    The data is written to a temporary file next to the target and then
+    renamed over it, which is atomic on POSIX file systems including NFS.
+    """
+    target = Path(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(
+        prefix=f'.{target.name}.', suffix='.tmp', dir=target.parent
+    )
+    try:
+        if hasattr(os, 'fchmod'):
+            os.fchmod(fd, FILE_MODE)
+        with os.fdopen(fd, 'wb') as tmp:
+            yield tmp
+        os.replace(tmp_name, target)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def atomic_copy(source: Path, target: Path) -> None:
+    """Copy ``source`` to ``target`` so readers never see a partial file."""
+    with _atomic_target(target) as tmp, open(source, 'rb') as src:
+        shutil.copyfileobj(src, tmp)
+
+
+def link_file(source: Path, target: Path) -> None:
+    """Make ``source`` visible at ``target`` without copying if possible.
+    
+    Tries a hard link, then a symbolic link, and copies only if the file
+    system supports neither.
+    """
+    if target.exists():
+        return
+    target.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(source, target)
+        return
+    except OSError:
+        pass
+    try:
+        os.symlink(Path(source).absolute(), target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+def atomic_write_bytes(target: Path, data: bytes) -> None:
+    """Write ``data`` to ``target`` so readers never see a partial file."""
+    with _atomic_target(target) as tmp:
+        tmp.write(data)
+
+
+def atomic_write_text(target: Path, text: str) -> None:
+    """Write UTF-8 text to ``target`` so readers never see a partial file."""
+    atomic_write_bytes(target, text.encode('utf-8'))
+
+
+@contextmanager
+def _thread_lock(path: Path) -> Iterator[None]:
+    """Hold the in-process lock of ``path``; other paths never wait for it."""
+    name = str(path)
+    with _THREAD_LOCKS_GUARD:
+        entry = _THREAD_LOCKS.setdefault(name, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _THREAD_LOCKS_GUARD:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _THREAD_LOCKS[name]
+
+
+def _open_lock_file(path: Path):
+    """Open (creating if missing) a lock file for writing, group-writable."""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, LOCK_MODE)
+    if hasattr(os, 'fchmod'):
+        try:
+            # The umask applies to os.open too; only the owner may fix that
+            os.fchmod(fd, LOCK_MODE)
+        except OSError:
+            pass
+    return os.fdopen(fd, 'r+b')
+
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive lock on ``path`` (created if missing)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with _thread_lock(path), _open_lock_file(path) as handle:
+        if fcntl is not None:
+            # lockf (fcntl record locks) also works across NFS clients.
+            fcntl.lockf(handle, fcntl.LOCK_EX)
+        else:
+            handle.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.lockf(handle, fcntl.LOCK_UN)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class FigureCache:
+    """PNG store keyed by everything that influences a compiled figure.
+    
+    The store may be shared by several processes (also over NFS): entries
+    are published atomically and ``lock()`` lets one process compile a
+    figure while others wait for its result.
+    """
+    
+    def __init__(self, cache_dir: Optional[str | Path] = None):
+        """
+        Initialize cache.
+        
+        Args:
+            cache_dir: Cache root (default_cache_dir() if None)
+        """
+        self.root = Path(cache_dir) if cache_dir else default_cache_dir()
+        self.figure_dir = self.root / 'figures'
+    
+    @staticmethod
+    def make_key(
+        source: str,
+        data_files: Iterable[Path],
+        dpi: int,
+        tools: Iterable[str],
+        backends: Iterable[str] = (),
+    ) -> str:
+        """
+        Hash a figure's inputs into a cache key.
+        
+        Args:
+            source: Standalone TeX source of the figure
+            data_files: Files the figure reads, in reference order
+                (missing files are allowed)
+            dpi: Rasterization density
+            tools: Tools whose versions are part of the key
+            backends: Further identities such as the rasterizer name and
+                version
+        """
+        digest = hashlib.sha256()
+        digest.update(f'latex2docx-figure-v{CACHE_VERSION}\0'.encode())
+        digest.update(source.encode('utf-8'))
+        # The reference names are already part of the source, so only the
+        # file contents are hashed; identical figures in different
+        # projects share one entry.
+        for path in data_files:
+            digest.update(b'\0file:')
+            if Path(path).is_file():
+                digest.update(hashlib.sha256(Path(path).read_bytes()).digest())
+        digest.update(f'\0dpi:{dpi}'.encode())
+        for tool in tools:
+            digest.update(f'\0{tool}:{tool_version(tool)}'.encode('utf-8'))
+        for backend in backends:
+            digest.update(f'\0backend:{backend}'.encode('utf-8'))
+        return digest.hexdigest()
+    
+    def path_for(self, key: str) -> Path:
+        """Return where the PNG for ``key`` is stored."""
+        return self.figure_dir / key[:2] / f'{key}.png'
+    
+    def lookup(self, key: str) -> Optional[Path]:
+        """Return the cached PNG for ``key``, or None on a miss."""
+        path = self.path_for(key)
+        return path if path.is_file() else None
+    
+    def _make_dirs(self, path: Path) -> None:
+        """Create ``path`` and missing parents; those inside the cache root
+        get ``SHARED_DIR_MODE``."""
+        missing = []
+        while not path.is_dir():
+            missing.append(path)
+            path = path.parent
+        for directory in reversed(missing):
+            try:
+                directory.mkdir()
+            except FileExistsError:
+                continue
+            if directory != self.root and self.root not in directory.parents:
+                continue
+            try:
+                os.chmod(directory, SHARED_DIR_MODE)
+            except OSError:
+                pass
+    
+    def store(self, key: str, png_file: Path) -> Path:
+        """Atomically publish a freshly rasterized PNG into the cache."""
+        path = self.path_for(key)
+        self._make_dirs(path.parent)
+        atomic_copy(png_file, path)
+        return path
+    
+    def lock(self, key: str):
+        """Context manager serializing work on ``key`` across processes."""
+        path = self.path_for(key)
+        self._make_dirs(path.parent)
+        return file_lock(path.with_suffix('.lock'))
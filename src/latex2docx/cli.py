@@ -3,11 +3,17 @@ Command-line interface for LaTeX to DOCX converter.
 """
 
 import argparse
+import logging
 import sys
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 
+from latex2docx.batch import BatchConverter
 from latex2docx.converter import TexConverter
+from latex2docx.rasterize import RASTERIZERS
+from latex2docx.server import ConversionService, serve
+from latex2docx.tools import DEFAULT_LOG_LIMIT
+from latex2docx.watch import Watcher
 
 
 class CleanupTool:
@@ -22,11 +28,13 @@ class CleanupTool:
         import shutil
         from glob import glob
         
-        cleanup_dirs = ['tikz_extracted', 'tikz_png']
+        cleanup_dirs = ['tikz_extracted', 'tikz_png', '.latex2docx']
         cleanup_patterns = [
             '*_pandoc.tex',
             '*_with_images.tex',
             '*.docx',
+            '*_pandoc.log',
+            # Logs of earlier versions
             'compile.log',
             'pandoc_conversion.log'
         ]
@@ -49,8 +57,248 @@ class CleanupTool:
         return 0
 
 
+def _positive_int(value: str) -> int:
+    """argparse type for options that take a count of at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1: {value}")
+    return number
+
+
+def _positive_float(value: str) -> float:
+    """argparse type for durations that must be greater than zero."""
+    number = float(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0: {value}")
+    return number
+
+
+def _section_range(value: str) -> Tuple[int, int]:
+    """argparse type for ``N`` or ``FIRST-LAST`` (1-based, inclusive)."""
+    first, _, last = value.partition('-')
+    try:
+        bounds = int(first), int(last or first)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected N or FIRST-LAST: {value}") from None
+    if bounds[0] < 1 or bounds[1] < bounds[0]:
+        raise argparse.ArgumentTypeError(f"invalid section range: {value}")
+    return bounds
+
+
+def _add_converter_arguments(parser: argparse.ArgumentParser) -> None:
+    """Options shared by conversions and the server."""
+    parser.add_argument(
+        '-j', '--jobs',
+        type=_positive_int,
+        default=None,
+        metavar='N',
+        help='Number of TikZ figures compiled in parallel (default: CPU count)'
+    )
+    
+    parser.add_argument(
+        '--single-run',
+        action='store_true',
+        help='Compile all TikZ figures in one pdflatex run and split the pages '
+             '(falls back to one run per figure on failure)'
+    )
+    
+    parser.add_argument(
+        '--precompile-preamble',
+        action='store_true',
+        help='Dump the figure preamble into a cached TeX format once and '
+             'compile figures with -fmt (needs mylatexformat)'
+    )
+    
+    parser.add_argument(
+        '--rasterizer',
+        choices=['auto', *RASTERIZERS],
+        default='auto',
+        help='PDF to PNG backend (default: auto, the fastest installed of '
+             'pdftoppm, pdftocairo, pymupdf, imagemagick)'
+    )
+    
+    parser.add_argument(
+        '--split-pandoc',
+        action='store_true',
+        help='Split long documents at \\chapter/\\section, run pandoc on the '
+             'parts in parallel and merge the DOCX files'
+    )
+    
+    parser.add_argument(
+        '--optimize-png',
+        action='store_true',
+        help='Losslessly recompress figure PNGs (oxipng/optipng if installed) '
+             'and embed identical figures once'
+    )
+    
+    parser.add_argument(
+        '--png-colors',
+        type=_positive_int,
+        metavar='N',
+        help='Also quantize figures to at most N colors with pngquant '
+             '(lossy; implies --optimize-png)'
+    )
+    
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Recompile every TikZ figure instead of reusing cached PNGs'
+    )
+    
+    parser.add_argument(
+        '--cache-dir',
+        metavar='DIR',
+        help='Figure cache directory; may be shared by concurrent jobs '
+             '(default: $LATEX2DOCX_CACHE_DIR or ~/.cache/latex2docx)'
+    )
+    
+    parser.add_argument(
+        '--timeout',
+        type=_positive_float,
+        metavar='SECONDS',
+        help='Kill a figure\'s pdflatex or rasterizer process after this '
+             'many seconds (default: no limit)'
+    )
+    
+    parser.add_argument(
+        '--memory-limit',
+        type=_positive_int,
+        metavar='MB',
+        help='Address space limit per figure process (POSIX only)'
+    )
+    
+    parser.add_argument(
+        '--cpu-limit',
+        type=_positive_int,
+        metavar='SECONDS',
+        help='CPU time limit per figure process (POSIX only)'
+    )
+    
+    parser.add_argument(
+        '--log-limit',
+        type=_positive_int,
+        default=DEFAULT_LOG_LIMIT // 1024,
+        metavar='KB',
+        help='Output kept per tool and stream; the middle of longer logs is '
+             f'dropped (default: {DEFAULT_LOG_LIMIT // 1024})'
+    )
+    
+    parser.add_argument(
+        '--fail-fast',
+        action='store_true',
+        help='Stop at the first TikZ figure that fails instead of converting '
+             'the document without it'
+    )
+    
+    parser.add_argument(
+        '--draft',
+        action='store_true',
+        help='Quick preview: reuse existing figure PNGs even if stale, '
+             'rasterize new ones at low DPI, show failed figures as '
+             'placeholders and skip the table of contents'
+    )
+    
+    parser.add_argument(
+        '--sections',
+        type=_section_range,
+        metavar='N[-M]',
+        help='Only convert top-level sections N to M (\\chapter, or '
+             '\\section if there are no chapters; counted from 1)'
+    )
+
+
+def _converter_options(args: argparse.Namespace) -> dict:
+    """TexConverter keyword arguments from the shared options."""
+    return dict(
+        use_cache=not args.no_cache,
+        cache_dir=args.cache_dir,
+        single_run=args.single_run,
+        precompile_preamble=args.precompile_preamble,
+        rasterizer=args.rasterizer,
+        split_pandoc=args.split_pandoc,
+        optimize_png=args.optimize_png,
+        png_colors=args.png_colors,
+        timeout=args.timeout,
+        memory_limit=args.memory_limit,
+        cpu_limit=args.cpu_limit,
+        log_limit=args.log_limit * 1024,
+        fail_fast=args.fail_fast,
+        draft=args.draft,
+        sections=args.sections
+    )
+
+
+def serve_main(argv: list) -> int:
+    """Entry point of ``latex2docx serve``."""
+    parser = argparse.ArgumentParser(
+        prog='latex2docx serve',
+        description='Run a conversion server that keeps workers and caches warm',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+Examples:
+  latex2docx serve --port 8765
+  latex2docx serve --socket /tmp/latex2docx.sock
+  curl -H 'Content-Type: application/json' -d '{"path": "/abs/main.tex"}' \\
+       -o main.docx http://127.0.0.1:8765/convert
+        '''
+    )
+    
+    address = parser.add_mutually_exclusive_group()
+    address.add_argument(
+        '--socket',
+        metavar='PATH',
+        help='Listen on a Unix domain socket'
+    )
+    address.add_argument(
+        '--port',
+        type=int,
+        default=8765,
+        help='Listen on this localhost TCP port (default: 8765)'
+    )
+    
+    parser.add_argument(
+        '--root',
+        metavar='DIR',
+        action='append',
+        help='Directory whose documents requests may convert and write; '
+             'repeatable (default: current directory)'
+    )
+    
+    parser.add_argument(
+        '--work-dir',
+        metavar='DIR',
+        help='Directory for documents sent as LaTeX payloads '
+             '(default: a temporary directory)'
+    )
+    
+    _add_converter_arguments(parser)
+    
+    parser.add_argument(
+        '-v', '--verbose',
+        action='store_true',
+        help='Log the full pipeline of every conversion'
+    )
+    
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    
+    service = ConversionService(
+        jobs=args.jobs,
+        work_dir=args.work_dir,
+        verbose=args.verbose,
+        roots=args.root,
+        **_converter_options(args)
+    )
+    return serve(service, args.socket, args.port)
+
+
 def main(argv: Optional[list] = None) -> int:
     """Main entry point."""
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ['serve']:
+        return serve_main(argv[1:])
+    
     parser = argparse.ArgumentParser(
         prog='latex2docx',
         description='Convert LaTeX to DOCX with integrated TikZ support',
@@ -60,6 +308,11 @@ Examples:
   latex2docx main.tex
   latex2docx main.tex output.docx
   latex2docx main.tex --clean
+  latex2docx main.tex --jobs 8
+  latex2docx main.tex --watch
+  latex2docx main.tex --draft --sections 2-3
+  latex2docx --batch 'docs/**/*.tex' --out-dir build/
+  latex2docx serve --port 8765
   latex2docx --clean-only
         '''
     )
@@ -88,6 +341,56 @@ Examples:
         help='Only cleanup intermediate files (do not convert)'
     )
     
+    _add_converter_arguments(parser)
+    
+    parser.add_argument(
+        '--keep-intermediates',
+        action='store_true',
+        help='Write <stem>_pandoc.tex and <stem>_with_images.tex '
+             '(default: keep them in memory and pipe to pandoc)'
+    )
+    
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Rerun every pipeline step even if its inputs are unchanged'
+    )
+    
+    parser.add_argument(
+        '--batch',
+        nargs='+',
+        metavar='PATTERN',
+        help='Convert every matching file in one process (glob patterns, '
+             '** is recursive)'
+    )
+    
+    parser.add_argument(
+        '--out-dir',
+        metavar='DIR',
+        help='Output directory for --batch (default: next to each input)'
+    )
+    
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='Keep running and reconvert when the input, included files '
+             'or data/ change'
+    )
+    
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Print wall/CPU time per step and per external process, '
+             'cache hits and bytes read/written'
+    )
+    
+    parser.add_argument(
+        '--metrics-json',
+        metavar='FILE',
+        help='Write the timings as JSON to FILE and a Chrome trace-event '
+             'file next to it (<stem>.trace.json)'
+    )
+    
     parser.add_argument(
         '-v', '--verbose',
         action='store_true',
@@ -96,23 +399,71 @@ Examples:
     
     args = parser.parse_args(argv)
     
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format='%(message)s'
+    )
+    
     # Cleanup only mode
     if args.clean_only:
         return CleanupTool.run()
     
+    converter_options = dict(
+        force=args.force,
+        keep_intermediates=args.keep_intermediates,
+        **_converter_options(args)
+    )
+    
+    # Batch mode
+    if args.batch:
+        for flag, given in (
+            ('--watch', args.watch),
+            ('--profile', args.profile),
+            ('--metrics-json', args.metrics_json),
+        ):
+            if given:
+                parser.error(f"{flag} cannot be used with --batch")
+        patterns = args.batch + [p for p in (args.input_file, args.output_file) if p]
+        batch = BatchConverter(
+            BatchConverter.expand_patterns(patterns),
+            args.out_dir,
+            verbose=args.verbose,
+            clean=args.clean,
+            jobs=args.jobs,
+            **converter_options
+        )
+        try:
+            return batch.run()
+        except KeyboardInterrupt:
+            print('\nCancelled by user')
+            return 130
+    
     # Conversion mode
     if not args.input_file:
         parser.print_help()
         return 1
     
+    if args.watch:
+        for flag, given in (
+            ('--clean', args.clean),
+            ('--profile', args.profile),
+            ('--metrics-json', args.metrics_json),
+        ):
+            if given:
+                parser.error(f"{flag} cannot be used with --watch")
+    
     try:
         converter = TexConverter(
             args.input_file,
             args.output_file,
             verbose=args.verbose,
-            clean=args.clean
+            clean=args.clean,
+            jobs=args.jobs,
+            **converter_options
         )
-        return converter.run()
+        if args.watch:
+            return Watcher(converter).run()
+        return converter.run(profile=args.profile, metrics_json=args.metrics_json)
     
     except KeyboardInterrupt:
         print('\nCancelled by user')
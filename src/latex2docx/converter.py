@@ -2,16 +2,119 @@
 Core converter module with LaTeX to DOCX pipeline.
 """
 
+import asyncio
+import copy
+import hashlib
 import logging
 import os
 import re
 import shutil
-import subprocess
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 
-logger = logging.getLogger(__name__)
+from latex2docx import tools
+from latex2docx.docx_merge import merge_docx
+from latex2docx.docx_update import media_digests, png_size, replace_members
+from latex2docx.figures import FigureIndex, index_figures
+from latex2docx.history import FigureTimings, TimingKey, timing_key
+from latex2docx.cache import (
+    FigureCache,
+    atomic_copy,
+    atomic_write_bytes,
+    atomic_write_text,
+    default_cache_dir,
+    file_lock,
+    link_file,
+    tool_version,
+)
+from latex2docx.manifest import StageManifest
+from latex2docx.metrics import Metrics
+from latex2docx.optimize import PngOptimizer, placeholder_png
+from latex2docx.project import ProjectGraph
+from latex2docx.rasterize import get_rasterizer
+from latex2docx.split import resolve_cross_references, select_sections, split_document
+from latex2docx.tools import DEFAULT_LOG_LIMIT, Limits, ToolRun
+
+# External tools whose output ends up in a compiled figure (the rasterizer
+# backend is added to cache keys separately).
+FIGURE_TOOLS = ('pdflatex',)
+
+# Figure images in the final LaTeX that the DOCX fast path can swap
+FIGURE_IMAGE_PATTERN = re.compile(r'\\includegraphics(?:\[[^\]]*\])?\{(tikz_png/[^}]+\.png)\}')
+
+# Figure resolution of normal builds and of --draft previews
+DEFAULT_DPI = 300
+DRAFT_DPI = 96
+
+# Error of figures not compiled because an earlier one failed (fail_fast)
+SKIPPED = 'skipped after an earlier failure'
+
+# Preamble shared by every standalone figure document
+STANDALONE_PREAMBLE = r"""\usepackage{tikz}
+\usetikzlibrary{calc,positioning,patterns,arrows.meta,decorations.pathmorphing}
+\usepackage{pgfplots}
+\pgfplotsset{compat=1.18}
+\usepackage{amsmath,amssymb,bm,siunitx}
+"""
+
+# Pipeline stages in order: method name -> step title
+STAGES = {
+    'preprocess_tex': "Preprocessing TeX file",
+    'extract_tikz': "Extracting TikZ figures",
+    'compile_tikz': "Compiling TikZ to PDF → PNG",
+    'replace_tikz': "Replacing TikZ with images",
+    'convert_to_docx': "Converting to DOCX",
+}
+
+# Stages whose output is LaTeX text passed on to the next stage
+TEXT_STAGES = ('preprocess_tex', 'replace_tikz')
+
+
+# Delimiter kinds understood after \ab: kind -> (opener, closer)
+AB_DELIMITERS = {
+    'paren': ('(', ')'),
+    'bracket': ('[', ']'),
+    'brace': ('\\{', '\\}'),
+    'pipe': ('|', '|'),
+}
+AB_OPENERS = {opener: kind for kind, (opener, _) in AB_DELIMITERS.items()}
+
+# Tokens relevant to \ab matching. Control sequences are consumed whole so
+# escaped delimiters such as \( or \| never count as plain ones.
+AB_TOKEN_PATTERN = re.compile(
+    r'\\ab(?P<ab>\(|\[|\\\{|\|)'
+    r'|\\[A-Za-z@]+'
+    r'|\\.'
+    r'|[()\[\]|]',
+    re.DOTALL
+)
+
+
+def _text_hash(text: str) -> str:
+    """SHA-256 of a text passed between stages."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+@dataclass
+class FigureResult:
+    """Outcome of compiling one TikZ figure."""
+    
+    name: str
+    pdf_ok: bool = False
+    png_ok: bool = False
+    cached: bool = False
+    error: Optional[str] = None  # why the figure failed, if known
+    saved: int = 0  # bytes removed by PNG optimization
+    seconds: Dict[str, float] = field(default_factory=dict)  # per step: pdflatex, rasterize
+    timing_key: Optional[TimingKey] = None  # of the source the times were measured for
 
 
 class TexConverter:
@@ -23,6 +126,29 @@ class TexConverter:
         output_file: Optional[str | Path] = None,
         verbose: bool = False,
         clean: bool = False,
+        jobs: Optional[int] = None,
+        use_cache: bool = True,
+        cache_dir: Optional[str | Path] = None,
+        force: bool = False,
+        keep_intermediates: bool = True,
+        executor: Optional[Executor] = None,
+        single_run: bool = False,
+        precompile_preamble: bool = False,
+        rasterizer: str = 'auto',
+        metrics: Optional[Metrics] = None,
+        split_pandoc: bool = False,
+        timeout: Optional[float] = None,
+        memory_limit: Optional[int] = None,
+        cpu_limit: Optional[int] = None,
+        log_limit: int = DEFAULT_LOG_LIMIT,
+        fail_fast: bool = False,
+        logger: Optional[logging.Logger] = None,
+        log_level: Optional[int] = None,
+        optimize_png: bool = False,
+        png_colors: Optional[int] = None,
+        draft: bool = False,
+        sections: Optional[Tuple[int, int]] = None,
+        allowed_dirs: Optional[List[str | Path]] = None,
     ):
         """
         Initialize converter.
@@ -32,13 +158,101 @@ class TexConverter:
             output_file: Output DOCX file (auto-generated if None)
             verbose: Enable verbose logging
             clean: Clean intermediate files after conversion
+            jobs: Number of figures compiled in parallel (CPU count if None)
+            use_cache: Reuse previously compiled figures from the cache
+            cache_dir: Figure cache directory, may be shared between jobs
+                (default: $LATEX2DOCX_CACHE_DIR or ~/.cache/latex2docx)
+            force: Rerun every stage even if its inputs are unchanged
+            keep_intermediates: Write <stem>_pandoc.tex and
+                <stem>_with_images.tex; otherwise the text stays in memory
+                and is piped to pandoc on stdin
+            executor: Shared worker pool for figure compilation (a private
+                pool of ``jobs`` workers is used if None)
+            single_run: Compile all uncached figures in one pdflatex run
+                (pages of a multi-page standalone document), falling back
+                to one run per figure if that fails
+            precompile_preamble: Dump the standalone preamble into a TeX
+                format once (cached per TeX version) and compile figures
+                with ``-fmt``
+            rasterizer: PDF to PNG backend (pdftoppm, pdftocairo, pymupdf,
+                imagemagick), or 'auto' for the fastest installed one
+            metrics: Collector for stage/process timings and counters
+                (a private one is created if None)
+            split_pandoc: Split the document at \\chapter/\\section
+                boundaries, run up to ``jobs`` pandoc processes in parallel
+                and merge their DOCX files
+            timeout: Wall-clock seconds allowed per figure process
+                (pdflatex or rasterizer); the process group is killed
+                after that
+            memory_limit: Address space limit per figure process, in MB
+            cpu_limit: CPU seconds allowed per figure process
+            log_limit: Bytes of output kept per stream of a tool (the
+                beginning and the end)
+            fail_fast: Stop at the first figure that fails instead of
+                converting the document without it
+            logger: Logger for progress messages (default: this module's
+                logger); records carry the input file as ``document``
+            log_level: Lowest level of progress messages this converter
+                emits (default: DEBUG if verbose, else INFO)
+            optimize_png: Losslessly recompress new figure PNGs before they
+                are cached, and embed byte-identical figures only once
+            png_colors: Also quantize figures to at most this many colors
+                with pngquant (lossy; implies ``optimize_png``)
+            draft: Quick preview: figures that already have a PNG (even a
+                stale one) or a full-quality cache entry are used as they
+                are, the others are rasterized at ``DRAFT_DPI``, failed
+                figures become placeholder boxes, and there is no table of
+                contents
+            sections: Only convert top-level sections ``first`` to ``last``
+                (1-based, see ``select_sections``)
+            allowed_dirs: Directories \\input/\\include/\\subfile may read
+                from; an include elsewhere raises ``PermissionError``
+                (no restriction if None)
+        
+        The converter changes no process-wide state: paths are made absolute
+        here, every tool runs with an explicit working directory, and
+        logging is left to the application (e.g. ``logging.basicConfig``),
+        so several converters can run in threads of one process.
         """
-        self.input_path = Path(input_file)
+        self.input_path = Path(input_file).absolute()
         self.verbose = verbose
         self.clean_after = clean
+        self.jobs = jobs or os.cpu_count() or 1
+        self.draft = draft
+        self.sections = sections
+        self.allowed_dirs = allowed_dirs
+        self.dpi = DRAFT_DPI if draft else DEFAULT_DPI
+        cache_root = (Path(cache_dir) if cache_dir else default_cache_dir()).absolute()
+        self.cache = FigureCache(cache_root) if use_cache else None
+        self.force = force
+        self.keep_intermediates = keep_intermediates
+        self.executor = executor
+        self.single_run = single_run
+        self.precompile_preamble = precompile_preamble
+        self.format_dir = cache_root / 'formats'
+        self.format_name: Optional[str] = None
+        self.metrics = metrics or Metrics()
+        self.split_pandoc = split_pandoc
+        self.limits = Limits(timeout, memory_limit, cpu_limit, log_limit)
+        self.fail_fast = fail_fast
+        # Set when a figure fails under fail_fast; figures not started yet are skipped
+        self.abort = threading.Event()
+        # Figure -> tool killed by the timeout in the current run
+        self.timeouts: Dict[str, str] = {}
+        self.rasterizer = get_rasterizer(
+            rasterizer, runner=self._run_figure_tool, arunner=self._arun_figure_tool
+        )
+        self.optimizer = (
+            PngOptimizer(png_colors, runner=self._run_figure_tool)
+            if optimize_png or png_colors else None
+        )
         
-        # Setup logging
-        self._setup_logging()
+        self.logger = logging.LoggerAdapter(
+            logger or logging.getLogger(__name__), {'document': str(self.input_path)}
+        )
+        if log_level is None:
+            log_level = logging.DEBUG if verbose else logging.INFO
+        self.log_level = log_level
         
         # Validate input file
         if not self.input_path.exists():
@@ -46,39 +260,49 @@ class TexConverter:
         
         # Generate output filename
         if output_file:
-            self.output_path = Path(output_file)
+            self.output_path = Path(output_file).absolute()
         else:
             date_str = datetime.now().strftime('%Y%m%d')
-            stem = self.input_path.stem
-            self.output_path = Path(f'output_{date_str}.docx')
+            self.output_path = Path(f'output_{date_str}.docx').absolute()
         
         # Derived paths
         self.stem = self.input_path.stem
         self.pandoc_path = self.input_path.parent / f'{self.stem}_pandoc.tex'
         self.images_path = self.input_path.parent / f'{self.stem}_with_images.tex'
-        self.tikz_dir = self.input_path.parent / 'tikz_extracted'
-        self.png_dir = self.input_path.parent / 'tikz_png'
+        self.pandoc_log = self.input_path.parent / f'{self.stem}_pandoc.log'
+        # Figures are kept per document: documents in one directory may use
+        # the same labels and be converted by separate processes at once.
+        self.tikz_dir = self.input_path.parent / 'tikz_extracted' / self.stem
+        self.png_dir = self.input_path.parent / 'tikz_png' / self.stem
+        self.figure_files: Optional[List[Path]] = None
+        # Source files of the document, read once per pipeline run
+        self.project: Optional[ProjectGraph] = None
+        # Preprocessed text per source file: path -> (fingerprint, text, \ab counts)
+        self.preprocessed: Dict[Path, Tuple[str, str, Dict[str, int]]] = {}
+        # Text passed between stages (loaded from disk only when needed)
+        self.source_text: Optional[str] = None
+        self.pandoc_text: Optional[str] = None
+        self.images_text: Optional[str] = None
+        # Figure index per text scanned this run (input and preprocessed)
+        self.figure_indexes: Dict[str, FigureIndex] = {}
+        # Standalone source per figure file, read once per run
+        self.figure_sources: Dict[Path, str] = {}
+        # Cache key per (figure source, DPI), computed once per run
+        self.figure_keys: Dict[Tuple[str, int], str] = {}
+        # History key per figure name, from the index of the extracting run
+        self.timing_keys: Dict[str, TimingKey] = {}
+        self.state_dir = self.input_path.parent / '.latex2docx'
+        self.manifest = StageManifest(self.state_dir / f'{self.stem}.manifest.json')
+        # Compile times of earlier runs, for scheduling the slowest figures first
+        self.timings = FigureTimings(self.state_dir / f'{self.stem}.timings.json')
         
         self._print_header()
     
-    def _setup_logging(self):
-        """Configure logging."""
-        level = logging.DEBUG if self.verbose else logging.INFO
-        logging.basicConfig(
-            level=level,
-            format='%(message)s'
-        )
-    
     def _print(self, message: str, level: str = 'info'):
         """Log message."""
-        if level == 'debug':
-            logger.debug(message)
-        elif level == 'warning':
-            logger.warning(message)
-        elif level == 'error':
-            logger.error(message)
-        else:
-            logger.info(message)
+        levelno = logging.getLevelName(level.upper())
+        if levelno >= self.log_level:
+            self.logger.log(levelno, message)
     
     def _print_header(self):
         """Print conversion header."""
@@ -87,25 +311,139 @@ class TexConverter:
         self._print("=" * 50)
         self._print(f"Input file:  {self.input_path}")
         self._print(f"Output file: {self.output_path}")
+        if self.draft:
+            self._print(f"Draft mode:  existing figures reused, new ones at {self.dpi} DPI")
+        if self.sections:
+            self._print(f"Sections:    {self.sections[0]}-{self.sections[1]}")
         self._print("")
     
     def _step(self, step_num: int, step_name: str):
         """Log step."""
         self._print(f"\n[{step_num}/5] {step_name}")
     
+    def _project(self) -> ProjectGraph:
+        """Input file and the files it includes, read once per pipeline run."""
+        if self.project is None:
+            self.project = ProjectGraph(self.input_path, read=self._read_text, allowed=self.allowed_dirs)
+        return self.project
+    
+    def _source_fingerprints(self) -> Dict[str, str]:
+        """Content hash of every source file, from the texts already read
+        ('missing' for included files that may appear later)."""
+        project = self._project()
+        fingerprints = {str(path): digest for path, digest in project.fingerprints().items()}
+        fingerprints.update((str(path), 'missing') for path in project.missing)
+        return fingerprints
+    
+    def _input_text(self) -> str:
+        """Input document with every \\input/\\include/\\subfile inlined."""
+        if self.source_text is None:
+            self.source_text = self._project().expand()
+        return self.source_text
+    
+    def _figure_index(self, text: str) -> FigureIndex:
+        """Figures of ``text``, scanned once per pipeline run."""
+        index = self.figure_indexes.get(text)
+        if index is None:
+            index = self.figure_indexes[text] = index_figures(text)
+        return index
+    
+    def _figure_source(self, tex_file: Path) -> str:
+        """Standalone source of a figure file, read at most once per run."""
+        source = self.figure_sources.get(tex_file)
+        if source is None:
+            source = self.figure_sources[tex_file] = self._read_text(tex_file)
+        return source
+    
+    def _pandoc_content(self) -> str:
+        """Preprocessed text from step 1 (memory, else the intermediate file)."""
+        if self.pandoc_text is None:
+            self.pandoc_text = self._read_text(self.pandoc_path)
+        return self.pandoc_text
+    
+    def _images_content(self) -> str:
+        """Final LaTeX from step 4 (memory, else the intermediate file)."""
+        if self.images_text is None:
+            self.images_text = self._read_text(self.images_path)
+        return self.images_text
+    
+    def _read_text(self, path: Path) -> str:
+        """Read a UTF-8 file, counting the bytes read."""
+        data = path.read_bytes()
+        self.metrics.count('bytes_read', len(data))
+        return data.decode('utf-8')
+    
+    def _write_text(self, path: Path, content: str) -> None:
+        """Atomically write a UTF-8 file, counting the bytes written."""
+        atomic_write_text(path, content)
+        self.metrics.count('bytes_written', len(content.encode('utf-8')))
+    
+    def _publish_png(self, source: Path, png_path: Path) -> None:
+        """Copy a finished PNG into tikz_png/<stem>/, counting the bytes written."""
+        atomic_copy(source, png_path)
+        self.metrics.count('bytes_written', png_path.stat().st_size)
+    
+    def _write_intermediate(self, path: Path, content: str) -> str:
+        """Write an intermediate file if requested; return a label for logs."""
+        if not self.keep_intermediates:
+            return f"in memory ({len(content):,} chars)"
+        self._write_text(path, content)
+        return path.name
+    
     def preprocess_tex(self) -> None:
         """Step 1: Preprocess TeX file."""
-        self._step(1, "Preprocessing TeX file")
+        self._step(1, STAGES['preprocess_tex'])
         
-        content = self.input_path.read_text(encoding='utf-8')
+        # Each source file is preprocessed on its own, so an edit to one
+        # chapter only reprocesses that chapter.
+        project = self._project()
+        texts = {}
+        ab_counts = {kind: 0 for kind in AB_DELIMITERS}
+        reprocessed = 0
+        for path, source in project.files.items():
+            entry = self.preprocessed.get(path)
+            if entry is None or entry[0] != source.fingerprint:
+                entry = (source.fingerprint, *self._preprocess_text(source.text))
+                self.preprocessed[path] = entry
+                reprocessed += 1
+            texts[path] = entry[1]
+            for kind, count in entry[2].items():
+                ab_counts[kind] += count
+        content = project.expand(texts)
         
-        # Replace \ab(...) with \left(...\right)
+        if len(texts) > 1:
+            self._print(f"  Source files: {len(texts)} ({reprocessed} reprocessed)")
         self._print("  Converting \\ab() to \\left(...\\right)")
-        content, iterations = self._replace_ab_brackets(content)
-        self._print(f"    Replacement passes: {iterations}")
+        self._print("    Replaced: " + ", ".join(
+            f"{kind} {count}" for kind, count in ab_counts.items()
+        ))
+        self._print("  Simplifying preamble")
+        self._print("  Expanding custom commands")
+        
+        # Keep the result for the next steps
+        self.pandoc_text = content
+        output_name = self._write_intermediate(self.pandoc_path, content)
+        
+        # Print statistics
+        tikz_count = len(self._figure_index(content).figures)
+        left_count = len(re.findall(r'\\left\(', content))
+        right_count = len(re.findall(r'\\right\)', content))
+        
+        self._print(f"  TikZ figures: {tikz_count}")
+        self._print(f"  \\left( / \\right): {left_count} / {right_count}")
+        self._print(f"  Output: {output_name}")
+    
+    @classmethod
+    def _preprocess_text(cls, content: str) -> Tuple[str, Dict[str, int]]:
+        """Preprocess one source file.
+        
+        Returns:
+            Tuple of (converted content, number of \\ab rewrites per kind)
+        """
+        # Replace \ab(...) with \left(...\right)
+        content, ab_counts = cls._replace_ab_brackets(content)
         
         # Simplify preamble
-        self._print("  Simplifying preamble")
         content = re.sub(r'\\usepackage\{physics2\}\n?', '', content)
         content = re.sub(r'\\usephysicsmodule\{ab,xmat\}\n?', '', content)
         content = re.sub(r'\\tikzexternalize.*\n?', '', content)
@@ -115,242 +453,1202 @@ class TexConverter:
         content = re.sub(r'\\ModifyHeading.*\n?', '', content)
         
         # Expand custom commands
-        self._print("  Expanding custom commands")
         content = re.sub(r'\\tag\*\{\\daggnum\{([^}]+)\}\}',
                         r'\\tag{(\1)-dagger}', content)
         content = re.sub(r'\\newcommand\{\\daggnum\}.*\n?', '', content)
+        return content, ab_counts
+    
+    @staticmethod
+    def _replace_ab_brackets(content: str) -> Tuple[str, Dict[str, int]]:
+        """Replace \\ab(...), \\ab|...|, \\ab\\{...\\} and \\ab[...] with \\left/\\right.
         
-        # Write output
-        self.pandoc_path.write_text(content, encoding='utf-8')
+        The document is scanned once while tracking delimiter depth, so any
+        nesting level is handled in linear time. An \\ab whose closing
+        delimiter is never found is left untouched.
         
-        # Print statistics
-        tikz_count = len(re.findall(r'\\begin\{tikzpicture\}', content))
-        left_count = len(re.findall(r'\\left\(', content))
-        right_count = len(re.findall(r'\\right\)', content))
+        Returns:
+            Tuple of (converted content, number of rewrites per delimiter kind)
+        """
+        counts = {kind: 0 for kind in AB_DELIMITERS}
+        pieces: List[str] = []
+        # Open \ab groups: [kind, index of the opener in pieces, plain depth]
+        stack: List[list] = []
+        position = 0
         
-        self._print(f"  TikZ figures: {tikz_count}")
-        self._print(f"  \\left( / \\right): {left_count} / {right_count}")
-        self._print(f"  Output: {self.pandoc_path.name}")
-    
-    @staticmethod
-    def _replace_ab_brackets(content: str) -> Tuple[str, int]:
-        """Replace \\ab(...) with \\left(...\\right)."""
-        max_iterations = 50
-        for iteration in range(max_iterations):
-            old_content = content
-            
-            # Case 1: No parentheses inside
-            pattern = r'\\ab\(([^()]+)\)'
-            content = re.sub(pattern, r'\\left(\1\\right)', content)
-            
-            # Case 2: With parentheses
-            pattern = r'\\ab\(((?:[^()]|\([^()]*\))+)\)'
-            content = re.sub(pattern, r'\\left(\1\\right)', content)
-            
-            # Case 3: Complex nesting
-            pattern = r'\\ab\(((?:[^()]|\\left[^)]*\\right|\([^()]*\))+)\)'
-            try:
-                content = re.sub(pattern, r'\\left(\1\\right)', content)
-            except Exception:
-                pass
+        for match in AB_TOKEN_PATTERN.finditer(content):
+            token = match.group()
+            pieces.append(content[position:match.start()])
+            position = match.end()
             
-            # Handle \ab|...| pattern
-            content = re.sub(r'\\ab\|([^|]+)\|', r'\\left|\1\\right|', content)
+            if match.group('ab'):
+                kind = AB_OPENERS[match.group('ab')]
+                stack.append([kind, len(pieces), 0])
+                pieces.append(token)
+                continue
             
-            # Handle \ab\{...\} pattern
-            content = re.sub(r'\\ab\\{(.+?)\\}', r'\\left\\{\1\\right\\}', content)
+            pieces.append(token)
+            if not stack:
+                continue
             
-            if content == old_content:
-                break
+            frame = stack[-1]
+            opener, closer = AB_DELIMITERS[frame[0]]
+            if token == closer and frame[2] == 0:
+                stack.pop()
+                pieces[frame[1]] = f'\\left{opener}'
+                pieces[-1] = f'\\right{closer}'
+                counts[frame[0]] += 1
+            elif token == closer:
+                frame[2] -= 1
+            elif token == opener:
+                frame[2] += 1
         
-        return content, iteration + 1
+        pieces.append(content[position:])
+        return ''.join(pieces), counts
     
     def extract_tikz(self) -> int:
         """Step 2: Extract TikZ figures."""
-        self._step(2, "Extracting TikZ figures")
+        self._step(2, STAGES['extract_tikz'])
         
-        # Clean and create directories
+        # Create directories. They are not wiped: another job converting a
+        # document in the same directory may be using them right now.
         for directory in [self.tikz_dir, self.png_dir]:
-            if directory.exists():
-                shutil.rmtree(directory)
             directory.mkdir(parents=True, exist_ok=True)
         
-        # Copy data directory if exists
-        data_dir = self.input_path.parent / 'data'
-        if data_dir.exists():
-            shutil.copytree(
-                data_dir,
-                self.tikz_dir / 'data',
-                dirs_exist_ok=True
-            )
-            self._print("  Copied data directory")
-        
-        # Read input file
-        content = self.input_path.read_text(encoding='utf-8')
-        
-        # Extract TikZ figures
-        tikz_pattern = r'\\begin\{tikzpicture\}.*?\\end\{tikzpicture\}'
-        tikz_figures = re.findall(tikz_pattern, content, re.DOTALL)
+        # Data files (data/, images, ...) are not copied: figures are
+        # compiled with the document's directory on TEXINPUTS.
+        # Figures are named after their own \label, so a labelled figure
+        # keeps its PNG when figures before it are added or removed.
+        index = self._figure_index(self._input_text())
         
-        # Auto-detect labels
-        labels = self._extract_labels(content)
-        
-        self._print(f"  Detected {len(tikz_figures)} TikZ figures")
-        self._print(f"  Detected {len(labels)} labels")
+        self._print(f"  Detected {len(index.figures)} TikZ figures")
+        self._print(f"  Detected {len(index.labels)} labels")
         self._print("")
         
         # Save each TikZ figure
-        for i, tikz_code in enumerate(tikz_figures, 1):
-            label_name = (
-                list(labels.keys())[i - 1]
-                if i <= len(labels)
-                else f'tikz-{i:02d}'
-            )
+        self.figure_files = []
+        for figure in index.figures:
+            standalone_tex = self._make_standalone_tex(index.code(figure))
+            output_file = self.tikz_dir / f'{figure.name}.tex'
+            self._write_text(output_file, standalone_tex)
+            self.timing_keys[figure.name] = timing_key(standalone_tex, figure.digest)
+            self.figure_files.append(output_file)
             
-            standalone_tex = self._make_standalone_tex(tikz_code)
-            output_file = self.tikz_dir / f'{label_name}.tex'
-            output_file.write_text(standalone_tex, encoding='utf-8')
-            
-            self._print(f"  [{i:02d}] {label_name}")
+            self._print(f"  [{figure.number:02d}] {figure.name}")
         
-        return len(tikz_figures)
+        return len(index.figures)
     
     @staticmethod
-    def _extract_labels(tex_content: str) -> Dict[str, str]:
-        """Extract \\label{fig:...} from LaTeX content."""
-        pattern = r'\\label\{fig:([^}]+)\}'
-        labels = {}
-        for match in re.finditer(pattern, tex_content):
-            label_name = match.group(1)
-            labels[label_name] = label_name
-        return labels
+    def _referenced_files(tex_code: str) -> List[str]:
+        """Find files read by TikZ code (plot tables, \\input, graphics)."""
+        patterns = [
+            r'\\addplot3?\+?\s*(?:\[[^\]]*\]\s*)?(?:table|file)\s*'
+            r'(?:\[[^\]]*\]\s*)?\{([^}]+)\}',
+            r'\\pgfplotstableread(?:\[[^\]]*\])?\{([^}]+)\}',
+            r'\\input\{([^}]+)\}',
+            r'\\includegraphics(?:\[[^\]]*\])?\{([^}]+)\}',
+        ]
+        names = []
+        for pattern in patterns:
+            for match in re.finditer(pattern, tex_code):
+                name = match.group(1).strip()
+                if name and name not in names:
+                    names.append(name)
+        return names
+    
+    def watched_paths(self) -> List[Path]:
+        """Files whose changes affect the output (input, includes, data)."""
+        try:
+            project = ProjectGraph(self.input_path)
+            paths = project.paths() + project.missing
+        except (OSError, UnicodeDecodeError):
+            # Mid-save or not yet recreated; watch the main file until it is back
+            paths = [self.input_path]
+        
+        data_dir = self.input_path.parent / 'data'
+        if data_dir.is_dir():
+            paths.extend(sorted(p for p in data_dir.rglob('*') if p.is_file()))
+        return paths
     
     @staticmethod
     def _make_standalone_tex(tikz_code: str) -> str:
         """Create standalone TeX document for TikZ figure."""
-        return f"""\\documentclass{{standalone}}
-\\usepackage{{tikz}}
-\\usetikzlibrary{{calc,positioning,patterns,arrows.meta,decorations.pathmorphing}}
-\\usepackage{{pgfplots}}
-\\pgfplotsset{{compat=1.18}}
-\\usepackage{{amsmath,amssymb,bm,siunitx}}
-
-\\begin{{document}}
-{tikz_code}
-\\end{{document}}
-"""
+        return (
+            f"\\documentclass{{standalone}}\n{STANDALONE_PREAMBLE}\n"
+            f"\\begin{{document}}\n{tikz_code}\n\\end{{document}}\n"
+        )
+    
+    @classmethod
+    def _standalone_body(cls, source: str) -> Optional[str]:
+        """Return the figure code of an unmodified standalone file, else None."""
+        head, tail = cls._make_standalone_tex('\0').split('\0')
+        if source.startswith(head) and source.endswith(tail):
+            return source[len(head):len(source) - len(tail)]
+        return None
+    
+    @staticmethod
+    def _make_multi_tex(tikz_codes: List[str]) -> str:
+        """Create one standalone document with every figure on its own page."""
+        pages = '\n'.join(
+            f"\\begin{{standalone}}\n{code}\n\\end{{standalone}}"
+            for code in tikz_codes
+        )
+        return (
+            f"\\documentclass[multi=true]{{standalone}}\n{STANDALONE_PREAMBLE}\n"
+            f"\\begin{{document}}\n{pages}\n\\end{{document}}\n"
+        )
     
     def compile_tikz(self) -> int:
         """Step 3: Compile TikZ to PDF → PNG."""
-        self._step(3, "Compiling TikZ to PDF → PNG")
+        tex_files = self._start_compile()
         
-        original_dir = Path.cwd()
-        os.chdir(self.tikz_dir)
+        done = self._draft_figures(tex_files) if self.draft else {}
+        if self.single_run:
+            done.update(self._compile_single_run([f for f in tex_files if f not in done]))
         
-        try:
-            # Compile to PDF
-            self._print("  Compiling to PDF:")
-            pdf_count = 0
-            for tex_file in sorted(Path('.').glob('*.tex')):
-                result = subprocess.run(
-                    ['pdflatex', '-interaction=nonstopmode', str(tex_file.name)],
-                    capture_output=True,
-                    text=True
+        # Compile and rasterize the rest concurrently, slowest first; results
+        # are reported in input order so the report matches a serial run.
+        remaining = self._longest_first([tex_file for tex_file in tex_files if tex_file not in done])
+        done.update(zip(remaining, self._map(self._compile_figure, remaining)))
+        results = [done[tex_file] for tex_file in tex_files]
+        self._record_timings(results)
+        png_count = self._report_figures(tex_files, results)
+        self._check_fail_fast(results)
+        return png_count
+    
+    async def acompile_tikz(self) -> int:
+        """Step 3 for ``arun``: each figure goes from pdflatex straight to
+        rasterization, with at most ``jobs`` figures in flight."""
+        tex_files = await asyncio.to_thread(self._start_compile)
+        
+        done = await asyncio.to_thread(self._draft_figures, tex_files) if self.draft else {}
+        if self.single_run:
+            done.update(await asyncio.to_thread(
+                self._compile_single_run, [f for f in tex_files if f not in done]
+            ))
+        
+        # The semaphore admits figures in the order they are started
+        limit = asyncio.Semaphore(self.jobs)
+        remaining = self._longest_first([tex_file for tex_file in tex_files if tex_file not in done])
+        results = await asyncio.gather(*(
+            self._acompile_figure(tex_file, limit) for tex_file in remaining
+        ))
+        done.update(zip(remaining, results))
+        results = [done[tex_file] for tex_file in tex_files]
+        await asyncio.to_thread(self._record_timings, results)
+        png_count = self._report_figures(tex_files, results)
+        self._check_fail_fast(results)
+        return png_count
+    
+    def _draft_figures(self, tex_files: List[Path]) -> Dict[Path, FigureResult]:
+        """Figures a draft takes as they are, without compiling.
+        
+        Any PNG already in tikz_png/<stem>/ is used even if its source has changed
+        since; otherwise a full-quality cache entry for the current source.
+        """
+        done: Dict[Path, FigureResult] = {}
+        for tex_file in tex_files:
+            png_path = self.png_dir.absolute() / f'{tex_file.stem}.png'
+            if not png_path.exists() and self.cache is not None:
+                key = self._figure_key(self._figure_source(tex_file), DEFAULT_DPI)
+                cached_png = self.cache.lookup(key)
+                if cached_png is not None:
+                    self.metrics.count('cache_hits')
+                    self._publish_png(cached_png, png_path)
+            if png_path.exists():
+                done[tex_file] = FigureResult(tex_file.stem, True, True, True)
+        self._print(f"  Draft: reusing {len(done)}/{len(tex_files)} existing figures")
+        return done
+    
+    def _start_compile(self) -> List[Path]:
+        """Announce step 3, prepare the preamble format; return the figures."""
+        self._step(3, STAGES['compile_tikz'])
+        
+        if self.figure_files is not None:
+            tex_files = sorted(self.figure_files)
+        else:
+            tex_files = sorted(self.tikz_dir.glob('*.tex'))
+        
+        if self.executor is not None:
+            self._print("  Workers: shared pool")
+        else:
+            self._print(f"  Workers: {self.jobs}")
+        self._print(f"  Rasterizer: {self.rasterizer.name}")
+        if self.limits.timeout is not None:
+            self._print(f"  Timeout per process: {self.limits.timeout:g} s")
+        if self.optimizer is not None:
+            self._print(f"  PNG optimization: {self.optimizer.identity()[len('optimize '):]}")
+            if self.optimizer.colors and self.optimizer.quantizer is None:
+                self._print("  pngquant not found; figures are not quantized", level='warning')
+        self.abort.clear()
+        self.timeouts.clear()
+        
+        if self.precompile_preamble:
+            self.format_name = self._prepare_format()
+        return tex_files
+    
+    def _longest_first(self, tex_files: List[Path]) -> List[Path]:
+        """Order figures by expected compile time, slowest first.
+        
+        A heavy figure started last would keep the pool waiting after every
+        other figure is done; started first, it overlaps with them.
+        """
+        if len(tex_files) < 2:
+            return tex_files
+        by_name = {tex_file.stem: tex_file for tex_file in tex_files}
+        order = self.timings.longest_first({
+            name: self._timing_key(name, self._figure_source(tex_file))
+            for name, tex_file in by_name.items()
+        })
+        head = ', '.join(order[:3]) + (', ...' if len(order) > 3 else '')
+        self._print(f"  Scheduling slowest figures first: {head}", level='debug')
+        return [by_name[name] for name in order]
+    
+    def _timing_key(self, name: str, source: str) -> TimingKey:
+        """History key of figure ``name``, from the index if this run extracted it."""
+        key = self.timing_keys.get(name)
+        if key is None:
+            key = timing_key(source)
+        return key
+    
+    def _record_timings(self, results: List[FigureResult]) -> None:
+        """Add the compile times of this run to the figure timing history."""
+        names = []
+        for result in results:
+            if result.seconds and result.timing_key is not None:
+                self.timings.record(result.name, result.timing_key, result.seconds)
+                names.append(result.name)
+        if names:
+            self.timings.save(names)
+    
+    def _report_figures(self, tex_files: List[Path], results: List[FigureResult]) -> int:
+        """Print per-figure outcomes; return the number of PNGs."""
+        self._print("  Compiling to PDF:")
+        for tex_file, result in zip(tex_files, results):
+            if result.cached:
+                self._print(f"    ✓ {result.name} (cached)")
+            elif result.pdf_ok:
+                self._print(f"    ✓ {result.name}.pdf")
+            else:
+                reason = f" ({result.error})" if result.error else ""
+                self._print(f"    ✗ Failed: {tex_file.name}{reason}", level='warning')
+        
+        self._print(f"  Converting to PNG ({self.dpi} DPI):")
+        png_count = 0
+        for result in results:
+            if not result.pdf_ok:
+                continue
+            if result.png_ok:
+                suffix = " (cached)" if result.cached else ""
+                self._print(f"    ✓ {result.name}.png{suffix}")
+                png_count += 1
+            else:
+                reason = f" ({result.error})" if result.error else ""
+                self._print(f"    ✗ Failed: {result.name}.pdf{reason}", level='warning')
+        
+        cached_count = sum(result.cached for result in results)
+        if self.cache is not None:
+            self._print(f"  Cache hits: {cached_count}/{len(results)}")
+        if self.optimizer is not None:
+            saved = sum(result.saved for result in results)
+            optimized = sum(result.png_ok and not result.cached for result in results)
+            self._print(f"  Optimized {optimized} PNGs: saved {saved / 1024:,.1f} KB")
+        self._print(f"  Generated {png_count} PNG images")
+        return png_count
+    
+    def _check_fail_fast(self, results: List[FigureResult]) -> None:
+        """Under ``fail_fast``, stop the pipeline if any figure failed.
+        
+        Raises:
+            RuntimeError: Naming the first figure that failed
+        """
+        if not self.fail_fast:
+            return
+        failed = [result for result in results if not result.png_ok and result.error != SKIPPED]
+        if failed:
+            reason = f": {failed[0].error}" if failed[0].error else ""
+            raise RuntimeError(f"Figure {failed[0].name} failed{reason}")
+    
+    def _map(self, func, items: list) -> list:
+        """Apply ``func`` to ``items`` on the worker pool, keeping order."""
+        if not items:
+            return []
+        if self.executor is not None:
+            return list(self.executor.map(func, items))
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            return list(pool.map(func, items))
+    
+    def _compile_single_run(self, tex_files: List[Path]) -> Dict[Path, FigureResult]:
+        """Compile uncached figures as pages of one document, then split them.
+        
+        Cache hits are copied directly. Figures with an edited preamble are
+        left out. If the shared run fails, only the cache hits are returned
+        and the caller compiles the remaining figures one by one.
+        
+        Returns:
+            Results for the figures that were handled
+        """
+        done: Dict[Path, FigureResult] = {}
+        pending = []
+        for tex_file in tex_files:
+            source = self._figure_source(tex_file)
+            key = self._figure_key(source) if self.cache is not None else None
+            cached_png = self.cache.lookup(key) if key else None
+            if cached_png is not None:
+                self.metrics.count('cache_hits')
+                self._publish_png(cached_png, self.png_dir.absolute() / f'{tex_file.stem}.png')
+                done[tex_file] = FigureResult(tex_file.stem, True, True, True)
+                continue
+            body = self._standalone_body(source)
+            if body is not None:
+                pending.append((tex_file, body, key))
+        
+        if len(pending) < 2:
+            return done
+        
+        self._print(f"  Single pdflatex run for {len(pending)} figures")
+        with tempfile.TemporaryDirectory(prefix='latex2docx-') as scratch:
+            workdir = self._figure_workdir([body for _, body, _ in pending], Path(scratch))
+            tex_file = workdir / 'figures.tex'
+            tex_file.write_text(
+                self._make_multi_tex([body for _, body, _ in pending]),
+                encoding='utf-8'
+            )
+            
+            # One process does the work of all figures, so it gets their time
+            process = self._run_tool(
+                ['pdflatex', '-interaction=nonstopmode', tex_file.name],
+                f'{len(pending)} figures',
+                cwd=workdir,
+                env=self._tex_env(),
+                limits=self.limits.scaled(len(pending))
+            )
+            
+            pdf_file = tex_file.with_suffix('.pdf')
+            pages = self._pdf_page_count(tex_file.with_suffix('.log'))
+            if process.returncode != 0 or not pdf_file.exists() or pages != len(pending):
+                self._print(
+                    "  Single run failed; compiling figures one by one",
+                    level='warning'
                 )
-                
-                pdf_file = tex_file.with_suffix('.pdf')
-                if pdf_file.exists():
-                    self._print(f"    ✓ {pdf_file.name}")
-                    pdf_count += 1
+                return done
+            
+            # Backends that render many pages per call get one contiguous
+            # range per worker; the others get one call per page.
+            if self.rasterizer.multi_page:
+                size = -(-len(pending) // self.jobs)
+            else:
+                size = 1
+            rasterizer = copy.copy(self.rasterizer)
+            if rasterizer.runner is not None:
+                rasterizer.runner = partial(rasterizer.runner, limits=self.limits.scaled(size))
+            ranges = [
+                range(first, min(first + size, len(pending)))
+                for first in range(0, len(pending), size)
+            ]
+            
+            def rasterize(pages: range) -> List[FigureResult]:
+                scratch_pngs = [workdir / f'{pending[page][0].stem}.png' for page in pages]
+                if len(pages) == 1:
+                    flags = [rasterizer.rasterize(
+                        pdf_file, scratch_pngs[0], self.dpi, pages.start
+                    )]
                 else:
-                    self._print(f"    ✗ Failed: {tex_file.name}", level='warning')
+                    flags = rasterizer.rasterize_pages(
+                        pdf_file, scratch_pngs, self.dpi, pages.start
+                    )
+                results = []
+                for page, scratch_png, ok in zip(pages, scratch_pngs, flags):
+                    figure, _, key = pending[page]
+                    result = FigureResult(figure.stem, pdf_ok=True)
+                    if ok:
+                        self._store_png(result, scratch_png, self.png_dir / scratch_png.name, key)
+                    results.append(result)
+                return results
+            
+            results = [
+                result
+                for chunk in self._map(rasterize, ranges)
+                for result in chunk
+            ]
+        
+        for (figure, _, key), result in zip(pending, results):
+            if key is not None:
+                self.metrics.count('cache_misses')
+            done[figure] = result
+        return done
+    
+    @staticmethod
+    def _pdf_page_count(log_file: Path) -> Optional[int]:
+        """Page count reported in a pdflatex log ("Output written on ...")."""
+        if not log_file.exists():
+            return None
+        log = log_file.read_text(encoding='utf-8', errors='replace')
+        match = re.search(r'Output written on .*?\((\d+) pages?', log, re.DOTALL)
+        return int(match.group(1)) if match else None
+    
+    def _compile_figure(self, tex_file: Path) -> FigureResult:
+        """Compile one standalone figure to PDF and rasterize it to PNG."""
+        result = FigureResult(tex_file.stem)
+        if self.abort.is_set():
+            result.error = SKIPPED
+            return result
+        png_path = self.png_dir.absolute() / f'{tex_file.stem}.png'
+        source = self._figure_source(tex_file)
+        
+        if self.cache is None:
+            self._build_figure(result, source, png_path)
+            return result
+        
+        key = self._figure_key(source)
+        cached_png = self.cache.lookup(key)
+        if cached_png is None:
+            # One job compiles a figure; others needing it wait for the result
+            with self.cache.lock(key):
+                cached_png = self.cache.lookup(key)
+                if cached_png is None:
+                    self.metrics.count('cache_misses')
+                    self._build_figure(result, source, png_path, key)
+                    return result
+        
+        self.metrics.count('cache_hits')
+        self._publish_png(cached_png, png_path)
+        result.pdf_ok = result.png_ok = result.cached = True
+        return result
+    
+    def _build_figure(
+        self,
+        result: FigureResult,
+        source: str,
+        png_path: Path,
+        key: Optional[str] = None,
+    ) -> None:
+        """Run pdflatex and the rasterizer for one figure in a private directory."""
+        with tempfile.TemporaryDirectory(prefix='latex2docx-') as scratch:
+            tex_file = self._figure_workdir([source], Path(scratch)) / f'{result.name}.tex'
+            tex_file.write_text(source, encoding='utf-8')
             
-            # Convert to PNG
-            self._print("  Converting to PNG (300 DPI):")
-            png_count = 0
-            for pdf_file in sorted(Path('.').glob('*.pdf')):
-                png_name = pdf_file.stem + '.png'
-                png_path = original_dir / self.png_dir / png_name
-                
-                result = subprocess.run(
-                    ['convert', '-density', '300', str(pdf_file),
-                     '-quality', '90', str(png_path)],
-                    capture_output=True,
-                    text=True
+            pdf_file = tex_file.with_suffix('.pdf')
+            result.timing_key = self._timing_key(result.name, source)
+            start = time.perf_counter()
+            for cmd in self._pdflatex_attempts(source, tex_file):
+                run = self._run_figure_tool(cmd, result.name, cwd=tex_file.parent, env=self._tex_env())
+                if pdf_file.exists() or run.timed_out:
+                    break
+            result.seconds['pdflatex'] = time.perf_counter() - start
+            if self._check_pdf(result, tex_file):
+                scratch_png = tex_file.with_suffix('.png')
+                start = time.perf_counter()
+                rasterized = self.rasterizer.rasterize(pdf_file, scratch_png, self.dpi)
+                result.seconds['rasterize'] = time.perf_counter() - start
+                if rasterized:
+                    self._store_png(result, scratch_png, png_path, key)
+        self._check_figure(result)
+    
+    async def _acompile_figure(self, tex_file: Path, limit: asyncio.Semaphore) -> FigureResult:
+        """``_compile_figure`` for the asyncio pipeline."""
+        async with limit:
+            if self.cache is not None:
+                # Key, lookup and the blocking cache lock stay together on one
+                # worker thread: a cancelled task cannot leave the lock held.
+                return await asyncio.to_thread(self._compile_figure, tex_file)
+            result = FigureResult(tex_file.stem)
+            if self.abort.is_set():
+                result.error = SKIPPED
+                return result
+            png_path = self.png_dir.absolute() / f'{tex_file.stem}.png'
+            source = await asyncio.to_thread(self._figure_source, tex_file)
+            await self._abuild_figure(result, source, png_path)
+            return result
+    
+    async def _abuild_figure(self, result: FigureResult, source: str, png_path: Path) -> None:
+        """``_build_figure`` with the tools run through asyncio (uncached figures)."""
+        with tempfile.TemporaryDirectory(prefix='latex2docx-') as scratch:
+            tex_file = self._figure_workdir([source], Path(scratch)) / f'{result.name}.tex'
+            tex_file.write_text(source, encoding='utf-8')
+            
+            pdf_file = tex_file.with_suffix('.pdf')
+            result.timing_key = self._timing_key(result.name, source)
+            start = time.perf_counter()
+            for cmd in self._pdflatex_attempts(source, tex_file):
+                run = await self._arun_figure_tool(
+                    cmd, result.name, cwd=tex_file.parent, env=self._tex_env()
                 )
-                
-                if png_path.exists():
-                    self._print(f"    ✓ {png_name}")
-                    png_count += 1
-                else:
-                    self._print(f"    ✗ Failed: {pdf_file.name}", level='warning')
+                if pdf_file.exists() or run.timed_out:
+                    break
+            result.seconds['pdflatex'] = time.perf_counter() - start
+            if self._check_pdf(result, tex_file):
+                scratch_png = tex_file.with_suffix('.png')
+                start = time.perf_counter()
+                rasterized = await self.rasterizer.arasterize(pdf_file, scratch_png, self.dpi)
+                result.seconds['rasterize'] = time.perf_counter() - start
+                if rasterized:
+                    await asyncio.to_thread(self._store_png, result, scratch_png, png_path, None)
+        self._check_figure(result)
+    
+    def _pdflatex_attempts(self, source: str, tex_file: Path) -> List[List[str]]:
+        """pdflatex command lines to try in order for one figure."""
+        # Figures with the standard preamble can skip parsing it by
+        # loading the precompiled format instead.
+        use_format = (
+            self.format_name is not None
+            and self._standalone_body(source) is not None
+        )
+        attempts = [[f'-fmt={self.format_name}'], []] if use_format else [[]]
+        return [
+            ['pdflatex', '-interaction=nonstopmode', *fmt_args, tex_file.name]
+            for fmt_args in attempts
+        ]
+    
+    def _check_pdf(self, result: FigureResult, tex_file: Path) -> bool:
+        """Record whether pdflatex produced a PDF; keep the log if not."""
+        if tex_file.with_suffix('.pdf').exists():
+            result.pdf_ok = True
+            return True
+        log_file = tex_file.with_suffix('.log')
+        if log_file.exists():
+            atomic_copy(log_file, self.tikz_dir / log_file.name)
+        return False
+    
+    def _check_figure(self, result: FigureResult) -> None:
+        """Explain a failed build; under ``fail_fast``, stop further figures."""
+        if result.png_ok:
+            return
+        tool = self.timeouts.get(result.name)
+        if tool is not None:
+            result.error = f"{tool} timed out after {self.limits.timeout:g} s"
+        if self.fail_fast:
+            self.abort.set()
+    
+    def _store_png(
+        self,
+        result: FigureResult,
+        scratch_png: Path,
+        png_path: Path,
+        key: Optional[str],
+    ) -> None:
+        """Optimize, cache and publish a freshly rasterized figure to tikz_png/<stem>/."""
+        if self.optimizer is not None:
+            result.saved = self.optimizer.optimize(scratch_png)
+            self.metrics.count('png_bytes_saved', result.saved)
+        if key is not None:
+            self.cache.store(key, scratch_png)
+        self._publish_png(scratch_png, png_path)
+        result.png_ok = True
+    
+    def _run_tool(
+        self,
+        cmd: List[str],
+        label: str = '',
+        cwd: Optional[Path] = None,
+        env: Optional[Dict[str, str]] = None,
+        input: Optional[bytes] = None,
+        limits: Optional[Limits] = None,
+    ) -> ToolRun:
+        """Run an external tool and record its timing under ``label``."""
+        run = tools.run_tool(cmd, cwd=cwd, env=env, input=input, limits=limits)
+        self.metrics.record_process(run, label)
+        if run.timed_out:
+            self.metrics.count('timeouts')
+        return run
+    
+    def _run_figure_tool(
+        self,
+        cmd: List[str],
+        label: str = '',
+        limits: Optional[Limits] = None,
+        **kwargs,
+    ) -> ToolRun:
+        """``_run_tool`` for figure processes, with the figure limits by default."""
+        run = self._run_tool(cmd, label, limits=limits or self.limits, **kwargs)
+        if run.timed_out:
+            self.timeouts[label] = run.tool
+        return run
+    
+    async def _arun_tool(
+        self,
+        cmd: List[str],
+        label: str = '',
+        cwd: Optional[Path] = None,
+        env: Optional[Dict[str, str]] = None,
+        input: Optional[bytes] = None,
+        limits: Optional[Limits] = None,
+    ) -> ToolRun:
+        """``_run_tool`` through ``asyncio.create_subprocess_exec``."""
+        run = await tools.arun_tool(cmd, cwd=cwd, env=env, input=input, limits=limits)
+        self.metrics.record_process(run, label)
+        if run.timed_out:
+            self.metrics.count('timeouts')
+        return run
+    
+    async def _arun_figure_tool(self, cmd: List[str], label: str = '', **kwargs) -> ToolRun:
+        """``_run_figure_tool`` through ``asyncio.create_subprocess_exec``."""
+        run = await self._arun_tool(cmd, label, limits=self.limits, **kwargs)
+        if run.timed_out:
+            self.timeouts[label] = run.tool
+        return run
+    
+    def _tex_search_dirs(self) -> List[Path]:
+        """Directories TeX searches for files referenced by figures."""
+        return [self.input_path.parent]
+    
+    def _figure_workdir(self, sources: List[str], scratch: Path) -> Path:
+        """Working directory in ``scratch`` for compiling ``sources``.
+        
+        TeX looks up ``data/x.dat`` along TEXINPUTS, but ``./data/x.dat``
+        and ``../shared/x.dat`` only relative to the working directory.
+        Those files are hard-linked (or symlinked) at the same position
+        relative to the returned directory, which is nested below
+        ``scratch`` as deep as the ``../`` references climb.
+        """
+        names = [
+            os.path.normpath(name)
+            for source in sources
+            for name in self._referenced_files(source)
+            if name.startswith(('./', '../'))
+        ]
+        # Normalized, a name has its ../ steps only at the start
+        depth = max((Path(name).parts.count('..') for name in names), default=0)
+        workdir = scratch.joinpath(*['latex2docx-work'] * depth)
+        workdir.mkdir(parents=True, exist_ok=True)
+        for name in names:
+            for candidate in (name, f'{name}.tex'):
+                path = self.input_path.parent / candidate
+                if path.is_file():
+                    link_file(path, Path(os.path.normpath(workdir / candidate)))
+                    break
+        return workdir
+    
+    def _tex_env(self) -> Dict[str, str]:
+        """Environment for pdflatex runs outside the project directory."""
+        env = dict(os.environ)
+        # The trailing empty entry keeps TeX's default search path.
+        search = [str(path) for path in self._tex_search_dirs()]
+        env['TEXINPUTS'] = os.pathsep.join(search + [env.get('TEXINPUTS', '')])
+        if self.format_name is not None:
+            env['TEXFORMATS'] = os.pathsep.join(
+                [str(self.format_dir.absolute()), env.get('TEXFORMATS', '')]
+            )
+        return env
+    
+    def _prepare_format(self) -> Optional[str]:
+        """Build (or reuse) a format with the standalone preamble dumped.
+        
+        The format is produced with mylatexformat, which also makes pdflatex
+        skip the preamble of figures compiled with it. It is cached by a hash
+        of the preamble and the pdflatex version.
+        
+        Returns:
+            Format name for ``-fmt``, or None if it could not be built
+        """
+        head = self._make_standalone_tex('\0').split('\0')[0]
+        digest = hashlib.sha256(
+            f'{head}\0{tool_version("pdflatex")}'.encode('utf-8')
+        ).hexdigest()
+        name = f'latex2docx-{digest[:16]}'
+        fmt_file = self.format_dir / f'{name}.fmt'
+        
+        with file_lock(fmt_file.with_suffix('.lock')):
+            if fmt_file.exists():
+                self._print(f"  Precompiled preamble: {fmt_file.name} (cached)")
+                return name
             
-            self._print(f"  Generated {png_count} PNG images")
-            return png_count
+            with tempfile.TemporaryDirectory(prefix='latex2docx-') as scratch:
+                workdir = Path(scratch)
+                (workdir / 'preamble.tex').write_text(head, encoding='utf-8')
+                self._run_tool(
+                    ['pdflatex', '-ini', '-interaction=nonstopmode',
+                     f'-jobname={name}', '&pdflatex', 'mylatexformat.ltx',
+                     'preamble.tex'],
+                    'preamble format',
+                    cwd=workdir
+                )
+                built = workdir / fmt_file.name
+                if not built.exists():
+                    self._print(
+                        "  Could not precompile the preamble "
+                        "(is mylatexformat installed?); compiling normally",
+                        level='warning'
+                    )
+                    return None
+                atomic_copy(built, fmt_file)
         
-        finally:
-            os.chdir(original_dir)
+        self._print(f"  Precompiled preamble: {fmt_file.name}")
+        return name
+    
+    def _figure_key(self, source: str, dpi: Optional[int] = None) -> str:
+        """Cache key for a standalone figure and the files it reads
+        (at ``dpi``, default: the resolution of this conversion).
+        
+        The data files are hashed once per run: the stage fingerprint and
+        the cache lookup share the key.
+        """
+        dpi = dpi or self.dpi
+        key = self.figure_keys.get((source, dpi))
+        if key is None:
+            key = self.figure_keys[source, dpi] = self._make_figure_key(source, dpi)
+        return key
+    
+    def _make_figure_key(self, source: str, dpi: int) -> str:
+        data_files = []
+        for name in self._referenced_files(source):
+            candidates = [directory / name for directory in self._tex_search_dirs()]
+            found = next((path for path in candidates if path.is_file()), None)
+            data_files.append(found or candidates[0])
+        backends = [f'{self.rasterizer.name} {self.rasterizer.version()}']
+        if self.optimizer is not None:
+            backends.append(self.optimizer.identity())
+        return FigureCache.make_key(source, data_files, dpi, FIGURE_TOOLS, backends=backends)
     
     def replace_tikz(self) -> None:
         """Step 4: Replace TikZ with images."""
-        self._step(4, "Replacing TikZ with images")
+        self._step(4, STAGES['replace_tikz'])
         
-        content = self.pandoc_path.read_text(encoding='utf-8')
-        labels = self._extract_labels(self.input_path.read_text(encoding='utf-8'))
-        label_list = list(labels.keys())
+        # Preprocessing leaves figures and labels alone, so the names match
+        # the ones extract_tikz gave the figures.
+        index = self._figure_index(self._pandoc_content())
+        names = [figure.name for figure in index.figures]
+        same_as = self._identical_figures(names) if self.optimizer is not None else {}
         
-        # Replace TikZ figures
-        tikz_pattern = r'\\begin\{tikzpicture\}.*?\\end\{tikzpicture\}'
-        counter = [0]
+        placeholder = self._placeholder(index) if self.draft else None
+        png_prefix = self.png_dir.relative_to(self.input_path.parent).as_posix()
         
-        def replace_func(match):
-            label_name = (
-                label_list[counter[0]]
-                if counter[0] < len(label_list)
-                else f'tikz-{counter[0]:02d}'
-            )
-            counter[0] += 1
-            png_filename = f'tikz_png/{label_name}.png'
+        def image(figure):
+            png_filename = f'{png_prefix}/{same_as.get(figure.name, figure.name)}.png'
+            if placeholder and not (self.png_dir / f'{figure.name}.png').exists():
+                png_filename = placeholder
             return (
                 f'\\begin{{center}}\n'
                 f'\\includegraphics[width=0.8\\textwidth]{{{png_filename}}}\n'
                 f'\\end{{center}}'
             )
         
-        new_content = re.sub(tikz_pattern, replace_func, content, flags=re.DOTALL)
-        self.images_path.write_text(new_content, encoding='utf-8')
+        new_content = index.replace(image)
+        self.images_text = new_content
+        output_name = self._write_intermediate(self.images_path, new_content)
+        
+        self._print(f"  Replaced {len(index.figures)} TikZ figures")
+        self._print(f"  Output: {output_name}")
+    
+    def _placeholder(self, index: FigureIndex) -> Optional[str]:
+        """Image shown for figures without a PNG in a draft, relative to the
+        document; None if every figure has one."""
+        missing = [
+            figure.name for figure in index.figures
+            if not (self.png_dir / f'{figure.name}.png').exists()
+        ]
+        if not missing:
+            return None
+        path = self.state_dir / 'placeholder.png'
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_bytes(path, placeholder_png())
+        self._print(f"  Placeholders for {len(missing)} figures without PNG: {', '.join(missing)}")
+        return path.relative_to(self.input_path.parent).as_posix()
+    
+    def _identical_figures(self, names: List[str]) -> Dict[str, str]:
+        """Map figures whose PNG duplicates an earlier one to that figure.
+        
+        Pandoc embeds every distinct image path once, so pointing duplicates
+        at the first copy stores each image once in the DOCX.
+        """
+        first: Dict[str, str] = {}
+        same_as: Dict[str, str] = {}
+        saved = 0
+        for name in dict.fromkeys(names):
+            png = self.png_dir / f'{name}.png'
+            if not png.is_file():
+                continue
+            data = png.read_bytes()
+            digest = hashlib.sha256(data).hexdigest()
+            if digest in first:
+                same_as[name] = first[digest]
+                saved += len(data)
+            else:
+                first[digest] = name
+        if same_as:
+            self.metrics.count('png_bytes_saved', saved)
+            self._print(
+                f"  Embedding {len(same_as)} duplicate figures once: "
+                f"saved {saved / 1024:,.1f} KB"
+            )
+        return same_as
+    
+    def convert_to_docx(self) -> dict:
+        """Step 5: Convert to DOCX.
+        
+        Returns:
+            Text and figure fingerprints of the DOCX, which let the next
+            run replace changed figures in place (see ``_update_figures``)
+        """
+        text = self._start_pandoc()
+        updated = self._update_figures(text)
+        if updated is not None:
+            return updated
+        document = split_document(text, self.jobs) if self.split_pandoc else None
+        if document is not None:
+            self._convert_parts(resolve_cross_references(document).sources())
+        else:
+            # The final LaTeX is streamed on stdin; pandoc runs in the project
+            # directory so relative \input and image paths still resolve.
+            self._check_pandoc(self._run_tool(
+                self._pandoc_command(),
+                self.output_path.name,
+                cwd=self.input_path.parent,
+                input=text.encode('utf-8')
+            ))
+        self._report_docx()
+        return self._docx_state(text)
+    
+    async def aconvert_to_docx(self) -> dict:
+        """Step 5 for ``arun``."""
+        if self.split_pandoc:
+            return await asyncio.to_thread(self.convert_to_docx)
+        text = self._start_pandoc()
+        updated = await asyncio.to_thread(self._update_figures, text)
+        if updated is not None:
+            return updated
+        self._check_pandoc(await self._arun_tool(
+            self._pandoc_command(),
+            self.output_path.name,
+            cwd=self.input_path.parent,
+            input=text.encode('utf-8')
+        ))
+        self._report_docx()
+        return await asyncio.to_thread(self._docx_state, text)
+    
+    def _docx_params(self) -> dict:
+        """Everything besides the text and images that shapes the DOCX."""
+        return {
+            'output': str(self.output_path),
+            'options': self._pandoc_options(),
+            'split': self.split_pandoc,
+            'sections': list(self.sections) if self.sections else None,
+            'pandoc': tool_version('pandoc'),
+        }
+    
+    def _docx_state(self, text: str) -> dict:
+        """Fingerprints of a freshly written DOCX and the figures in it.
+        
+        Each figure PNG is matched to the ``word/media`` entry pandoc
+        embedded it as by content (pandoc copies PNGs unchanged).
+        """
+        entries: Dict[str, List[str]] = {}
+        try:
+            for name, digest in media_digests(self.output_path).items():
+                entries.setdefault(digest, []).append(name)
+        except (OSError, zipfile.BadZipFile):
+            pass
+        figures = {}
+        for name in dict.fromkeys(FIGURE_IMAGE_PATTERN.findall(text)):
+            png = self.input_path.parent / name
+            if not png.is_file():
+                continue
+            data = png.read_bytes()
+            digest = hashlib.sha256(data).hexdigest()
+            figures[name] = {
+                'sha256': digest,
+                'size': png_size(data),
+                'entries': entries.get(digest, []),
+            }
+        return {'text': _text_hash(text), 'params': self._docx_params(), 'figures': figures}
+    
+    def _update_figures(self, text: str) -> Optional[dict]:
+        """Fast path: swap changed figure images inside the existing DOCX.
+        
+        Used when the previous DOCX was built from the same text with the
+        same options and has not been touched since, and every changed
+        figure keeps its aspect ratio (pandoc derives the displayed height
+        from it). Returns the new DOCX state, or None if pandoc must run.
+        """
+        previous = self.manifest.result('convert_to_docx')
+        if (
+            self.force
+            or not isinstance(previous, dict)
+            or previous.get('text') != _text_hash(text)
+            or previous.get('params') != self._docx_params()
+            or not self.output_path.exists()
+            or not self.manifest.outputs_intact('convert_to_docx')
+        ):
+            return None
+        # A figure that failed last time has no image in the DOCX yet
+        present = {
+            name for name in FIGURE_IMAGE_PATTERN.findall(text)
+            if (self.input_path.parent / name).is_file()
+        }
+        if present != set(previous['figures']):
+            return None
+        
+        replacements: Dict[str, bytes] = {}
+        figures = {}
+        changed = 0
+        for name, old in previous['figures'].items():
+            data = (self.input_path.parent / name).read_bytes()
+            digest = hashlib.sha256(data).hexdigest()
+            figures[name] = dict(old, sha256=digest, size=png_size(data))
+            if digest == old['sha256']:
+                continue
+            changed += 1
+            size, old_size = png_size(data), old['size']
+            if not old['entries'] or size is None or old_size is None:
+                return None
+            if size[0] * old_size[1] != size[1] * old_size[0]:
+                return None
+            for entry in old['entries']:
+                replacements[entry] = data
+        # An entry shared by several figures can only change if all of them do
+        for figure in figures.values():
+            for entry in figure['entries']:
+                if entry in replacements and hashlib.sha256(replacements[entry]).hexdigest() != figure['sha256']:
+                    return None
         
-        self._print(f"  Replaced {counter[0]} TikZ figures")
-        self._print(f"  Output: {self.images_path.name}")
+        if replacements:
+            replace_members(self.output_path, replacements, self.output_path)
+        self._print(f"  Text unchanged: replaced {changed} figures in the existing DOCX")
+        self._report_docx()
+        return {'text': previous['text'], 'params': previous['params'], 'figures': figures}
     
-    def convert_to_docx(self) -> None:
-        """Step 5: Convert to DOCX."""
-        self._step(5, "Converting to DOCX")
+    def _start_pandoc(self) -> str:
+        """Announce step 5; return the final LaTeX."""
+        self._step(5, STAGES['convert_to_docx'])
         
         self._print("  Running pandoc with options:")
         self._print("    - Number sections")
-        self._print("    - Table of contents")
+        if not self.draft:
+            self._print("    - Table of contents")
         self._print("    - Standalone document")
+        text = self._images_content()
+        if self.sections:
+            first, last = self.sections
+            text = select_sections(text, first, last)
+            if text is None:
+                raise ValueError(f"The document has no section {first} to convert")
+            self._print(f"  Converting sections {first}-{last} only")
+        return text
+    
+    def _pandoc_command(self) -> List[str]:
+        """Single pandoc run reading the final LaTeX from stdin."""
+        return [
+            'pandoc', '--from=latex', '-o', str(self.output_path.absolute()),
+            *self._pandoc_options()
+        ]
+    
+    def _check_pandoc(self, result: ToolRun) -> None:
+        """Save pandoc's log and fail if it produced no DOCX."""
+        atomic_write_text(self.pandoc_log, result.stdout + result.stderr)
+        if result.returncode != 0 or not self.output_path.exists():
+            raise RuntimeError("Pandoc conversion failed")
+    
+    def _report_docx(self) -> None:
+        """Print the size of the finished DOCX."""
+        file_size = self.output_path.stat().st_size
+        self.metrics.count('bytes_written', file_size)
+        file_size_mb = file_size / (1024 * 1024)
+        self._print(f"  ✓ Conversion successful")
+        self._print(f"    Output: {self.output_path.name} ({file_size_mb:.2f} MB)")
+    
+    def _convert_parts(self, sources: List[str]) -> None:
+        """Run pandoc on document parts in parallel and merge the results.
         
-        cmd = [
-            'pandoc', str(self.images_path), '-o', str(self.output_path),
+        Only the first part gets the table of contents; its field is
+        refreshed by Word over the whole merged document.
+        """
+        self._print(f"  Split into {len(sources)} parts for parallel pandoc runs")
+        
+        with tempfile.TemporaryDirectory(prefix='latex2docx-') as scratch:
+            outputs = [Path(scratch) / f'part-{index:03d}.docx' for index in range(len(sources))]
+            
+            def convert(index: int) -> ToolRun:
+                options = self._pandoc_options()
+                if index > 0 and '--toc' in options:
+                    options.remove('--toc')
+                return self._run_tool(
+                    ['pandoc', '--from=latex', '-o', str(outputs[index]), *options],
+                    f'part {index + 1}/{len(sources)}',
+                    cwd=self.input_path.parent,
+                    input=sources[index].encode('utf-8')
+                )
+            
+            results = self._map(convert, list(range(len(sources))))
+            atomic_write_text(self.pandoc_log, ''.join(
+                f'=== part {index + 1}/{len(sources)} ===\n{result.stdout}{result.stderr}'
+                for index, result in enumerate(results)
+            ))
+            for index, (result, output) in enumerate(zip(results, outputs), 1):
+                if result.returncode != 0 or not output.exists():
+                    raise RuntimeError(f"Pandoc conversion failed (part {index}/{len(sources)})")
+            
+            merge_docx(outputs, self.output_path)
+    
+    def _pandoc_options(self) -> List[str]:
+        """Pandoc options shared by every conversion (drafts have no
+        table of contents)."""
+        options = [
             f'--resource-path={self.input_path.parent}:tikz_png:data:figures',
             '--number-sections',
             '--toc',
             '--standalone'
         ]
+        if self.draft:
+            options.remove('--toc')
+        return options
+    
+    def _stage_inputs(self, stage: str) -> Tuple[List[Path], object]:
+        """Files and parameters that determine a stage's output."""
+        # Source files are fingerprinted from the texts read for this run
+        # rather than opened and hashed again for every stage.
+        if stage == 'preprocess_tex':
+            return [], self._source_fingerprints()
+        if stage == 'extract_tikz':
+            return [], self._source_fingerprints()
+        if stage == 'compile_tikz':
+            # Figure cache keys already cover sources, data files, DPI and
+            # tool versions.
+            keys = {
+                path.name: self._figure_key(self._figure_source(path))
+                for path in self.figure_files or []
+            }
+            return [], keys
+        if stage == 'replace_tikz':
+            inputs = []
+            if self.optimizer is not None or self.draft:
+                # Duplicate detection depends on the PNG contents, draft
+                # placeholders on which PNGs exist
+                inputs = sorted(self.png_dir.glob('*.png'))
+            params = {'sources': self._source_fingerprints(), 'text': _text_hash(self._pandoc_content())}
+            if self.draft:
+                params['draft'] = True
+            return inputs, params
+        # convert_to_docx: final LaTeX, the images it embeds, pandoc setup
+        text = self._images_content()
+        inputs = []
+        search = [self.input_path.parent / d for d in ('', 'tikz_png', 'data', 'figures')]
+        for name in self._referenced_files(text):
+            candidates = [directory / name for directory in search]
+            inputs.append(next((p for p in candidates if p.is_file()), candidates[0]))
+        return inputs, {'text': _text_hash(text), **self._docx_params()}
+    
+    def _stage_outputs(self, stage: str) -> List[Path]:
+        """Files a finished stage produced."""
+        if stage == 'preprocess_tex':
+            return [self.pandoc_path] if self.keep_intermediates else []
+        if stage == 'extract_tikz':
+            return list(self.figure_files or [])
+        if stage == 'compile_tikz':
+            pngs = [self.png_dir / f'{path.stem}.png' for path in self.figure_files or []]
+            return [png for png in pngs if png.exists()]
+        if stage == 'replace_tikz':
+            return [self.images_path] if self.keep_intermediates else []
+        return [self.output_path]
+    
+    def _run_stage(self, stage: str):
+        """Run a pipeline stage unless its fingerprint is unchanged."""
+        with self.metrics.stage(stage) as details:
+            fingerprint = self._stage_fingerprint(stage)
+            if self._skip_stage(stage, fingerprint, details):
+                return self.manifest.result(stage)
+            
+            try:
+                result = getattr(self, stage)()
+            except BaseException:
+                self.manifest.invalidate(stage)
+                raise
         
-        log_file = self.input_path.parent / 'pandoc_conversion.log'
-        with open(log_file, 'w') as log:
-            result = subprocess.run(cmd, stdout=log, stderr=log)
+        self._record_stage(stage, fingerprint, result)
+        return result
+    
+    async def _arun_stage(self, stage: str):
+        """``_run_stage`` for ``arun``: stages with an asyncio variant
+        (``a<stage>``) run on the event loop, the others on a thread."""
+        with self.metrics.stage(stage) as details:
+            fingerprint = await asyncio.to_thread(self._stage_fingerprint, stage)
+            if self._skip_stage(stage, fingerprint, details):
+                return self.manifest.result(stage)
+            
+            try:
+                method = getattr(self, f'a{stage}', None)
+                if method is not None:
+                    result = await method()
+                else:
+                    result = await asyncio.to_thread(getattr(self, stage))
+            except BaseException:
+                self.manifest.invalidate(stage)
+                raise
         
-        if result.returncode == 0 and self.output_path.exists():
-            file_size = self.output_path.stat().st_size
-            file_size_mb = file_size / (1024 * 1024)
-            self._print(f"  ✓ Conversion successful")
-            self._print(f"    Output: {self.output_path.name} ({file_size_mb:.2f} MB)")
+        self._record_stage(stage, fingerprint, result)
+        return result
+    
+    def _stage_fingerprint(self, stage: str) -> str:
+        """Fingerprint of a stage's current inputs."""
+        inputs, params = self._stage_inputs(stage)
+        return StageManifest.fingerprint(inputs, params)
+    
+    def _skip_stage(self, stage: str, fingerprint: str, details: dict) -> bool:
+        """True (after restoring its results) if a stage is up to date."""
+        # Text stages kept in memory have nothing to reload, so they rerun
+        in_memory = stage in TEXT_STAGES and not self.keep_intermediates
+        if self.force or in_memory or not self.manifest.is_current(stage, fingerprint):
+            return False
+        details['skipped'] = True
+        step_num = list(STAGES).index(stage) + 1
+        self._step(step_num, f"{STAGES[stage]} (up to date, skipped)")
+        if stage == 'extract_tikz':
+            self.figure_files = self.manifest.outputs(stage)
+        return True
+    
+    def _record_stage(self, stage: str, fingerprint: str, result) -> None:
+        """Remember a finished stage in the manifest."""
+        # Figures that failed are retried next time rather than skipped
+        if stage == 'compile_tikz' and result < len(self.figure_files or []):
+            self.manifest.invalidate(stage)
         else:
-            raise RuntimeError("Pandoc conversion failed")
+            self.manifest.record(stage, fingerprint, self._stage_outputs(stage), result)
+    
+    def release_texts(self) -> None:
+        """Drop the document texts kept from the last run.
+        
+        The stage manifest and the preprocessed text of each source file
+        still in the document are kept, so the next run only reprocesses
+        the files that changed.
+        """
+        if self.project is not None:
+            self.preprocessed = {
+                path: entry for path, entry in self.preprocessed.items()
+                if path in self.project.files
+            }
+        self.project = None
+        self.source_text = self.pandoc_text = self.images_text = None
+        self.figure_indexes = {}
+        self.figure_sources = {}
+        self.figure_keys = {}
+        self.timing_keys = {}
+    
+    def run_stages(self) -> None:
+        """Run the five pipeline steps, skipping those that are current."""
+        self.project = None
+        self.source_text = self.pandoc_text = self.images_text = None
+        self.figure_indexes = {}
+        self.figure_sources = {}
+        self.figure_keys = {}
+        self.timing_keys = {}
+        for stage in STAGES:
+            self._run_stage(stage)
+    
+    async def arun_stages(self) -> None:
+        """``run_stages`` for asyncio callers.
+        
+        External tools run through ``asyncio.create_subprocess_exec``;
+        figures stream from pdflatex to the rasterizer one by one, at most
+        ``jobs`` at a time, and the Python-side work runs on threads so the
+        event loop stays responsive.
+        """
+        self.project = None
+        self.source_text = self.pandoc_text = self.images_text = None
+        self.figure_indexes = {}
+        self.figure_sources = {}
+        self.figure_keys = {}
+        self.timing_keys = {}
+        for stage in STAGES:
+            await self._arun_stage(stage)
     
     def cleanup(self) -> None:
         """Clean up intermediate files."""
@@ -358,43 +1656,103 @@ class TexConverter:
         
         for path in [self.tikz_dir, self.png_dir]:
             if path.exists():
-                self._print(f"  Removing {path.name}/")
+                self._print(f"  Removing {path.parent.name}/{path.name}/")
                 shutil.rmtree(path)
+            try:
+                # Only once no other document's figures are left in it
+                path.parent.rmdir()
+            except OSError:
+                pass
         
-        for file in [self.pandoc_path, self.images_path]:
+        # Only this document's files: others in the directory may be running
+        for file in [self.pandoc_path, self.images_path, self.pandoc_log]:
             if file.exists():
                 self._print(f"  Removing {file.name}")
                 file.unlink()
         
-        for log_file in ['compile.log', 'pandoc_conversion.log']:
-            path = self.input_path.parent / log_file
+        # Step state of this document in .latex2docx/ (as --clean-only removes)
+        timings_lock = self.timings.path.with_name(self.timings.path.name + '.lock')
+        for path in [self.manifest.path, self.timings.path, timings_lock]:
             if path.exists():
-                self._print(f"  Removing {log_file}")
+                self._print(f"  Removing {self.state_dir.name}/{path.name}")
                 path.unlink()
+        self.manifest.stages = {}
+        self.timings.figures = {}
+        
+        # The draft placeholder is shared, so it goes with the last document
+        placeholder = self.state_dir / 'placeholder.png'
+        if placeholder.exists() and list(self.state_dir.iterdir()) == [placeholder]:
+            self._print(f"  Removing {self.state_dir.name}/{placeholder.name}")
+            placeholder.unlink()
+        try:
+            self.state_dir.rmdir()
+        except OSError:
+            pass
     
-    def run(self) -> int:
-        """Execute complete conversion pipeline."""
+    def run(self, profile: bool = False, metrics_json: Optional[str | Path] = None) -> int:
+        """
+        Execute complete conversion pipeline.
+        
+        Args:
+            profile: Print stage and external process timings at the end
+            metrics_json: Write the metrics summary here and a Chrome
+                trace-event file next to it (``<stem>.trace.json``)
+        """
         try:
-            self.preprocess_tex()
-            self.extract_tikz()
-            self.compile_tikz()
-            self.replace_tikz()
-            self.convert_to_docx()
-            
-            if self.clean_after:
-                self.cleanup()
-            
-            # Print completion
-            self._print("\n" + "=" * 50)
-            self._print("  Conversion Complete")
-            self._print("=" * 50)
-            self._print(f"\nOutput: {self.output_path}")
-            if self.output_path.exists():
-                file_size = self.output_path.stat().st_size
-                self._print(f"Size: {file_size:,} bytes\n")
-            
+            self.run_stages()
+            self._finish()
+            return 0
+        
+        except Exception as e:
+            self._print(f"\nError: {str(e)}", level='error')
+            return 1
+        
+        finally:
+            self._report_metrics(profile, metrics_json)
+    
+    async def arun(self, profile: bool = False, metrics_json: Optional[str | Path] = None) -> int:
+        """
+        ``run`` as a coroutine, for embedding in asyncio applications.
+        
+        Args:
+            profile: Print stage and external process timings at the end
+            metrics_json: Write the metrics summary here and a Chrome
+                trace-event file next to it (``<stem>.trace.json``)
+        """
+        try:
+            await self.arun_stages()
+            await asyncio.to_thread(self._finish)
             return 0
         
         except Exception as e:
             self._print(f"\nError: {str(e)}", level='error')
             return 1
+        
+        finally:
+            self._report_metrics(profile, metrics_json)
+    
+    def _finish(self) -> None:
+        """Clean up if requested and print the completion banner."""
+        if self.clean_after:
+            self.cleanup()
+        
+        # Print completion
+        self._print("\n" + "=" * 50)
+        self._print("  Conversion Complete")
+        self._print("=" * 50)
+        self._print(f"\nOutput: {self.output_path}")
+        if self.output_path.exists():
+            file_size = self.output_path.stat().st_size
+            self._print(f"Size: {file_size:,} bytes\n")
+    
+    def _report_metrics(self, profile: bool, metrics_json: Optional[str | Path]) -> None:
+        """Print and/or export the collected metrics."""
+        if profile:
+            self._print("\n" + "=" * 50)
+            self._print("  Profile")
+            self._print("=" * 50)
+            for line in self.metrics.report_lines():
+                self._print(line)
+        if metrics_json:
+            trace_path = self.metrics.write_json(Path(metrics_json))
+            self._print(f"\nMetrics: {metrics_json} (trace: {trace_path})")
@@ -0,0 +1,275 @@
+"""
+Merging DOCX files produced by pandoc for consecutive parts of one document.
+"""
+
+import io
+import re
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from latex2docx.cache import atomic_write_bytes
+
+DOCUMENT = 'word/document.xml'
+DOCUMENT_RELS = 'word/_rels/document.xml.rels'
+NUMBERING = 'word/numbering.xml'
+FOOTNOTES = 'word/footnotes.xml'
+FOOTNOTES_RELS = 'word/_rels/footnotes.xml.rels'
+CONTENT_TYPES = '[Content_Types].xml'
+
+# Relationship types owned by a part's content (the others, such as
+# styles, numbering and settings, are shared and come from the first part)
+CONTENT_REL_TYPES = ('/image', '/hyperlink')
+
+RELATIONSHIP_PATTERN = re.compile(r'<Relationship\b[^>]*?/>')
+SECTION_NUMBER_PATTERN = re.compile(
+    r'(<w:rStyle w:val="SectionNumber"\s*/>\s*</w:rPr>\s*<w:t(?:\s[^>]*)?>)'
+    r'(\d+(?:\.\d+)*)(</w:t>)'
+)
+
+
+def _attribute(element: str, name: str) -> str:
+    """Value of attribute ``name`` in an XML start tag ('' if absent)."""
+    match = re.search(rf'\b{name}="([^"]*)"', element)
+    return match.group(1) if match else ''
+
+
+def _max_id(xml: str, pattern: str) -> int:
+    """Largest integer captured by ``pattern`` in ``xml`` (0 if none)."""
+    return max((int(value) for value in re.findall(pattern, xml)), default=0)
+
+
+def _body(document_xml: str) -> Tuple[str, str, str]:
+    """Split document.xml into (head, body content, final sectPr + tail)."""
+    start = document_xml.index('<w:body>') + len('<w:body>')
+    end = document_xml.rindex('</w:body>')
+    body = document_xml[start:end]
+    sect = body.rfind('<w:sectPr')
+    if sect < 0:
+        sect = len(body)
+    return document_xml[:start], body[:sect], body[sect:] + document_xml[end:]
+
+
+class _PartRebaser:
+    """Renames the ids of one part so they cannot clash with the merged file."""
+    
+    def __init__(self, index: int, offsets: Dict[str, int], num_map: Dict[str, str]):
+        self.prefix = f'p{index}'
+        self.offsets = offsets
+        self.num_map = num_map
+        self.rel_ids: Dict[str, str] = {}
+    
+    def rel_id(self, rel_id: str) -> str:
+        """New id of a relationship (unchanged if it is shared)."""
+        return self.rel_ids.get(rel_id, rel_id)
+    
+    def content(self, xml: str) -> str:
+        """Rewrite relationship, list, footnote, bookmark and drawing ids."""
+        xml = re.sub(
+            r'\b(r:(?:id|embed|link|pict))="([^"]*)"',
+            lambda m: f'{m.group(1)}="{self.rel_id(m.group(2))}"', xml
+        )
+        xml = re.sub(
+            r'(<w:numId w:val=")(\d+)(")',
+            lambda m: m.group(1) + self.num_map.get(m.group(2), m.group(2)) + m.group(3), xml
+        )
+        for pattern, key in (
+            (r'(<w:footnoteReference w:id=")(\d+)(")', 'footnote'),
+            (r'(<w:bookmark(?:Start|End) w:id=")(\d+)(")', 'bookmark'),
+            (r'(<wp:docPr id=")(\d+)(")', 'drawing'),
+        ):
+            xml = re.sub(
+                pattern,
+                lambda m, key=key: f'{m.group(1)}{int(m.group(2)) + self.offsets[key]}{m.group(3)}',
+                xml
+            )
+        return xml
+
+
+def _merge_relationships(base_rels: str, part_rels: str, rebaser: _PartRebaser,
+                         media: Dict[str, str]) -> str:
+    """Append a part's image and hyperlink relationships under new ids."""
+    added = []
+    for element in RELATIONSHIP_PATTERN.findall(part_rels):
+        if not _attribute(element, 'Type').endswith(CONTENT_REL_TYPES):
+            continue
+        old_id = _attribute(element, 'Id')
+        new_id = f'{rebaser.prefix}{old_id}'
+        rebaser.rel_ids[old_id] = new_id
+        element = element.replace(f'Id="{old_id}"', f'Id="{new_id}"', 1)
+        target = _attribute(element, 'Target')
+        if target.startswith('media/') and _attribute(element, 'TargetMode') != 'External':
+            renamed = f'media/{rebaser.prefix}-{target[len("media/"):]}'
+            media[f'word/{target}'] = f'word/{renamed}'
+            element = element.replace(f'Target="{target}"', f'Target="{renamed}"', 1)
+        added.append(element)
+    return base_rels.replace('</Relationships>', ''.join(added) + '</Relationships>')
+
+
+def _merge_numbering(base: str, part: str, offsets: Dict[str, int]) -> Tuple[str, Dict[str, str]]:
+    """Append a part's list definitions; returns (numbering xml, numId map)."""
+    abstract_offset = offsets['abstract']
+    num_offset = offsets['num']
+    abstracts = []
+    for block in re.findall(r'<w:abstractNum\b.*?</w:abstractNum>', part, re.DOTALL):
+        abstracts.append(re.sub(
+            r'(w:abstractNumId=")(\d+)(")',
+            lambda m: f'{m.group(1)}{int(m.group(2)) + abstract_offset}{m.group(3)}',
+            block, count=1
+        ))
+    nums = []
+    num_map = {}
+    for block in re.findall(r'<w:num\b.*?</w:num>', part, re.DOTALL):
+        old = _attribute(block, 'w:numId')
+        num_map[old] = str(int(old) + num_offset)
+        block = block.replace(f'w:numId="{old}"', f'w:numId="{num_map[old]}"', 1)
+        nums.append(re.sub(
+            r'(<w:abstractNumId w:val=")(\d+)(")',
+            lambda m: f'{m.group(1)}{int(m.group(2)) + abstract_offset}{m.group(3)}',
+            block
+        ))
+    # Schema order: every abstractNum before the first num
+    first_num = re.search(r'<w:num\b', base)
+    insert_at = first_num.start() if first_num else base.rindex('</w:numbering>')
+    base = base[:insert_at] + ''.join(abstracts) + base[insert_at:]
+    end = base.rindex('</w:numbering>')
+    return base[:end] + ''.join(nums) + base[end:], num_map
+
+
+def _merge_footnotes(base: str, part: str, rebaser: _PartRebaser) -> str:
+    """Append a part's footnotes (separators excluded) under new ids."""
+    notes = []
+    for block in re.findall(r'<w:footnote\b[^>]*>.*?</w:footnote>', part, re.DOTALL):
+        opening = block[:block.index('>')]
+        if 'w:type=' in opening:
+            continue
+        old = int(_attribute(opening, 'w:id'))
+        block = block.replace(
+            f'w:id="{old}"', f'w:id="{old + rebaser.offsets["footnote"]}"', 1
+        )
+        notes.append(rebaser.content(block))
+    end = base.rindex('</w:footnotes>')
+    return base[:end] + ''.join(notes) + base[end:]
+
+
+def _merge_content_types(base: str, part: str, media: Dict[str, str]) -> str:
+    """Add file extensions and media overrides the part needs."""
+    known = set(re.findall(r'<Default Extension="([^"]*)"', base))
+    added = []
+    for element in re.findall(r'<Default\b[^>]*/>', part):
+        extension = _attribute(element, 'Extension')
+        if extension not in known:
+            known.add(extension)
+            added.append(element)
+    for element in re.findall(r'<Override\b[^>]*/>', part):
+        name = _attribute(element, 'PartName').lstrip('/')
+        if name in media:
+            added.append(element.replace(f'PartName="/{name}"', f'PartName="/{media[name]}"', 1))
+    return base.replace('</Types>', ''.join(added) + '</Types>')
+
+
+def renumber_sections(document_xml: str) -> str:
+    """
+    Make pandoc's heading numbers continuous across merged parts.
+    
+    Each part numbers its headings from 1; the depth of a number (1, 1.2,
+    1.2.3) gives its level, so the numbers are simply recounted in order.
+    Unnumbered headings carry no number and are left alone.
+    """
+    counters: List[int] = []
+    
+    def replace(match):
+        depth = match.group(2).count('.') + 1
+        while len(counters) < depth:
+            counters.append(0)
+        del counters[depth:]
+        counters[depth - 1] += 1
+        return match.group(1) + '.'.join(str(count) for count in counters) + match.group(3)
+    
+    return SECTION_NUMBER_PATTERN.sub(replace, document_xml)
+
+
+def merge_docx(parts: List[Path], output: Path) -> None:
+    """
+    Merge DOCX files of consecutive document parts into ``output``.
+    
+    The first part provides styles, settings, the title block and the table
+    of contents (a field Word refreshes on opening, so it covers all parts).
+    Later parts contribute their body, footnotes, list definitions, images
+    and links under renamed ids. Heading numbers are made continuous.
+    """
+    with zipfile.ZipFile(parts[0]) as base_zip:
+        names = base_zip.namelist()
+        files = {name: base_zip.read(name) for name in names}
+    
+    def text(name: str):
+        return files[name].decode('utf-8') if name in files else None
+    
+    head, body, tail = _body(text(DOCUMENT))
+    bodies = [body]
+    rels = text(DOCUMENT_RELS)
+    footnote_rels = text(FOOTNOTES_RELS)
+    numbering = text(NUMBERING)
+    footnotes = text(FOOTNOTES)
+    content_types = text(CONTENT_TYPES)
+    added_media: Dict[str, bytes] = {}
+    
+    for index, part_path in enumerate(parts[1:], 1):
+        with zipfile.ZipFile(part_path) as part_zip:
+            part = {name: part_zip.read(name) for name in part_zip.namelist()}
+        
+        def part_text(name: str) -> str:
+            return part[name].decode('utf-8') if name in part else ''
+        
+        merged_so_far = ''.join(bodies)
+        offsets = {
+            'footnote': _max_id(footnotes or '', r'<w:footnote\b[^>]*w:id="(\d+)"'),
+            'bookmark': _max_id(merged_so_far, r'<w:bookmarkStart w:id="(\d+)"') + 1,
+            'drawing': _max_id(merged_so_far, r'<wp:docPr id="(\d+)"'),
+            'abstract': _max_id(numbering or '', r'w:abstractNumId="(\d+)"') + 1,
+            'num': _max_id(numbering or '', r'<w:num w:numId="(\d+)"'),
+        }
+        num_map = {}
+        if numbering is not None and NUMBERING in part:
+            numbering, num_map = _merge_numbering(numbering, part_text(NUMBERING), offsets)
+        rebaser = _PartRebaser(index, offsets, num_map)
+        
+        media: Dict[str, str] = {}
+        rels = _merge_relationships(rels, part_text(DOCUMENT_RELS), rebaser, media)
+        if FOOTNOTES_RELS in part:
+            if footnote_rels is None:
+                # Empty relationship list with the part's XML declaration
+                opening = part_text(FOOTNOTES_RELS).split('<Relationship ')[0]
+                footnote_rels = opening.replace('</Relationships>', '') + '</Relationships>'
+            footnote_rels = _merge_relationships(
+                footnote_rels, part_text(FOOTNOTES_RELS), rebaser, media
+            )
+        for old_name, new_name in media.items():
+            if old_name in part:
+                added_media[new_name] = part[old_name]
+        content_types = _merge_content_types(content_types, part_text(CONTENT_TYPES), media)
+        
+        _, part_body, _ = _body(part_text(DOCUMENT))
+        bodies.append(rebaser.content(part_body))
+        if footnotes is not None and FOOTNOTES in part:
+            footnotes = _merge_footnotes(footnotes, part_text(FOOTNOTES), rebaser)
+    
+    files[DOCUMENT] = renumber_sections(head + ''.join(bodies) + tail).encode('utf-8')
+    files[DOCUMENT_RELS] = rels.encode('utf-8')
+    files[CONTENT_TYPES] = content_types.encode('utf-8')
+    if numbering is not None:
+        files[NUMBERING] = numbering.encode('utf-8')
+    if footnotes is not None:
+        files[FOOTNOTES] = footnotes.encode('utf-8')
+    if footnote_rels is not None:
+        files[FOOTNOTES_RELS] = footnote_rels.encode('utf-8')
+        if FOOTNOTES_RELS not in names:
+            names.append(FOOTNOTES_RELS)
+    names += added_media
+    files.update(added_media)
+    
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as out:
+        for name in names:
+            out.writestr(name, files[name])
+    atomic_write_bytes(output, buffer.getvalue())
@@ -0,0 +1,103 @@
+"""
+Replacing images inside an existing DOCX without rerunning pandoc.
+"""
+
+import hashlib
+import io
+import struct
+import zipfile
+import zlib
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from latex2docx.cache import atomic_write_bytes
+
+MEDIA_PREFIX = 'word/media/'
+
+LOCAL_HEADER = struct.Struct('<4sHHHHHLLLHH')
+CENTRAL_HEADER = struct.Struct('<4sBBHHHHHLLLHHHHHLL')
+END_OF_DIRECTORY = struct.Struct('<4sHHHHLLH')
+
+# Flag bit 3: sizes and CRC follow the data instead of the local header
+DATA_DESCRIPTOR_FLAG = 0x08
+UTF8_FLAG = 0x800
+
+
+def png_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """(width, height) from a PNG's header, or None if it is not a PNG."""
+    if len(data) < 24 or data[:8] != b'\x89PNG\r\n\x1a\n' or data[12:16] != b'IHDR':
+        return None
+    return struct.unpack('>II', data[16:24])
+
+
+def media_digests(docx: Path) -> Dict[str, str]:
+    """SHA-256 of every ``word/media`` entry of a DOCX, by entry name."""
+    with zipfile.ZipFile(docx) as archive:
+        return {
+            name: hashlib.sha256(archive.read(name)).hexdigest()
+            for name in archive.namelist()
+            if name.startswith(MEDIA_PREFIX)
+        }
+
+
+def _dos_date_time(date_time: tuple) -> Tuple[int, int]:
+    year, month, day, hour, minute, second = date_time
+    return (hour << 11) | (minute << 5) | (second // 2), ((year - 1980) << 9) | (month << 5) | day
+
+
+def replace_members(docx: Path, replacements: Dict[str, bytes], output: Path) -> None:
+    """
+    Write ``docx`` to ``output`` with some members replaced.
+    
+    Members that are not replaced are copied as their compressed bytes, so
+    nothing is decompressed or deflated again; replacements (images, which
+    do not compress) are stored.
+    
+    Raises:
+        KeyError: If a replaced member does not exist
+        ValueError: If the archive needs ZIP64 (over 4 GB)
+    """
+    buffer = io.BytesIO()
+    directory = []
+    with open(docx, 'rb') as handle, zipfile.ZipFile(handle) as archive:
+        infos = archive.infolist()
+        missing = set(replacements) - {info.filename for info in infos}
+        if missing:
+            raise KeyError(f"Not in {docx.name}: {', '.join(sorted(missing))}")
+        for info in infos:
+            if info.file_size >= 0xFFFFFFFF or info.header_offset >= 0xFFFFFFFF:
+                raise ValueError("ZIP64 archives are not supported")
+            name = info.filename.encode('utf-8' if info.flag_bits & UTF8_FLAG else 'cp437')
+            if info.filename in replacements:
+                data = replacements[info.filename]
+                method = zipfile.ZIP_STORED
+                crc = zlib.crc32(data)
+                size = compressed_size = len(data)
+            else:
+                handle.seek(info.header_offset)
+                header = LOCAL_HEADER.unpack(handle.read(LOCAL_HEADER.size))
+                handle.seek(info.header_offset + LOCAL_HEADER.size + header[9] + header[10])
+                data = handle.read(info.compress_size)
+                method = info.compress_type
+                crc, size, compressed_size = info.CRC, info.file_size, info.compress_size
+            flags = info.flag_bits & ~DATA_DESCRIPTOR_FLAG
+            time, date = _dos_date_time(info.date_time)
+            offset = buffer.tell()
+            buffer.write(LOCAL_HEADER.pack(
+                b'PK\x03\x04', info.extract_version, flags, method, time, date,
+                crc, compressed_size, size, len(name), 0
+            ))
+            buffer.write(name)
+            buffer.write(data)
+            directory.append(CENTRAL_HEADER.pack(
+                b'PK\x01\x02', info.create_version, info.create_system,
+                info.extract_version, flags, method, time, date,
+                crc, compressed_size, size, len(name), 0, 0, 0,
+                info.internal_attr, info.external_attr, offset
+            ) + name)
+    start = buffer.tell()
+    buffer.write(b''.join(directory))
+    buffer.write(END_OF_DIRECTORY.pack(
+        b'PK\x05\x06', 0, 0, len(directory), len(directory), buffer.tell() - start, start, 0
+    ))
+    atomic_write_bytes(output, buffer.getvalue())
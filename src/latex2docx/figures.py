@@ -0,0 +1,111 @@
+"""
+Index of the TikZ figures of a document, built in one pass.
+"""
+
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+# Tokens of one scan: figure/subfigure/wrapfigure boundaries, whole tikzpictures
+# (their contents are not scanned further) and figure labels
+FIGURE_TOKEN_PATTERN = re.compile(
+    r'\\begin\{(?P<begin>(?:sub|wrap)?figure\*?)\}'
+    r'|\\end\{(?P<end>(?:sub|wrap)?figure\*?)\}'
+    r'|(?P<tikz>\\begin\{tikzpicture\}.*?\\end\{tikzpicture\})'
+    r'|\\label\{fig:(?P<label>[^}]+)\}',
+    re.DOTALL,
+)
+
+
+@dataclass(frozen=True)
+class TikzFigure:
+    """One tikzpicture and the name its standalone file and PNG get."""
+    
+    number: int  # 1-based position in the document
+    name: str  # own label, else tikz-NN
+    label: Optional[str]  # \label{fig:...} of the enclosing figure, without fig:
+    start: int  # span of \begin{tikzpicture} ... \end{tikzpicture}
+    end: int
+    digest: str  # SHA-256 of the TikZ code
+
+
+@dataclass
+class FigureIndex:
+    """TikZ figures of one text, in document order."""
+    
+    text: str
+    figures: List[TikzFigure]
+    labels: List[str]  # every \label{fig:...}, without fig:
+    
+    def code(self, figure: TikzFigure) -> str:
+        """TikZ code of ``figure``."""
+        return self.text[figure.start:figure.end]
+    
+    def replace(self, replacement: Callable[[TikzFigure], str]) -> str:
+        """The text with every tikzpicture replaced by ``replacement(figure)``."""
+        pieces = []
+        position = 0
+        for figure in self.figures:
+            pieces.append(self.text[position:figure.start])
+            pieces.append(replacement(figure))
+            position = figure.end
+        pieces.append(self.text[position:])
+        return ''.join(pieces)
+
+
+def _claim_labels(frame: list, figures: list, parent: Optional[list]) -> None:
+    """Name the pictures of a closed environment after its labels.
+    
+    The k-th picture gets the k-th label; pictures left over (e.g. unlabeled
+    subfigures) move up to the enclosing environment.
+    """
+    pictures, labels = frame
+    for index, label in zip(pictures, labels):
+        figures[index][1] = label
+    if parent is not None:
+        parent[0].extend(pictures[len(labels):])
+
+
+def index_figures(text: str) -> FigureIndex:
+    """
+    Find the tikzpictures of ``text`` and the label each one belongs to.
+    
+    A picture is named after the ``\\label{fig:...}`` of its own figure
+    environment (innermost first), never after a label elsewhere in the
+    document; pictures without one, and pictures whose label is already
+    taken, are named ``tikz-NN`` after their position.
+    """
+    # [match, label] per picture; open environments as [picture indices, labels]
+    found: List[list] = []
+    labels: List[str] = []
+    stack: List[list] = []
+    for match in FIGURE_TOKEN_PATTERN.finditer(text):
+        if match.group('begin'):
+            stack.append([[], []])
+        elif match.group('end'):
+            if stack:
+                frame = stack.pop()
+                _claim_labels(frame, found, stack[-1] if stack else None)
+        elif match.group('tikz'):
+            if stack:
+                stack[-1][0].append(len(found))
+            found.append([match, None])
+        else:
+            labels.append(match.group('label'))
+            if stack:
+                stack[-1][1].append(match.group('label'))
+    while stack:
+        frame = stack.pop()
+        _claim_labels(frame, found, stack[-1] if stack else None)
+    
+    figures = []
+    names = set()
+    for number, (match, label) in enumerate(found, 1):
+        name = label if label is not None and label not in names else f'tikz-{number:02d}'
+        names.add(name)
+        figures.append(TikzFigure(
+            number, name, label, match.start(), match.end(),
+            hashlib.sha256(match.group().encode('utf-8')).hexdigest(),
+        ))
+    return FigureIndex(text, figures, labels)
@@ -0,0 +1,120 @@
+"""
+Compile-time history of figures, for scheduling the slowest ones first.
+"""
+
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from latex2docx.cache import atomic_write_text, file_lock
+from latex2docx.figures import index_figures
+
+# Bump when the layout changes so old histories are ignored.
+HISTORY_VERSION = 1
+
+# Cost model for figures without history, in seconds: pdflatex startup,
+# plus the size of the code, plus every plot (pgfplots dominates)
+BASE_SECONDS = 1.0
+SECONDS_PER_KB = 0.05
+SECONDS_PER_PLOT = 0.5
+
+PLOT_PATTERN = re.compile(r'\\addplot')
+
+
+def estimate_seconds(source: str) -> float:
+    """Guess how long a figure never compiled before takes."""
+    return (
+        BASE_SECONDS
+        + SECONDS_PER_KB * len(source.encode('utf-8')) / 1024
+        + SECONDS_PER_PLOT * len(PLOT_PATTERN.findall(source))
+    )
+
+
+class TimingKey(NamedTuple):
+    """What a history entry is matched against: one version of a figure source."""
+    
+    sha256: str  # TikzFigure.digest of the figure's code
+    estimate: float  # estimate_seconds of the source
+
+
+def timing_key(source: str, digest: Optional[str] = None) -> TimingKey:
+    """Key of a standalone figure source in the history.
+    
+    Entries follow the tikzpicture's digest from the figure index, so an
+    edited preamble, which slows every figure alike, keeps the order;
+    ``digest`` spares indexing ``source`` when the caller has it already.
+    """
+    if digest is None:
+        figures = index_figures(source).figures
+        if figures:
+            digest = figures[0].digest
+        else:
+            digest = hashlib.sha256(source.encode('utf-8')).hexdigest()
+    return TimingKey(digest, estimate_seconds(source))
+
+
+class FigureTimings:
+    """JSON record of each figure's last compile times.
+    
+    Entries are keyed by figure name (its label) and remember the
+    ``TimingKey`` of the source they were measured for. An edited figure is
+    expected to take its previous time, scaled by how much
+    ``estimate_seconds`` changed; figures without an entry get
+    ``estimate_seconds``.
+    """
+    
+    def __init__(self, path: Path):
+        """
+        Initialize history.
+        
+        Args:
+            path: History file (loaded if it exists)
+        """
+        self.path = Path(path)
+        self.figures: Dict[str, dict] = self._load()
+    
+    def _load(self) -> Dict[str, dict]:
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get('version') != HISTORY_VERSION:
+            return {}
+        return data.get('figures', {})
+    
+    def expected(self, name: str, key: TimingKey) -> float:
+        """Expected seconds for figure ``name`` with the source of ``key``."""
+        entry = self.figures.get(name)
+        if not entry or not entry.get('seconds'):
+            return key.estimate
+        measured = sum(entry['seconds'].values())
+        if entry.get('sha256') == key.sha256:
+            return measured
+        return measured * key.estimate / (entry.get('estimate') or BASE_SECONDS)
+    
+    def longest_first(self, figures: Dict[str, TimingKey]) -> List[str]:
+        """Names of ``figures`` (name -> key), slowest expected first."""
+        return sorted(figures, key=lambda name: -self.expected(name, figures[name]))
+    
+    def record(self, name: str, key: TimingKey, seconds: Dict[str, float]) -> None:
+        """Remember the times per step (pdflatex, rasterize) of one figure."""
+        self.figures[name] = {
+            'sha256': key.sha256,
+            'estimate': round(key.estimate, 3),
+            'seconds': {step: round(value, 3) for step, value in seconds.items()},
+        }
+    
+    def save(self, names: List[str]) -> None:
+        """Write the history, merged with entries other jobs saved meanwhile.
+        
+        Args:
+            names: Entries this job recorded
+        """
+        ours = {name: self.figures[name] for name in names if name in self.figures}
+        with file_lock(self.path.with_name(self.path.name + '.lock')):
+            self.figures = {**self._load(), **ours}
+            data = {'version': HISTORY_VERSION, 'figures': self.figures}
+            atomic_write_text(self.path, json.dumps(data, indent=2, sort_keys=True))
+
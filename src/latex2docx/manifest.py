@@ -0,0 +1,119 @@
+"""
+Stage manifest: fingerprints of pipeline steps for skipping unchanged work.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from latex2docx.cache import atomic_write_text
+
+# Bump when the manifest layout changes so old manifests are ignored.
+MANIFEST_VERSION = 1
+
+
+def hash_file(path: Path) -> str:
+    """SHA-256 of a file's contents ('missing' if it does not exist)."""
+    path = Path(path)
+    if not path.is_file():
+        return 'missing'
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _file_state(path: Path) -> Optional[list]:
+    """Cheap identity of an output file: [size, mtime in ns]."""
+    try:
+        stat = Path(path).stat()
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class StageManifest:
+    """JSON record of each stage's input fingerprint and outputs."""
+    
+    def __init__(self, path: Path):
+        """
+        Initialize manifest.
+        
+        Args:
+            path: Manifest file (loaded if it exists)
+        """
+        self.path = Path(path)
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return
+        if data.get('version') == MANIFEST_VERSION:
+            self.stages = data.get('stages', {})
+    
+    @staticmethod
+    def fingerprint(inputs: Iterable[Path], params: Any = None) -> str:
+        """
+        Hash a stage's input files and parameters.
+        
+        Args:
+            inputs: Files the stage reads
+            params: JSON-serializable options that affect the output
+        """
+        digest = hashlib.sha256()
+        for path in inputs:
+            digest.update(f'{path}\0{hash_file(path)}\0'.encode('utf-8'))
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+    
+    def is_current(self, stage: str, fingerprint: str) -> bool:
+        """True if ``stage`` ran with these inputs and its outputs are intact."""
+        entry = self.stages.get(stage)
+        if not entry or entry.get('fingerprint') != fingerprint:
+            return False
+        return self.outputs_intact(stage)
+    
+    def outputs_intact(self, stage: str) -> bool:
+        """True if the outputs recorded for ``stage`` were not changed since."""
+        entry = self.stages.get(stage)
+        if not entry:
+            return False
+        return all(
+            _file_state(Path(path)) == state
+            for path, state in entry.get('outputs', {}).items()
+        )
+    
+    def result(self, stage: str) -> Any:
+        """Return value recorded for ``stage``."""
+        return self.stages.get(stage, {}).get('result')
+    
+    def outputs(self, stage: str) -> list:
+        """Output paths recorded for ``stage``."""
+        return [Path(path) for path in self.stages.get(stage, {}).get('outputs', {})]
+    
+    def record(
+        self,
+        stage: str,
+        fingerprint: str,
+        outputs: Iterable[Path],
+        result: Any = None,
+    ) -> None:
+        """Remember a finished stage and write the manifest."""
+        self.stages[stage] = {
+            'fingerprint': fingerprint,
+            'outputs': {str(path): _file_state(path) for path in outputs},
+            'result': result,
+        }
+        self.save()
+    
+    def invalidate(self, stage: str) -> None:
+        """Forget ``stage`` so it reruns next time."""
+        if self.stages.pop(stage, None) is not None:
+            self.save()
+    
+    def save(self) -> None:
+        """Write the manifest atomically."""
+        data = {'version': MANIFEST_VERSION, 'stages': self.stages}
+        atomic_write_text(self.path, json.dumps(data, indent=2, sort_keys=True))
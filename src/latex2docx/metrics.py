@@ -0,0 +1,188 @@
+"""
+Timing and resource metrics for a conversion, exported as JSON and Chrome traces.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from latex2docx.cache import atomic_write_text
+from latex2docx.tools import ToolRun
+
+# Counters every summary reports, even when zero
+COUNTERS = ('cache_hits', 'cache_misses', 'bytes_read', 'bytes_written', 'timeouts', 'png_bytes_saved')
+
+
+@dataclass
+class Span:
+    """One timed interval: a pipeline stage or an external process."""
+    
+    name: str
+    category: str  # 'stage' or 'process'
+    start: float  # seconds since the collector was created
+    wall: float
+    cpu: Optional[float]
+    thread: int
+    args: Dict[str, Any] = field(default_factory=dict)
+
+
+class Metrics:
+    """Thread-safe collector of stage and process timings and counters."""
+    
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.spans: List[Span] = []
+        self.counters: Counter = Counter({name: 0 for name in COUNTERS})
+        self._lock = threading.Lock()
+    
+    def _now(self) -> float:
+        return time.perf_counter() - self.origin
+    
+    def _add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+    
+    def count(self, name: str, amount: int = 1) -> None:
+        """Increase a counter (cache_hits, bytes_read, ...)."""
+        with self._lock:
+            self.counters[name] += amount
+    
+    @contextmanager
+    def stage(self, name: str, **args) -> Iterator[Dict[str, Any]]:
+        """Time a pipeline stage; yields its args dict for extra details.
+        
+        CPU time is that of this whole process (all threads), so it covers
+        work done on the figure pool but not the external tools.
+        """
+        start = self._now()
+        cpu_start = time.process_time()
+        try:
+            yield args
+        finally:
+            self._add(Span(
+                name, 'stage', start, self._now() - start,
+                time.process_time() - cpu_start, threading.get_ident(), args
+            ))
+    
+    def record_process(self, run: ToolRun, label: str = '') -> None:
+        """Record a finished external process and what it was run for."""
+        self._add(Span(
+            run.tool, 'process', self._now() - run.wall, run.wall, run.cpu,
+            threading.get_ident(),
+            {'label': label, 'returncode': run.returncode, 'command': run.args},
+        ))
+    
+    def summary(self) -> Dict[str, Any]:
+        """JSON-serializable summary of everything recorded."""
+        with self._lock:
+            spans = list(self.spans)
+            counters = dict(self.counters)
+        
+        stages = {}
+        for span in spans:
+            if span.category == 'stage':
+                stages[span.name] = {'wall': span.wall, 'cpu': span.cpu, **span.args}
+        
+        processes = []
+        tools: Dict[str, Dict[str, Any]] = {}
+        for span in spans:
+            if span.category != 'process':
+                continue
+            processes.append({
+                'tool': span.name,
+                'label': span.args.get('label', ''),
+                'start': span.start,
+                'wall': span.wall,
+                'cpu': span.cpu,
+                'returncode': span.args.get('returncode'),
+            })
+            totals = tools.setdefault(span.name, {'count': 0, 'wall': 0.0, 'cpu': 0.0})
+            totals['count'] += 1
+            totals['wall'] += span.wall
+            totals['cpu'] += span.cpu or 0.0
+        
+        return {
+            'wall': self._now(),
+            'stages': stages,
+            'tools': tools,
+            'processes': processes,
+            'counters': counters,
+        }
+    
+    def trace_events(self) -> Dict[str, Any]:
+        """Spans in Chrome trace-event format (chrome://tracing, Perfetto)."""
+        with self._lock:
+            spans = list(self.spans)
+        
+        pid = os.getpid()
+        thread_ids: Dict[int, int] = {}
+        events = []
+        for span in sorted(spans, key=lambda span: span.start):
+            tid = thread_ids.setdefault(span.thread, len(thread_ids) + 1)
+            label = span.args.get('label')
+            events.append({
+                'name': f'{span.name} {label}' if label else span.name,
+                'cat': span.category,
+                'ph': 'X',
+                'ts': round(span.start * 1e6),
+                'dur': round(span.wall * 1e6),
+                'pid': pid,
+                'tid': tid,
+                'args': {'cpu': span.cpu, **span.args},
+            })
+        for thread, tid in thread_ids.items():
+            events.append({
+                'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                'args': {'name': 'main' if tid == 1 else f'worker {tid - 1}'},
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+    
+    def write_json(self, path: Path) -> Path:
+        """
+        Write the summary to ``path`` and the trace next to it.
+        
+        Returns:
+            Path of the trace file (``<stem>.trace.json``)
+        """
+        path = Path(path)
+        atomic_write_text(path, json.dumps(self.summary(), indent=2))
+        trace_path = path.with_name(f'{path.stem}.trace.json')
+        atomic_write_text(trace_path, json.dumps(self.trace_events()))
+        return trace_path
+    
+    def report_lines(self) -> List[str]:
+        """Human-readable profile for the end of a run."""
+        summary = self.summary()
+        lines = [f"{'Stage':<18}  {'Wall':>8}  {'CPU':>8}"]
+        for name, stage in summary['stages'].items():
+            note = '  (skipped)' if stage.get('skipped') else ''
+            lines.append(f"{name:<18}  {stage['wall']:>7.2f}s  {stage['cpu']:>7.2f}s{note}")
+        if summary['tools']:
+            lines.append("")
+            lines.append(f"{'Tool':<18}  {'Runs':>8}  {'Wall':>8}  {'CPU':>8}")
+            for name, tool in sorted(summary['tools'].items()):
+                lines.append(
+                    f"{name:<18}  {tool['count']:>8}  {tool['wall']:>7.2f}s  {tool['cpu']:>7.2f}s"
+                )
+            slowest = sorted(summary['processes'], key=lambda p: p['wall'], reverse=True)[:5]
+            lines.append("")
+            lines.append("Slowest processes:")
+            for process in slowest:
+                label = f" [{process['label']}]" if process['label'] else ''
+                lines.append(f"  {process['wall']:>7.2f}s  {process['tool']}{label}")
+        counters = summary['counters']
+        lines.append("")
+        lines.append(
+            f"Cache: {counters['cache_hits']} hits, {counters['cache_misses']} misses"
+        )
+        lines.append(
+            f"I/O: {counters['bytes_read']:,} bytes read, "
+            f"{counters['bytes_written']:,} bytes written"
+        )
+        return lines
@@ -0,0 +1,162 @@
+"""
+PNG size optimization for compiled figures, and draft placeholders.
+"""
+
+import shutil
+import struct
+import zlib
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from latex2docx import tools
+from latex2docx.cache import atomic_write_bytes, tool_version
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# Ancillary chunks that change how a figure is displayed (pandoc reads the
+# DPI from pHYs); all other metadata is dropped.
+KEPT_CHUNKS = (b'PLTE', b'tRNS', b'pHYs', b'sRGB', b'gAMA', b'cHRM', b'iCCP', b'sBIT', b'bKGD')
+
+# Lossless optimizers in order of preference: name -> command template
+LOSSLESS_TOOLS = {
+    'oxipng': ['oxipng', '--quiet', '-o', '2', '--strip', 'safe', '--out', '{out}', '{png}'],
+    'optipng': ['optipng', '-quiet', '-o2', '-out', '{out}', '{png}'],
+}
+
+
+def _chunks(data: bytes) -> List[tuple]:
+    """Split a PNG into (type, body) chunks.
+    
+    Raises:
+        ValueError: If ``data`` is not a well-formed PNG
+    """
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("Not a PNG file")
+    chunks = []
+    position = len(PNG_SIGNATURE)
+    while position < len(data):
+        if position + 8 > len(data):
+            raise ValueError("Truncated PNG chunk")
+        length, kind = struct.unpack('>I4s', data[position:position + 8])
+        body = data[position + 8:position + 8 + length]
+        if len(body) != length:
+            raise ValueError("Truncated PNG chunk")
+        chunks.append((kind, body))
+        position += 12 + length
+        if kind == b'IEND':
+            break
+    return chunks
+
+
+def _chunk(kind: bytes, body: bytes) -> bytes:
+    return struct.pack('>I4s', len(body), kind) + body + struct.pack('>I', zlib.crc32(kind + body))
+
+
+def recompress_png(data: bytes) -> bytes:
+    """
+    Losslessly shrink a PNG without external tools.
+    
+    The image data is deflated again at maximum compression (keeping the
+    row filters of the encoder) into a single IDAT chunk, and metadata that
+    does not affect rendering (text, timestamps, ...) is dropped.
+    
+    Returns:
+        The smaller of the rewritten and the original PNG
+    
+    Raises:
+        ValueError: If ``data`` is not a well-formed PNG
+    """
+    chunks = _chunks(data)
+    if not chunks or chunks[0][0] != b'IHDR':
+        raise ValueError("PNG without IHDR")
+    try:
+        pixels = zlib.decompress(b''.join(body for kind, body in chunks if kind == b'IDAT'))
+    except zlib.error as e:
+        raise ValueError(f"Corrupt PNG image data: {e}") from None
+    
+    out = [PNG_SIGNATURE, _chunk(b'IHDR', chunks[0][1])]
+    out += [_chunk(kind, body) for kind, body in chunks if kind in KEPT_CHUNKS]
+    out.append(_chunk(b'IDAT', zlib.compress(pixels, 9)))
+    out.append(_chunk(b'IEND', b''))
+    rewritten = b''.join(out)
+    return rewritten if len(rewritten) < len(data) else data
+
+
+def placeholder_png(width: int = 480, height: int = 270, border: int = 3) -> bytes:
+    """Grayscale PNG of a gray frame on white, standing in for a missing figure."""
+    edge = b'\0' + b'\x99' * width
+    inside = b'\0' + b'\x99' * border + b'\xf4' * (width - 2 * border) + b'\x99' * border
+    rows = edge * border + inside * (height - 2 * border) + edge * border
+    return b''.join([
+        PNG_SIGNATURE,
+        _chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0)),
+        _chunk(b'IDAT', zlib.compress(rows, 9)),
+        _chunk(b'IEND', b''),
+    ])
+
+
+class PngOptimizer:
+    """Shrinks rasterized figures in place.
+    
+    Lossless recompression uses oxipng or optipng when installed and
+    ``recompress_png`` otherwise. With ``colors``, figures are first
+    quantized to a palette of at most that many colors with pngquant
+    (lossy, but invisible for most line art); this step is skipped when
+    pngquant is not installed (``quantizer`` is None). ``runner`` is called
+    like the rasterizer runners: ``runner(cmd, cwd=..., label=...)``.
+    """
+    
+    def __init__(self, colors: Optional[int] = None, runner: Optional[Callable] = None):
+        self.colors = colors
+        self.runner = runner
+        self.lossless = next((name for name in LOSSLESS_TOOLS if shutil.which(name)), None)
+        self.quantizer = 'pngquant' if colors and shutil.which('pngquant') else None
+    
+    def identity(self) -> str:
+        """Tools, versions and settings; part of figure cache keys."""
+        parts = [f'{self.lossless} {tool_version(self.lossless)}' if self.lossless else 'builtin']
+        if self.quantizer:
+            parts.append(f'{self.quantizer} {tool_version(self.quantizer)} colors={self.colors}')
+        return 'optimize ' + ', '.join(parts)
+    
+    def _run(self, cmd: List[str], cwd: Path, label: str) -> None:
+        if self.runner is not None:
+            self.runner(cmd, cwd=cwd, label=label)
+        else:
+            tools.run_tool(cmd, cwd=cwd)
+    
+    def optimize(self, png: Path) -> int:
+        """
+        Optimize ``png`` in place; it is only replaced by smaller output.
+        
+        Returns:
+            Bytes saved
+        """
+        before = png.stat().st_size
+        if self.quantizer:
+            self._replace_if_smaller(png, [
+                'pngquant', '--force', '--skip-if-larger', '--speed', '3',
+                '--output', '{out}', str(self.colors), '--', '{png}',
+            ])
+        if self.lossless:
+            self._replace_if_smaller(png, LOSSLESS_TOOLS[self.lossless])
+        else:
+            data = png.read_bytes()
+            try:
+                smaller = recompress_png(data)
+            except ValueError:
+                smaller = data
+            if smaller is not data:
+                atomic_write_bytes(png, smaller)
+        return before - png.stat().st_size
+    
+    def _replace_if_smaller(self, png: Path, template: List[str]) -> None:
+        """Run a tool writing ``<stem>.opt.png`` and keep its output if smaller."""
+        out = png.with_name(f'{png.stem}.opt.png')
+        cmd = [arg.format(png=png.name, out=out.name) for arg in template]
+        self._run(cmd, png.parent, png.stem)
+        if out.exists():
+            if out.stat().st_size < png.stat().st_size:
+                out.replace(png)
+            else:
+                out.unlink()
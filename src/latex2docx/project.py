@@ -0,0 +1,176 @@
+"""
+Multi-file LaTeX projects: the graph of files pulled in with \\input,
+\\include and \\subfile.
+"""
+
+import hashlib
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+INCLUDE_PATTERN = re.compile(
+    r'\\(?P<command>input|include|subfile)\s*\{(?P<name>[^}]+)\}'
+)
+
+# Included files that are LaTeX source; anything else (plot tables read
+# with \input inside a figure, ...) is left to TeX.
+SOURCE_SUFFIXES = ('.tex', '.tikz')
+
+
+def _is_commented(text: str, position: int) -> bool:
+    """True if ``position`` lies after an unescaped % on its line."""
+    line_start = text.rfind('\n', 0, position) + 1
+    return re.search(r'(?<!\\)%', text[line_start:position]) is not None
+
+
+def _read(path: Path) -> str:
+    """Default reader: the file as UTF-8 text."""
+    return path.read_text(encoding='utf-8')
+
+
+@dataclass
+class SourceFile:
+    """One file of the project and the files it includes."""
+    
+    path: Path
+    text: str
+    includes: List[Path] = field(default_factory=list)
+    
+    @property
+    def fingerprint(self) -> str:
+        """SHA-256 of the file's text."""
+        return hashlib.sha256(self.text.encode('utf-8')).hexdigest()
+
+
+class ProjectGraph:
+    """Dependency graph of a document's source files, rooted at the main file."""
+    
+    def __init__(
+        self,
+        root: Path,
+        read: Callable[[Path], str] = _read,
+        allowed: Optional[Iterable[Path]] = None,
+    ):
+        """
+        Read the main file and everything it includes, recursively.
+        
+        Args:
+            root: Main LaTeX file
+            read: Function returning the text of a file
+            allowed: Directories included files must lie in (after
+                resolving symlinks); anything may be included if None
+        
+        Raises:
+            PermissionError: If an include points outside ``allowed``
+        """
+        self.root = Path(root)
+        self.base_dir = self.root.parent
+        self.allowed = None if allowed is None else [Path(path).resolve() for path in allowed]
+        self.files: Dict[Path, SourceFile] = {}
+        self.missing: List[Path] = []
+        self._add(self.root, read)
+    
+    def _add(self, path: Path, read: Callable[[Path], str]) -> None:
+        source = SourceFile(path, read(path))
+        self.files[path] = source
+        for match in self._includes(source.text):
+            self._check_allowed(match.group('name'), path)
+            included = self.resolve(match.group('name'), path)
+            if included is None:
+                continue
+            if not included.is_file():
+                if included not in self.missing:
+                    self.missing.append(included)
+                continue
+            if included not in source.includes:
+                source.includes.append(included)
+            if included not in self.files:
+                self._add(included, read)
+    
+    def _check_allowed(self, name: str, including: Path) -> None:
+        """Refuse an include that may read a file outside ``allowed``.
+        
+        Every place TeX or pandoc could look for it is checked, also for
+        files that are not LaTeX source (pandoc inlines those too).
+        """
+        if self.allowed is None:
+            return
+        name = name.strip()
+        names = [name, name + '.tex'] if not Path(name).suffix else [name]
+        for directory in (self.base_dir, including.parent):
+            for candidate in names:
+                resolved = (directory / candidate).resolve()
+                if not any(resolved.is_relative_to(root) for root in self.allowed):
+                    raise PermissionError(f"Include outside the allowed directories: {name}")
+    
+    @staticmethod
+    def _includes(text: str) -> List[re.Match]:
+        """Include commands in ``text`` that are not commented out."""
+        return [
+            match for match in INCLUDE_PATTERN.finditer(text)
+            if not _is_commented(text, match.start())
+        ]
+    
+    def resolve(self, name: str, including: Path) -> Optional[Path]:
+        """
+        File an include command refers to, or None if it is not LaTeX source.
+        
+        Like TeX, names are looked up relative to the main file's directory
+        first (then relative to the including file) and ``.tex`` is added
+        when there is no extension.
+        """
+        name = name.strip()
+        if not Path(name).suffix:
+            name += '.tex'
+        if Path(name).suffix not in SOURCE_SUFFIXES:
+            return None
+        candidates = [self.base_dir / name, including.parent / name]
+        return next((path for path in candidates if path.is_file()), candidates[0])
+    
+    def paths(self) -> List[Path]:
+        """Every file of the project, main file first."""
+        return list(self.files)
+    
+    def fingerprints(self) -> Dict[Path, str]:
+        """Content hash of every file."""
+        return {path: source.fingerprint for path, source in self.files.items()}
+    
+    def expand(self, texts: Optional[Dict[Path, str]] = None) -> str:
+        """
+        The whole document as one text, with includes replaced by file contents.
+        
+        Args:
+            texts: Text to use per file (e.g. after preprocessing); the file's
+                own text is used for files not in the mapping
+        """
+        texts = texts or {}
+        
+        def expand_file(path: Path, active: List[Path]) -> str:
+            text = texts.get(path, self.files[path].text)
+            pieces = []
+            position = 0
+            for match in self._includes(text):
+                included = self.resolve(match.group('name'), path)
+                # Missing files and include cycles keep their command
+                if included not in self.files or included in active:
+                    continue
+                pieces.append(text[position:match.start()])
+                body = expand_file(included, active + [included])
+                if match.group('command') == 'subfile':
+                    body = self._subfile_body(body)
+                pieces.append(body)
+                position = match.end()
+            pieces.append(text[position:])
+            return ''.join(pieces)
+        
+        return expand_file(self.root, [self.root])
+    
+    @staticmethod
+    def _subfile_body(text: str) -> str:
+        """Body of a subfile, which is a complete document of its own."""
+        begin = text.find('\\begin{document}')
+        end = text.rfind('\\end{document}')
+        if begin < 0 or end < begin:
+            return text
+        return text[begin + len('\\begin{document}'):end]
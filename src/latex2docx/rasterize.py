@@ -0,0 +1,242 @@
+"""
+PDF to PNG rasterization backends.
+"""
+
+import asyncio
+import re
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from latex2docx import tools
+from latex2docx.cache import tool_version
+
+# PyMuPDF is not thread-safe: one document is opened/rendered at a time
+_FITZ_LOCK = threading.Lock()
+
+
+class Rasterizer:
+    """Base class: turns pages of a PDF into PNG files.
+    
+    Backends run their tool in the PDF's directory. ``runner`` replaces
+    ``tools.run_tool`` and is called as ``runner(cmd, cwd=..., label=...)``
+    so callers can time or limit the external processes; ``arunner`` is the
+    coroutine counterpart used by ``arasterize``.
+    """
+    
+    name = ''
+    tool = ''
+    # True if one call over many pages is cheaper than one call per page
+    multi_page = False
+    
+    def __init__(self, runner: Optional[Callable] = None, arunner: Optional[Callable] = None):
+        self.runner = runner
+        self.arunner = arunner
+    
+    def available(self) -> bool:
+        """True if the backend can be used on this machine."""
+        return shutil.which(self.tool) is not None
+    
+    def version(self) -> str:
+        """Version string that becomes part of figure cache keys."""
+        return tool_version(self.tool)
+    
+    def _run(self, cmd: List[str], cwd: Path, label: str) -> None:
+        """Run a backend command in ``cwd`` for the figure(s) ``label``."""
+        if self.runner is not None:
+            self.runner(cmd, cwd=cwd, label=label)
+        else:
+            tools.run_tool(cmd, cwd=cwd)
+    
+    def command(self, pdf: Path, png: Path, dpi: int, page: Optional[int] = None) -> Optional[List[str]]:
+        """Command line that rasterizes one page (None for in-process backends)."""
+        return None
+    
+    def rasterize(self, pdf: Path, png: Path, dpi: int, page: Optional[int] = None) -> bool:
+        """
+        Rasterize one page (the only/first page if None) of ``pdf`` to ``png``.
+        
+        Returns:
+            True if the PNG was written
+        """
+        self._run(self.command(pdf, png, dpi, page), pdf.parent, png.stem)
+        return png.exists()
+    
+    async def arasterize(self, pdf: Path, png: Path, dpi: int, page: Optional[int] = None) -> bool:
+        """``rasterize`` for asyncio callers; in-process backends use a thread."""
+        cmd = self.command(pdf, png, dpi, page)
+        if cmd is None:
+            return await asyncio.to_thread(self.rasterize, pdf, png, dpi, page)
+        if self.arunner is not None:
+            await self.arunner(cmd, cwd=pdf.parent, label=png.stem)
+        else:
+            await tools.arun_tool(cmd, cwd=pdf.parent)
+        return png.exists()
+    
+    def rasterize_pages(self, pdf: Path, pngs: List[Path], dpi: int, first: int = 0) -> List[bool]:
+        """
+        Rasterize pages ``first``.. of ``pdf`` to ``pngs`` (0-based pages).
+        
+        Returns:
+            Per-page success flags
+        """
+        return [
+            self.rasterize(pdf, png, dpi, page)
+            for page, png in enumerate(pngs, first)
+        ]
+    
+    @staticmethod
+    def _collect_pages(directory: Path, prefix: str, pngs: List[Path], first: int) -> List[bool]:
+        """Move ``<prefix>-<number>.png`` outputs (numbered from ``first``) onto ``pngs``."""
+        produced: Dict[int, Path] = {}
+        for path in directory.glob(f'{prefix}-*.png'):
+            match = re.fullmatch(rf'{re.escape(prefix)}-(\d+)\.png', path.name)
+            if match:
+                produced[int(match.group(1))] = path
+        flags = []
+        for offset, png in enumerate(pngs):
+            page_png = produced.get(first + offset)
+            if page_png is not None:
+                page_png.replace(png)
+            flags.append(png.exists())
+        return flags
+
+
+class ImageMagickRasterizer(Rasterizer):
+    """``convert`` from ImageMagick (goes through Ghostscript)."""
+    
+    name = 'imagemagick'
+    tool = 'convert'
+    
+    def command(self, pdf, png, dpi, page=None):
+        source = pdf.name if page is None else f'{pdf.name}[{page}]'
+        return ['convert', '-density', str(dpi), source, '-quality', '90', str(png)]
+    
+    def rasterize_pages(self, pdf, pngs, dpi, first=0):
+        last = first + len(pngs) - 1
+        prefix = f'{pdf.stem}-page'
+        self._run(
+            ['convert', '-density', str(dpi), f'{pdf.name}[{first}-{last}]',
+             '-quality', '90', '-scene', str(first), f'{prefix}-%d.png'],
+            pdf.parent, ', '.join(png.stem for png in pngs)
+        )
+        return self._collect_pages(pdf.parent, prefix, pngs, first)
+
+
+class PdftoppmRasterizer(Rasterizer):
+    """``pdftoppm`` from Poppler; much faster than ImageMagick."""
+    
+    name = 'pdftoppm'
+    tool = 'pdftoppm'
+    multi_page = True
+    
+    def version(self) -> str:
+        # Poppler tools print their version to stderr with -v
+        try:
+            result = subprocess.run([self.tool, '-v'], capture_output=True, text=True)
+        except OSError:
+            return ''
+        lines = (result.stderr or result.stdout or '').splitlines()
+        return lines[0].strip() if lines else ''
+    
+    def command(self, pdf, png, dpi, page=None):
+        number = (page or 0) + 1
+        return [self.tool, '-png', '-r', str(dpi), '-f', str(number), '-l', str(number),
+                '-singlefile', pdf.name, str(png.with_suffix(''))]
+    
+    def rasterize_pages(self, pdf, pngs, dpi, first=0):
+        prefix = f'{pdf.stem}-page'
+        self._run(
+            [self.tool, '-png', '-r', str(dpi), '-f', str(first + 1),
+             '-l', str(first + len(pngs)), pdf.name, prefix],
+            pdf.parent, ', '.join(png.stem for png in pngs)
+        )
+        # Poppler numbers pages from 1 and zero-pads them
+        return self._collect_pages(pdf.parent, prefix, pngs, first + 1)
+
+
+class PdftocairoRasterizer(PdftoppmRasterizer):
+    """``pdftocairo`` from Poppler (Cairo rendering, same options)."""
+    
+    name = 'pdftocairo'
+    tool = 'pdftocairo'
+
+
+class PyMuPDFRasterizer(Rasterizer):
+    """In-process rendering with PyMuPDF (optional ``pymupdf`` package).
+    
+    Calls are serialized across threads; pages of one PDF still render in
+    one call.
+    """
+    
+    name = 'pymupdf'
+    tool = 'pymupdf'
+    multi_page = True
+    
+    def available(self) -> bool:
+        try:
+            import fitz  # noqa: F401
+        except ImportError:
+            return False
+        return True
+    
+    def version(self) -> str:
+        import fitz
+        return f'PyMuPDF {fitz.VersionBind}'
+    
+    def rasterize(self, pdf, png, dpi, page=None):
+        return self.rasterize_pages(pdf, [png], dpi, page or 0)[0]
+    
+    def rasterize_pages(self, pdf, pngs, dpi, first=0):
+        import fitz
+        flags = []
+        with _FITZ_LOCK, fitz.open(pdf) as document:
+            for page, png in enumerate(pngs, first):
+                if page >= document.page_count:
+                    flags.append(False)
+                    continue
+                document[page].get_pixmap(dpi=dpi).save(png)
+                flags.append(png.exists())
+        return flags
+
+
+# Backends in auto-detection order (fastest first)
+RASTERIZERS = {
+    backend.name: backend
+    for backend in (
+        PdftoppmRasterizer,
+        PdftocairoRasterizer,
+        PyMuPDFRasterizer,
+        ImageMagickRasterizer,
+    )
+}
+
+
+def get_rasterizer(
+    name: str = 'auto',
+    runner: Optional[Callable] = None,
+    arunner: Optional[Callable] = None,
+) -> Rasterizer:
+    """
+    Return a rasterizer backend by name.
+    
+    Args:
+        name: Backend name, or 'auto' for the fastest installed one
+            (ImageMagick if none is found, as before)
+        runner: Replacement for ``tools.run_tool``, called with the
+            command and ``cwd``/``label`` keywords
+        arunner: Replacement for ``tools.arun_tool`` (a coroutine
+            function called the same way)
+    """
+    if name == 'auto':
+        for backend in RASTERIZERS.values():
+            rasterizer = backend(runner, arunner)
+            if rasterizer.available():
+                return rasterizer
+        return ImageMagickRasterizer(runner, arunner)
+    if name not in RASTERIZERS:
+        choices = ', '.join(['auto', *RASTERIZERS])
+        raise ValueError(f"Unknown rasterizer: {name} (choose from {choices})")
+    return RASTERIZERS[name](runner, arunner)
@@ -0,0 +1,356 @@
+"""
+Conversion server: a long-running process that converts documents on request.
+"""
+
+import json
+import logging
+import os
+import shutil
+import socketserver
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from latex2docx.converter import TexConverter
+
+logger = logging.getLogger(__name__)
+
+DOCX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+# Largest LaTeX payload accepted in a request body
+MAX_PAYLOAD = 64 * 1024 * 1024
+
+# Converters kept warm; the least recently used beyond this are dropped
+MAX_DOCUMENTS = 64
+
+# TCP servers only listen on the loopback interface
+HOST = '127.0.0.1'
+
+
+class ConversionService:
+    """Converts documents with state kept warm between requests.
+    
+    One figure pool serves every request, and a converter is kept for
+    the ``max_documents`` most recently converted documents, so repeated
+    conversions reuse its stage manifest, the preprocessed text of its
+    unchanged source files and (through the figure cache) its figures.
+    The other document texts are dropped after every conversion.
+    """
+    
+    def __init__(
+        self,
+        jobs: Optional[int] = None,
+        work_dir: Optional[str | Path] = None,
+        verbose: bool = False,
+        max_documents: int = MAX_DOCUMENTS,
+        roots: Optional[List[str | Path]] = None,
+        **converter_options,
+    ):
+        """
+        Initialize service.
+        
+        Args:
+            jobs: Figure workers shared by all requests (CPU count if None)
+            work_dir: Directory for documents sent as payloads (a temporary
+                directory, removed on ``close``, if None)
+            verbose: Log the full pipeline of every conversion
+            max_documents: Converters to keep between requests
+            roots: Directories whose documents ``convert_path`` may read and
+                write (the current directory if None)
+            converter_options: Passed on to every TexConverter
+        """
+        self.jobs = jobs or os.cpu_count() or 1
+        self.verbose = verbose
+        self.converter_options = {'keep_intermediates': False, **converter_options}
+        self.max_documents = max_documents
+        self.roots = [Path(root).resolve() for root in roots or [Path.cwd()]]
+        self._own_work_dir = not work_dir
+        self.work_dir = Path(work_dir) if work_dir else Path(tempfile.mkdtemp(prefix='latex2docx-serve-'))
+        self.pool = ThreadPoolExecutor(max_workers=self.jobs)
+        # Least recently used first
+        self.converters: OrderedDict[Tuple[Path, Path], TexConverter] = OrderedDict()
+        self.started = time.time()
+        self.converted = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        # Document -> [lock, requests using it]; entries go when unused
+        self._document_locks: Dict[Path, list] = {}
+    
+    def _converter(self, input_path: Path, output_path: Path, allowed: List[Path]) -> TexConverter:
+        """Converter for a document, created on first use; its includes
+        may only come from ``allowed``."""
+        with self._lock:
+            key = (input_path, output_path)
+            if key in self.converters:
+                self.converters.move_to_end(key)
+            else:
+                self.converters[key] = TexConverter(
+                    input_path,
+                    output_path,
+                    verbose=self.verbose,
+                    log_level=None if self.verbose else logging.WARNING,
+                    jobs=self.jobs,
+                    executor=self.pool,
+                    allowed_dirs=allowed,
+                    **self.converter_options
+                )
+                while len(self.converters) > self.max_documents:
+                    self.converters.popitem(last=False)
+            return self.converters[key]
+    
+    @contextmanager
+    def _document_lock(self, input_path: Path) -> Iterator[None]:
+        """Hold the lock of a document.
+        
+        Requests for the same document are converted one at a time; other
+        documents, also in the same directory, have their own figure
+        directories and run concurrently.
+        """
+        with self._lock:
+            entry = self._document_locks.setdefault(input_path, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._document_locks[input_path]
+    
+    def convert_path(self, input_file: str | Path, output_file: Optional[str | Path] = None) -> Path:
+        """
+        Convert a document on disk.
+        
+        Args:
+            input_file: LaTeX file
+            output_file: DOCX file (next to the input if None)
+        
+        Returns:
+            Path of the DOCX file
+        
+        Raises:
+            PermissionError: If the input, the output or a file the input
+                includes is outside the roots
+            FileNotFoundError: If the input does not exist
+        """
+        input_path = Path(input_file).absolute()
+        output_path = Path(output_file).absolute() if output_file else input_path.with_suffix('.docx')
+        for path in (input_path, output_path):
+            self._check_root(path)
+        return self._convert(input_path, output_path, self.roots)
+    
+    def _check_root(self, path: Path) -> None:
+        """Refuse a path outside the roots (after resolving symlinks)."""
+        resolved = path.resolve()
+        if not any(resolved.is_relative_to(root) for root in self.roots):
+            raise PermissionError(f"Not under a served directory: {path}")
+    
+    def _convert(self, input_path: Path, output_path: Path, allowed: List[Path]) -> Path:
+        """Convert a document (absolute paths), one request per document at a time."""
+        if not input_path.is_file():
+            raise FileNotFoundError(f"Input file not found: {input_path}")
+        
+        start = time.perf_counter()
+        with self._document_lock(input_path):
+            converter = self._converter(input_path, output_path, allowed)
+            try:
+                converter.run_stages()
+            except Exception:
+                with self._lock:
+                    self.failed += 1
+                raise
+            finally:
+                converter.release_texts()
+        with self._lock:
+            self.converted += 1
+        logger.info(f"Converted {input_path} ({time.perf_counter() - start:.2f} s)")
+        return output_path
+    
+    def convert_source(self, source: str) -> bytes:
+        """
+        Convert a self-contained document sent as text.
+        
+        The payload is converted in its own directory under ``work_dir``,
+        which is removed once the DOCX has been read; its figures are still
+        reused from the figure cache. It may include files from that
+        directory and the roots only.
+        
+        Returns:
+            Contents of the DOCX file
+        
+        Raises:
+            PermissionError: If the payload includes a file outside the roots
+        """
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        directory = Path(tempfile.mkdtemp(prefix='payload-', dir=self.work_dir))
+        input_path = directory.absolute() / 'main.tex'
+        try:
+            input_path.write_text(source, encoding='utf-8')
+            output_path = input_path.with_suffix('.docx')
+            return self._convert(input_path, output_path, [*self.roots, directory]).read_bytes()
+        finally:
+            with self._lock:
+                self.converters.pop((input_path, input_path.with_suffix('.docx')), None)
+            shutil.rmtree(directory, ignore_errors=True)
+    
+    def status(self) -> Dict[str, Any]:
+        """JSON-serializable state for the health endpoint."""
+        with self._lock:
+            return {
+                'status': 'ok',
+                'jobs': self.jobs,
+                'documents': len(self.converters),
+                'converted': self.converted,
+                'failed': self.failed,
+                'uptime': time.time() - self.started,
+            }
+    
+    def close(self) -> None:
+        """Stop the figure pool and remove a temporary payload directory."""
+        self.pool.shutdown(wait=True)
+        if self._own_work_dir:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
+class ConversionHandler(BaseHTTPRequestHandler):
+    """HTTP API of the server.
+    
+    ``POST /convert`` takes either JSON ``{"path": ..., "output": ...}`` for
+    a document on disk, or the LaTeX source itself (any other content type).
+    The response is the DOCX file; with ``"return_docx": false`` in the
+    JSON it is ``{"output": path}`` instead. ``GET /health`` reports the
+    service status.
+    """
+    
+    server_version = 'latex2docx'
+    protocol_version = 'HTTP/1.1'
+    
+    @property
+    def service(self) -> ConversionService:
+        """Service of the server this request arrived on."""
+        return self.server.service
+    
+    def _send(self, status: int, body: bytes, content_type: str, headers: Dict[str, str] = None) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def _send_json(self, status: int, data: Dict[str, Any]) -> None:
+        self._send(status, json.dumps(data).encode('utf-8'), 'application/json')
+    
+    def do_GET(self) -> None:
+        if self.path == '/health':
+            self._send_json(200, self.service.status())
+        else:
+            self._send_json(404, {'error': f'Not found: {self.path}'})
+    
+    def do_POST(self) -> None:
+        if self.path != '/convert':
+            self._send_json(404, {'error': f'Not found: {self.path}'})
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_PAYLOAD:
+            self.close_connection = True
+            self._send_json(413, {'error': f'Request larger than {MAX_PAYLOAD} bytes'})
+            return
+        body = self.rfile.read(length)
+        content_type = (self.headers.get('Content-Type') or '').split(';')[0].strip()
+        
+        return_docx = True
+        output = docx = None
+        try:
+            if content_type == 'application/json':
+                request = json.loads(body)
+                return_docx = request.get('return_docx', True)
+                output = self.service.convert_path(request['path'], request.get('output'))
+            else:
+                docx = self.service.convert_source(body.decode('utf-8'))
+        except PermissionError as e:
+            self._send_json(403, {'error': str(e)})
+            return
+        except FileNotFoundError as e:
+            self._send_json(404, {'error': str(e)})
+            return
+        except (KeyError, TypeError, ValueError) as e:
+            self._send_json(400, {'error': f'Bad request: {e}'})
+            return
+        except Exception as e:
+            self._send_json(500, {'error': str(e) or type(e).__name__})
+            return
+        
+        if docx is not None:
+            self._send(200, docx, DOCX_CONTENT_TYPE)
+        elif return_docx:
+            self._send(200, output.read_bytes(), DOCX_CONTENT_TYPE, {'X-Latex2docx-Output': str(output)})
+        else:
+            self._send_json(200, {'output': str(output)})
+    
+    def log_message(self, format: str, *args) -> None:
+        # Unix socket clients have no address, so the default format fails
+        logger.debug(f"{self.command} {self.path}: " + format % args)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """HTTP server on a Unix domain socket, one thread per connection."""
+    
+    daemon_threads = True
+
+
+def make_server(
+    service: ConversionService,
+    socket_path: Optional[str | Path] = None,
+    port: int = 8765,
+) -> socketserver.BaseServer:
+    """
+    Create a server for ``service``, bound but not yet serving.
+    
+    Args:
+        service: Conversion service answering the requests
+        socket_path: Listen on this Unix socket instead of TCP
+        port: TCP port on localhost (0 picks a free one)
+    """
+    if socket_path:
+        socket_path = Path(socket_path)
+        if socket_path.is_socket():
+            socket_path.unlink()
+        server = UnixHTTPServer(str(socket_path), ConversionHandler)
+    else:
+        server = ThreadingHTTPServer((HOST, port), ConversionHandler)
+        server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def serve(
+    service: ConversionService,
+    socket_path: Optional[str | Path] = None,
+    port: int = 8765,
+) -> int:
+    """Serve requests until interrupted."""
+    server = make_server(service, socket_path, port)
+    if socket_path:
+        address = f"unix:{socket_path}"
+    else:
+        address = f"http://{server.server_address[0]}:{server.server_address[1]}"
+    logger.info(f"latex2docx server listening on {address} ({service.jobs} figure workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("\nShutting down")
+    finally:
+        server.server_close()
+        service.close()
+        if socket_path:
+            Path(socket_path).unlink(missing_ok=True)
+    return 0
@@ -0,0 +1,263 @@
+"""
+Splitting a LaTeX document at chapter/section boundaries for parallel pandoc runs.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+# Sectioning commands from the top down; splitting happens at \chapter if
+# the document has chapters, else at \section.
+HEADING_LEVELS = ('chapter', 'section', 'subsection', 'subsubsection')
+
+HEADING_PATTERN = re.compile(
+    r'\\(?P<name>chapter|section|subsection|subsubsection)(?P<star>\*?)'
+    r'\s*(?:\[[^\]]*\])?\s*\{'
+)
+
+# Preamble commands that would repeat the title block in every part
+FRONT_MATTER_PATTERN = re.compile(r'\\(?:title|author|date)\s*(?:\[[^\]]*\])?\s*\{')
+
+# Tokens that determine figure and table numbers
+FLOAT_PATTERN = re.compile(
+    r'\\begin\{(?P<begin>figure|table)\*?\}'
+    r'|\\end\{(?P<end>figure|table)\*?\}'
+    r'|\\caption\b'
+    r'|\\label\{(?P<label>[^}]*)\}'
+)
+
+REF_PATTERN = re.compile(r'\\ref\{(?P<key>[^}]*)\}')
+
+
+@dataclass
+class SplitDocument:
+    """A document cut into independently convertible LaTeX sources."""
+    
+    preamble: str  # everything up to and including \begin{document}
+    bodies: List[str]  # consecutive pieces of the document body
+    ending: str  # \end{document} and anything after it
+    
+    def sources(self) -> List[str]:
+        """Complete LaTeX source for every piece.
+        
+        Only the first piece keeps the title, author and date, so the title
+        block appears once in the merged document.
+        """
+        rest = strip_front_matter(self.preamble)
+        return [
+            (self.preamble if index == 0 else rest) + body + self.ending
+            for index, body in enumerate(self.bodies)
+        ]
+
+
+def _matching_brace(text: str, start: int) -> int:
+    """Index just past the group whose opening brace is at ``start``."""
+    depth = 0
+    index = start
+    while index < len(text):
+        char = text[index]
+        if char == '\\':
+            index += 2
+            continue
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return index + 1
+        index += 1
+    return len(text)
+
+
+def _is_commented(text: str, position: int) -> bool:
+    """True if ``position`` lies after an unescaped % on its line."""
+    line_start = text.rfind('\n', 0, position) + 1
+    return re.search(r'(?<!\\)%', text[line_start:position]) is not None
+
+
+def _headings(body: str) -> List[re.Match]:
+    """Sectioning commands in ``body`` that are not commented out."""
+    return [
+        match for match in HEADING_PATTERN.finditer(body)
+        if not _is_commented(body, match.start())
+    ]
+
+
+def strip_front_matter(preamble: str) -> str:
+    """Remove \\title, \\author and \\date from a preamble."""
+    pieces = []
+    position = 0
+    for match in FRONT_MATTER_PATTERN.finditer(preamble):
+        if match.start() < position or _is_commented(preamble, match.start()):
+            continue
+        pieces.append(preamble[position:match.start()])
+        position = _matching_brace(preamble, match.end() - 1)
+    pieces.append(preamble[position:])
+    return ''.join(pieces)
+
+
+def _top_level_cuts(body: str) -> List[int]:
+    """Offsets of the top-level headings (\\chapter if present, else \\section)."""
+    headings = _headings(body)
+    names = {match.group('name') for match in headings}
+    level = 'chapter' if 'chapter' in names else 'section'
+    return [match.start() for match in headings if match.group('name') == level]
+
+
+def split_document(text: str, pieces: int) -> Optional[SplitDocument]:
+    """
+    Cut a document into at most ``pieces`` parts of similar size.
+    
+    Cuts are only made before top-level headings (\\chapter if present,
+    else \\section); text before the first heading stays with the first part.
+    
+    Returns:
+        The split document, or None if it cannot be cut into two or more parts
+    """
+    begin = text.find('\\begin{document}')
+    end = text.rfind('\\end{document}')
+    if begin < 0 or end < begin or pieces < 2:
+        return None
+    begin += len('\\begin{document}')
+    body = text[begin:end]
+    
+    cuts = [cut for cut in _top_level_cuts(body) if cut > 0]
+    if not cuts:
+        return None
+    
+    # Greedy grouping of consecutive units: close a part at the cut that
+    # brings it closest to an equal share of what is left.
+    starts = [0]
+    previous = 0
+    for cut in cuts:
+        parts_left = pieces - len(starts) + 1
+        if parts_left < 2:
+            break
+        target = (len(body) - starts[-1]) / parts_left
+        size = cut - starts[-1]
+        if size >= target:
+            # Stop at the previous cut instead if that is closer to the target
+            before = previous - starts[-1]
+            if before > 0 and target - before < size - target:
+                starts.append(previous)
+                if len(starts) < pieces and cut - previous >= target:
+                    starts.append(cut)
+            else:
+                starts.append(cut)
+        previous = cut
+    if len(starts) < 2:
+        return None
+    
+    bodies = [
+        body[start:stop]
+        for start, stop in zip(starts, [*starts[1:], len(body)])
+    ]
+    return SplitDocument(text[:begin], bodies, text[end:])
+
+
+def select_sections(text: str, first: int, last: int) -> Optional[str]:
+    """
+    The document with only top-level sections ``first`` to ``last``.
+    
+    Sections are the \\chapter headings (\\section if there are none),
+    counted from 1; text before the first one is left out. References to
+    labels in the parts left out become their numbers, as with split parts.
+    
+    Returns:
+        The shortened document, or None if it has fewer than ``first`` sections
+    """
+    begin = text.find('\\begin{document}')
+    end = text.rfind('\\end{document}')
+    if begin < 0 or end < begin:
+        return None
+    begin += len('\\begin{document}')
+    body = text[begin:end]
+    
+    cuts = _top_level_cuts(body)
+    if first < 1 or first > len(cuts):
+        return None
+    starts = [0, *cuts]
+    units = [body[start:stop] for start, stop in zip(starts, [*starts[1:], len(body)])]
+    document = resolve_cross_references(SplitDocument(text[:begin], units, text[end:]))
+    return document.preamble + ''.join(document.bodies[first:last + 1]) + document.ending
+
+
+def label_numbers(body: str) -> Dict[str, str]:
+    """
+    Numbers LaTeX would print for ``\\ref`` to sections, figures and tables.
+    
+    A label counts for a heading only if it directly follows it. Figures and
+    tables are numbered per chapter in documents with chapters.
+    """
+    numbers: Dict[str, str] = {}
+    headings = _headings(body)
+    has_chapters = any(match.group('name') == 'chapter' for match in headings)
+    levels = HEADING_LEVELS if has_chapters else HEADING_LEVELS[1:]
+    
+    counters = [0] * len(levels)
+    chapter_at: List[Tuple[int, int]] = []  # (position, chapter number)
+    for match in headings:
+        if match.group('star') or match.group('name') not in levels:
+            continue
+        depth = levels.index(match.group('name'))
+        counters[depth] += 1
+        counters[depth + 1:] = [0] * (len(levels) - depth - 1)
+        number = '.'.join(str(count) for count in counters[:depth + 1])
+        if has_chapters and depth == 0:
+            chapter_at.append((match.start(), counters[0]))
+        after = _matching_brace(body, match.end() - 1)
+        label = re.match(r'\s*\\label\{([^}]*)\}', body[after:])
+        if label:
+            numbers[label.group(1)] = number
+    
+    float_counts = {'figure': 0, 'table': 0}
+    current_chapter = 0
+    stack: List[List[Optional[str]]] = []  # [kind, number]
+    chapters = iter(chapter_at)
+    next_chapter = next(chapters, None)
+    for match in FLOAT_PATTERN.finditer(body):
+        if _is_commented(body, match.start()):
+            continue
+        while next_chapter is not None and next_chapter[0] < match.start():
+            current_chapter = next_chapter[1]
+            float_counts = {'figure': 0, 'table': 0}
+            next_chapter = next(chapters, None)
+        if match.group('begin'):
+            stack.append([match.group('begin'), None])
+        elif match.group('end'):
+            if stack:
+                stack.pop()
+        elif match.group('label') is not None:
+            if stack and stack[-1][1] is not None:
+                numbers.setdefault(match.group('label'), stack[-1][1])
+        elif stack and stack[-1][1] is None:
+            kind = stack[-1][0]
+            float_counts[kind] += 1
+            count = float_counts[kind]
+            stack[-1][1] = f'{current_chapter}.{count}' if has_chapters else str(count)
+    return numbers
+
+
+def resolve_cross_references(document: SplitDocument) -> SplitDocument:
+    """
+    Replace ``\\ref`` to labels defined in another part with their number.
+    
+    Pandoc only sees one part at a time, so such references would come out
+    unresolved. They become ``\\hyperref[label]{number}``, which keeps the
+    link to the (merged) target. References within a part are left to pandoc.
+    """
+    numbers = label_numbers(''.join(document.bodies))
+    owners = {}
+    for index, body in enumerate(document.bodies):
+        for label in re.findall(r'\\label\{([^}]*)\}', body):
+            owners.setdefault(label, index)
+    
+    bodies = []
+    for index, body in enumerate(document.bodies):
+        def replace(match, index=index):
+            key = match.group('key')
+            if owners.get(key, index) == index or key not in numbers:
+                return match.group(0)
+            return f'\\hyperref[{key}]{{{numbers[key]}}}'
+        bodies.append(REF_PATTERN.sub(replace, body))
+    return SplitDocument(document.preamble, bodies, document.ending)
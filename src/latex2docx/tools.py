@@ -0,0 +1,246 @@
+"""
+Running external tools (pdflatex, rasterizers, pandoc) with resource accounting.
+"""
+
+import asyncio
+import os
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional
+
+# Output kept per stream unless limits say otherwise
+DEFAULT_LOG_LIMIT = 1024 * 1024
+
+
+@dataclass
+class Limits:
+    """Bounds for one external process.
+    
+    Memory and CPU limits are set with ``ulimit`` in a POSIX shell wrapper
+    (``preexec_fn`` is unsafe with worker threads) and are ignored on other
+    platforms. The timeout kills the whole process group, so helpers such
+    as Ghostscript started by ImageMagick die too.
+    """
+    
+    timeout: Optional[float] = None  # wall-clock seconds
+    memory_mb: Optional[int] = None  # address space
+    cpu_seconds: Optional[int] = None
+    log_bytes: int = DEFAULT_LOG_LIMIT  # output kept per stream (head and tail)
+    
+    def scaled(self, factor: int) -> 'Limits':
+        """Limits for one process doing the work of ``factor`` processes."""
+        return Limits(
+            self.timeout * factor if self.timeout is not None else None,
+            self.memory_mb,
+            self.cpu_seconds * factor if self.cpu_seconds is not None else None,
+            self.log_bytes,
+        )
+    
+    def command(self, cmd: List[str]) -> List[str]:
+        """``cmd``, wrapped so the rlimits apply to it if there are any."""
+        if os.name != 'posix' or (self.memory_mb is None and self.cpu_seconds is None):
+            return list(cmd)
+        settings = []
+        if self.memory_mb is not None:
+            settings.append(f'ulimit -v {self.memory_mb * 1024}')
+        if self.cpu_seconds is not None:
+            settings.append(f'ulimit -t {self.cpu_seconds}')
+        script = '; '.join(settings) + '; exec "$0" "$@"'
+        return ['/bin/sh', '-c', script, *cmd]
+
+
+@dataclass
+class ToolRun:
+    """Outcome of one external process."""
+    
+    args: List[str]
+    returncode: int
+    stdout: str = ''
+    stderr: str = ''
+    wall: float = 0.0
+    cpu: Optional[float] = None  # user + system seconds of the child
+    timed_out: bool = False
+    
+    @property
+    def tool(self) -> str:
+        """Executable name without its directory."""
+        return Path(self.args[0]).name if self.args else ''
+
+
+def _join_capped(head: bytes, tail: bytes, total: int, limit: int) -> str:
+    """Decode captured output, marking the bytes dropped between head and tail."""
+    if total > limit:
+        head += f'\n[... {total - limit} bytes omitted ...]\n'.encode()
+    return (head + tail).decode('utf-8', errors='replace')
+
+
+def _read_capped(handle: BinaryIO, limit: int) -> str:
+    """Read a spooled output file without loading more than ``limit`` bytes."""
+    size = handle.seek(0, os.SEEK_END)
+    handle.seek(0)
+    if size <= limit:
+        return handle.read().decode('utf-8', errors='replace')
+    head = handle.read(limit // 2)
+    handle.seek(size - (limit - limit // 2))
+    return _join_capped(head, handle.read(), size, limit)
+
+
+async def _stream_capped(stream: asyncio.StreamReader, limit: int) -> str:
+    """Drain a pipe, keeping at most ``limit`` bytes (head and tail)."""
+    head = bytearray()
+    tail = bytearray()
+    total = 0
+    while chunk := await stream.read(65536):
+        total += len(chunk)
+        room = limit // 2 - len(head)
+        if room > 0:
+            head += chunk[:room]
+            chunk = chunk[room:]
+        tail += chunk
+        del tail[:max(0, len(tail) - (limit - limit // 2))]
+    return _join_capped(bytes(head), bytes(tail), total, limit)
+
+
+def _kill_group(pid: int) -> None:
+    """Kill a process started with ``start_new_session`` and its children."""
+    try:
+        if os.name == 'posix':
+            os.killpg(pid, signal.SIGKILL)
+        else:
+            os.kill(pid, signal.SIGTERM)
+    except OSError:
+        pass
+
+
+def run_tool(
+    cmd: List[str],
+    cwd: Optional[str | Path] = None,
+    env: Optional[Dict[str, str]] = None,
+    input: Optional[bytes] = None,
+    limits: Optional[Limits] = None,
+) -> ToolRun:
+    """
+    Run ``cmd`` to completion and measure it.
+    
+    Output goes to temporary files rather than pipes, so the child can be
+    reaped with ``os.wait4`` to get its own CPU time even while other
+    threads run tools concurrently, and so a chatty tool costs disk rather
+    than memory.
+    
+    Args:
+        cmd: Command line
+        cwd: Working directory
+        env: Environment (inherited if None)
+        input: Bytes fed to stdin
+        limits: Timeout, rlimits and log size (default: no timeout or
+            rlimits, output capped at ``DEFAULT_LOG_LIMIT`` per stream)
+    
+    Raises:
+        OSError: If the tool cannot be started (e.g. not installed)
+    """
+    limits = limits or Limits()
+    start = time.perf_counter()
+    with tempfile.TemporaryFile() as stdin, \
+            tempfile.TemporaryFile() as stdout, \
+            tempfile.TemporaryFile() as stderr:
+        if input:
+            stdin.write(input)
+            stdin.seek(0)
+        process = subprocess.Popen(
+            limits.command(cmd), cwd=cwd, env=env, stdin=stdin, stdout=stdout, stderr=stderr,
+            start_new_session=limits.timeout is not None
+        )
+        timed_out = threading.Event()
+        timer = None
+        if limits.timeout is not None:
+            def expire():
+                timed_out.set()
+                _kill_group(process.pid)
+            timer = threading.Timer(limits.timeout, expire)
+            timer.start()
+        
+        cpu = None
+        try:
+            if hasattr(os, 'wait4'):
+                _, status, usage = os.wait4(process.pid, 0)
+                process.returncode = os.waitstatus_to_exitcode(status)
+                cpu = usage.ru_utime + usage.ru_stime
+            else:
+                process.wait()
+        finally:
+            if timer is not None:
+                timer.cancel()
+        wall = time.perf_counter() - start
+        
+        return ToolRun(
+            list(cmd),
+            process.returncode,
+            _read_capped(stdout, limits.log_bytes),
+            _read_capped(stderr, limits.log_bytes),
+            wall,
+            cpu,
+            timed_out.is_set(),
+        )
+
+
+async def arun_tool(
+    cmd: List[str],
+    cwd: Optional[str | Path] = None,
+    env: Optional[Dict[str, str]] = None,
+    input: Optional[bytes] = None,
+    limits: Optional[Limits] = None,
+) -> ToolRun:
+    """
+    Asynchronous ``run_tool`` on top of ``asyncio.create_subprocess_exec``.
+    
+    The event loop reaps the child, so its CPU time is not available
+    (``cpu`` is None).
+    
+    Raises:
+        OSError: If the tool cannot be started (e.g. not installed)
+    """
+    limits = limits or Limits()
+    start = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        *limits.command(cmd),
+        cwd=cwd,
+        env=env,
+        stdin=asyncio.subprocess.PIPE if input else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=limits.timeout is not None,
+    )
+    
+    async def communicate():
+        if input:
+            process.stdin.write(input)
+            await process.stdin.drain()
+            process.stdin.close()
+        outputs = await asyncio.gather(
+            _stream_capped(process.stdout, limits.log_bytes),
+            _stream_capped(process.stderr, limits.log_bytes),
+        )
+        await process.wait()
+        return outputs
+    
+    timed_out = False
+    try:
+        stdout, stderr = await asyncio.wait_for(communicate(), limits.timeout)
+    except asyncio.TimeoutError:
+        timed_out = True
+        _kill_group(process.pid)
+        await process.wait()
+        stdout = stderr = ''
+    return ToolRun(
+        list(cmd),
+        process.returncode,
+        stdout,
+        stderr,
+        time.perf_counter() - start,
+        timed_out=timed_out,
+    )
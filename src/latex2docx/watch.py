@@ -0,0 +1,94 @@
+"""
+Watch mode: reconvert a document whenever its sources change.
+"""
+
+import logging
+import time
+from pathlib import Path
+from typing import Dict, Set, Tuple
+
+from latex2docx.converter import TexConverter
+
+logger = logging.getLogger(__name__)
+
+# File state used to detect changes: (mtime in ns, size)
+FileState = Tuple[int, int]
+
+
+class Watcher:
+    """Poll a document's sources and rerun only the affected stages."""
+    
+    def __init__(self, converter: TexConverter, interval: float = 1.0):
+        """
+        Initialize watcher.
+        
+        Args:
+            converter: Converter for the watched document
+            interval: Seconds between polls
+        """
+        self.converter = converter
+        self.interval = interval
+        self.state: Dict[Path, FileState] = {}
+    
+    def snapshot(self) -> Dict[Path, FileState]:
+        """Record the state of every watched file."""
+        state = {}
+        for path in self.converter.watched_paths():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            state[path] = (stat.st_mtime_ns, stat.st_size)
+        return state
+    
+    def changed_paths(self) -> Set[Path]:
+        """Return files added, removed or modified since the last poll."""
+        current = self.snapshot()
+        changed = {
+            path for path in current.keys() | self.state.keys()
+            if current.get(path) != self.state.get(path)
+        }
+        self.state = current
+        return changed
+    
+    def rebuild(self) -> bool:
+        """
+        Rerun the pipeline; stages whose inputs are unchanged are skipped.
+        
+        The stage manifest decides what reruns: a text edit reruns
+        preprocessing onwards, a data edit only recompiles the figures that
+        read it (via the figure cache) and reruns pandoc.
+        
+        Returns:
+            True if the DOCX was rebuilt successfully
+        """
+        try:
+            self.converter.run_stages()
+        except Exception as e:
+            logger.error(f"\nError: {e}")
+            return False
+        return True
+    
+    def poll(self) -> bool:
+        """Check once for changes and rebuild if needed.
+        
+        Returns:
+            True if a rebuild was attempted
+        """
+        changed = self.changed_paths()
+        if not changed:
+            return False
+        for path in sorted(changed):
+            logger.info(f"Changed: {path}")
+        self.rebuild()
+        return True
+    
+    def run(self) -> int:
+        """Convert once, then keep reconverting until interrupted."""
+        self.state = self.snapshot()
+        self.rebuild()
+        logger.info(f"\nWatching {len(self.state)} files (Ctrl+C to stop)")
+        while True:
+            time.sleep(self.interval)
+            if self.poll():
+                logger.info("\nWaiting for changes...")
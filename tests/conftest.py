@@ -8,6 +8,14 @@ import tempfile
 import shutil
 
 
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    """Keep the figure cache out of the user's home directory."""
+    cache_dir = tmp_path / 'figure-cache'
+    monkeypatch.setenv('LATEX2DOCX_CACHE_DIR', str(cache_dir))
+    return cache_dir
+
+
 @pytest.fixture
 def temp_dir():
     """Create a temporary directory for test files."""
@@ -72,3 +80,52 @@ def sample_tikz_tex(temp_dir):
     tex_file = temp_dir / "tikz_test.tex"
     tex_file.write_text(tex_content, encoding='utf-8')
     return tex_file
+
+
+@pytest.fixture
+def fake_toolchain(monkeypatch):
+    """Replace pdflatex/convert/pandoc with fakes that just create their outputs.
+    
+    A figure whose source contains ``FAIL`` produces no PDF. Every call is
+    recorded in the returned list as ``(command, cwd)``.
+    """
+    import subprocess
+    from latex2docx.tools import ToolRun
+    calls = []
+    
+    def fake_version(cmd, cwd=None, **kwargs):
+        calls.append((list(cmd), cwd))
+        return subprocess.CompletedProcess(cmd, 0, f'{cmd[0]} 1.0\n', '')
+    
+    def fake_run_tool(cmd, cwd=None, env=None, input=None, limits=None):
+        calls.append((list(cmd), cwd))
+        workdir = Path(cwd) if cwd else Path.cwd()
+        if cmd[0] == 'pdflatex' and '-ini' in cmd:
+            jobname = next(arg for arg in cmd if arg.startswith('-jobname='))
+            (workdir / f"{jobname.split('=', 1)[1]}.fmt").write_bytes(b'fmt')
+        elif cmd[0] == 'pdflatex':
+            tex_file = workdir / cmd[-1]
+            source = tex_file.read_text(encoding='utf-8')
+            if 'FAIL' in source:
+                return ToolRun(list(cmd), 1, wall=0.01, cpu=0.01)
+            pages = source.count('\\begin{standalone}') or 1
+            tex_file.with_suffix('.pdf').write_bytes(b'%PDF-1.5 ' + source.encode('utf-8'))
+            tex_file.with_suffix('.log').write_text(
+                f'Output written on {tex_file.stem}.pdf ({pages} pages, 1 bytes).\n'
+            )
+        elif cmd[0] == 'convert':
+            pdf_name, _, page = cmd[cmd.index('-density') + 2].partition('[')
+            pdf_bytes = (workdir / pdf_name).read_bytes()
+            (workdir / cmd[-1]).write_bytes(b'\x89PNG ' + pdf_bytes + page.encode())
+        elif cmd[0] == 'pandoc':
+            output = workdir / cmd[cmd.index('-o') + 1]
+            output.write_bytes(b'PK fake docx')
+        return ToolRun(list(cmd), 0, wall=0.01, cpu=0.01)
+    
+    async def fake_arun_tool(cmd, cwd=None, env=None, input=None, limits=None):
+        return fake_run_tool(cmd, cwd=cwd, env=env, input=input, limits=limits)
+    
+    monkeypatch.setattr('subprocess.run', fake_version)
+    monkeypatch.setattr('latex2docx.tools.run_tool', fake_run_tool)
+    monkeypatch.setattr('latex2docx.tools.arun_tool', fake_arun_tool)
+    return calls
@@ -0,0 +1,118 @@
+"""
+Unit tests for batch conversion.
+"""
+
+import pytest
+from latex2docx.batch import BatchConverter
+from latex2docx.cli import main
+
+
+@pytest.fixture
+def document_tree(temp_dir, sample_tikz_tex):
+    """Several small documents in nested directories."""
+    text = sample_tikz_tex.read_text()
+    paths = []
+    for relative in ['a/one.tex', 'a/two.tex', 'b/c/three.tex']:
+        path = temp_dir / 'docs' / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+        paths.append(path)
+    return paths
+
+
+class TestExpandPatterns:
+    """Test glob expansion of batch inputs."""
+    
+    def test_recursive_glob(self, document_tree, temp_dir):
+        """Test that ** matches nested directories."""
+        paths = BatchConverter.expand_patterns([str(temp_dir / 'docs' / '**' / '*.tex')])
+        assert paths == sorted(document_tree)
+    
+    def test_duplicates_are_removed(self, document_tree):
+        """Test that overlapping patterns yield each file once."""
+        paths = BatchConverter.expand_patterns([str(document_tree[0])] * 2)
+        assert paths == [document_tree[0]]
+
+
+class TestOutputPaths:
+    """Test where batch outputs are written."""
+    
+    def test_out_dir_mirrors_input_tree(self, document_tree, temp_dir):
+        """Test that the layout below the common root is kept."""
+        batch = BatchConverter(document_tree, temp_dir / 'build')
+        assert batch.output_for(document_tree[2]) == temp_dir / 'build' / 'b' / 'c' / 'three.docx'
+    
+    def test_default_is_next_to_input(self, document_tree):
+        """Test the output location without --out-dir."""
+        batch = BatchConverter(document_tree)
+        assert batch.output_for(document_tree[0]) == document_tree[0].with_suffix('.docx')
+
+
+class TestBatchRun:
+    """Test converting several documents."""
+    
+    def test_converts_every_document(self, document_tree, temp_dir, fake_toolchain, capsys):
+        """Test that all documents are converted and summarized."""
+        batch = BatchConverter(document_tree, temp_dir / 'build', jobs=2)
+        
+        assert batch.run() == 0
+        assert all(result.output_path.exists() for result in batch.results)
+        assert 'Converted: 3/3' in capsys.readouterr().out
+    
+    def test_shared_cache_compiles_identical_figures_once(self, document_tree, temp_dir, fake_toolchain):
+        """Test that documents with the same figures reuse each other's PNGs."""
+        BatchConverter(document_tree, temp_dir / 'build', jobs=2).run()
+        
+        pdflatex_runs = [
+            cmd for cmd, _ in fake_toolchain
+            if cmd[0] == 'pdflatex' and cmd[-1] != '--version'
+        ]
+        assert len(pdflatex_runs) == 2
+    
+    def test_same_labels_in_one_directory_stay_apart(self, document_tree, temp_dir, fake_toolchain):
+        """Test that documents sharing a directory and labels keep their own figures."""
+        one, two = document_tree[:2]
+        two.write_text(two.read_text().replace('circle (1cm)', 'circle (3cm)'))
+        
+        BatchConverter(document_tree, jobs=2).run()
+        
+        png_dir = one.parent / 'tikz_png'
+        assert b'circle (1cm)' in (png_dir / 'one' / 'circle.png').read_bytes()
+        assert b'circle (3cm)' in (png_dir / 'two' / 'circle.png').read_bytes()
+    
+    def test_failures_are_reported(self, document_tree, temp_dir, fake_toolchain, capsys):
+        """Test that a failing document makes the batch fail but not stop."""
+        document_tree[1].write_text('')
+        batch = BatchConverter(document_tree, temp_dir / 'build', jobs=2)
+        document_tree[1].unlink()
+        
+        assert batch.run() == 1
+        assert [result.ok for result in batch.results] == [True, False, True]
+        assert 'FAILED' in capsys.readouterr().out
+    
+    def test_cli_batch_mode(self, document_tree, temp_dir, fake_toolchain):
+        """Test the --batch/--out-dir command line."""
+        pattern = str(temp_dir / 'docs' / '**' / '*.tex')
+        result = main(['--batch', pattern, '--out-dir', str(temp_dir / 'build')])
+        
+        assert result == 0
+        assert (temp_dir / 'build' / 'a' / 'one.docx').exists()
+    
+    def test_cli_batch_clean(self, document_tree, temp_dir, fake_toolchain):
+        """Test that --clean cleans up after every document of a batch."""
+        pattern = str(temp_dir / 'docs' / '**' / '*.tex')
+        result = main(['--batch', pattern, '--out-dir', str(temp_dir / 'build'), '--clean'])
+        
+        assert result == 0
+        assert (temp_dir / 'build' / 'a' / 'one.docx').exists()
+        assert not (temp_dir / 'docs' / 'a' / 'tikz_png').exists()
+        assert not (temp_dir / 'docs' / 'b' / 'c' / 'tikz_extracted').exists()
+    
+    @pytest.mark.parametrize('option', [['--watch'], ['--profile'], ['--metrics-json', 'm.json']])
+    def test_cli_batch_rejects_single_document_options(self, option, temp_dir, capsys):
+        """Test that options batch mode cannot honor are refused."""
+        with pytest.raises(SystemExit) as exc_info:
+            main(['--batch', str(temp_dir / '*.tex'), *option])
+        
+        assert exc_info.value.code == 2
+        assert f'{option[0]} cannot be used with --batch' in capsys.readouterr().err
@@ -0,0 +1,69 @@
+"""
+Tests for the synthetic benchmark documents and the stage timer.
+"""
+
+import logging
+
+from benchmarks.bench_pipeline import run_benchmark, runnable_stages
+from benchmarks.synthetic import DocumentSpec, generate_document, write_project
+from latex2docx.converter import TexConverter
+from latex2docx.figures import index_figures
+
+
+class TestSyntheticDocument:
+    """Test the document generator parameters."""
+    
+    def test_figure_count_and_labels(self):
+        """Test that every figure is a labelled tikzpicture."""
+        text = generate_document(DocumentSpec(figures=7, size_mb=0.01))
+        assert text.count(r'\begin{tikzpicture}') == 7
+        assert len(index_figures(text).labels) == 7
+    
+    def test_size_target(self):
+        """Test that the document grows to the requested size."""
+        text = generate_document(DocumentSpec(figures=2, size_mb=0.2))
+        assert len(text) >= 0.2 * 1024 * 1024
+    
+    def test_ab_depth(self):
+        """Test that formulas nest \\ab groups to the requested depth."""
+        text = generate_document(DocumentSpec(figures=1, ab_depth=6, size_mb=0.01))
+        _, counts = TexConverter._replace_ab_brackets(text)
+        assert counts['paren'] > 0 and counts['pipe'] > 0
+        assert sum(counts.values()) == text.count(r'\ab') - text.count(r'\newcommand{\ab}')
+    
+    def test_plot_data_files(self, temp_dir):
+        """Test that plot figures get data files with the requested rows."""
+        main = write_project(temp_dir, DocumentSpec(figures=4, plot_points=25, size_mb=0.01))
+        data = sorted((temp_dir / 'data').glob('*.dat'))
+        assert [path.name for path in data] == ['plot0000.dat', 'plot0002.dat']
+        assert len(data[0].read_text().splitlines()) == 26
+        assert 'data/plot0002.dat' in main.read_text()
+
+
+class TestStageBenchmark:
+    """Test timing the pipeline stages."""
+    
+    def test_pure_python_stages_need_no_tools(self):
+        """Test that tool stages are skipped unless requested."""
+        assert runnable_stages() == ['preprocess_tex', 'extract_tikz', 'replace_tikz']
+    
+    def test_report_has_timings(self, temp_dir):
+        """Test a small benchmark run end to end."""
+        report = run_benchmark(
+            DocumentSpec(figures=3, size_mb=0.02), repeat=2, work_dir=temp_dir
+        )
+        assert set(report['stages']) == {'preprocess_tex', 'extract_tikz', 'replace_tikz'}
+        for stats in report['stages'].values():
+            assert 0 <= stats['min'] <= stats['median'] <= stats['max']
+        assert report['skipped'] == ['compile_tikz', 'convert_to_docx']
+    
+    def test_global_logger_is_untouched(self, temp_dir, caplog):
+        """Test that the benchmark quiets its converters, not the module logger."""
+        logger = logging.getLogger('latex2docx.converter')
+        level = logger.level
+        with caplog.at_level(logging.DEBUG, logger='latex2docx.converter'):
+            run_benchmark(DocumentSpec(figures=1, size_mb=0.01), repeat=1, work_dir=temp_dir)
+            assert logger.level == logging.DEBUG
+        
+        assert logger.level == level
+        assert [record for record in caplog.records if record.levelno < logging.WARNING] == []
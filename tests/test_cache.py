@@ -0,0 +1,169 @@
+"""
+Unit tests for the compiled figure cache.
+"""
+
+import os
+import stat
+
+import pytest
+from latex2docx.cache import FigureCache, atomic_copy, atomic_write_bytes, default_cache_dir, link_file
+
+
+class TestCacheKey:
+    """Test cache key derivation."""
+    
+    def test_key_is_stable(self):
+        """Test that identical inputs produce identical keys."""
+        key1 = FigureCache.make_key('source', [], 300, [])
+        key2 = FigureCache.make_key('source', [], 300, [])
+        assert key1 == key2
+    
+    def test_key_depends_on_source_and_dpi(self):
+        """Test that source and DPI both change the key."""
+        base = FigureCache.make_key('source', [], 300, [])
+        assert FigureCache.make_key('other', [], 300, []) != base
+        assert FigureCache.make_key('source', [], 150, []) != base
+    
+    def test_key_depends_on_data_contents(self, temp_dir):
+        """Test that editing a referenced data file changes the key."""
+        data = temp_dir / 'sample.dat'
+        data.write_text('1 2\n')
+        before = FigureCache.make_key('source', [data], 300, [])
+        data.write_text('1 3\n')
+        after = FigureCache.make_key('source', [data], 300, [])
+        assert before != after
+
+
+class TestCacheStore:
+    """Test storing and looking up PNGs."""
+    
+    def test_default_dir_honours_environment(self, isolated_cache):
+        """Test that LATEX2DOCX_CACHE_DIR overrides the default."""
+        assert default_cache_dir() == isolated_cache
+    
+    def test_lookup_miss_returns_none(self, temp_dir):
+        """Test lookup of an unknown key."""
+        cache = FigureCache(temp_dir)
+        assert cache.lookup('ab' * 32) is None
+    
+    def test_store_then_lookup(self, temp_dir):
+        """Test that a stored PNG is found again."""
+        cache = FigureCache(temp_dir / 'cache')
+        png = temp_dir / 'figure.png'
+        png.write_bytes(b'png')
+        cache.store('cd' * 32, png)
+        
+        hit = cache.lookup('cd' * 32)
+        assert hit is not None
+        assert hit.read_bytes() == b'png'
+    
+    def test_store_leaves_no_temporary_files(self, temp_dir):
+        """Test that publishing is atomic and cleans up after itself."""
+        cache = FigureCache(temp_dir / 'cache')
+        png = temp_dir / 'figure.png'
+        png.write_bytes(b'png')
+        stored = cache.store('ef' * 32, png)
+        
+        assert [p.name for p in stored.parent.iterdir()] == [stored.name]
+
+
+class TestAtomicCopy:
+    """Test atomic file publishing."""
+    
+    def test_atomic_copy_replaces_target(self, temp_dir):
+        """Test that an existing target is replaced."""
+        source = temp_dir / 'new.png'
+        target = temp_dir / 'out' / 'figure.png'
+        source.write_bytes(b'new')
+        target.parent.mkdir()
+        target.write_bytes(b'old')
+        
+        atomic_copy(source, target)
+        
+        assert target.read_bytes() == b'new'
+    
+    def test_link_file_shares_data(self, temp_dir):
+        """Test that a linked data file is the original, not a copy."""
+        source = temp_dir / 'big.dat'
+        target = temp_dir / 'scratch' / 'data' / 'big.dat'
+        source.write_bytes(b'1 2\n')
+        
+        link_file(source, target)
+        
+        assert target.read_bytes() == b'1 2\n'
+        assert target.stat().st_ino == source.stat().st_ino
+
+
+class TestCacheLock:
+    """Test per-key locking."""
+    
+    def test_lock_serializes_threads(self, temp_dir):
+        """Test that only one holder of a key's lock runs at a time."""
+        import threading
+        import time
+        cache = FigureCache(temp_dir)
+        active = []
+        overlaps = []
+        
+        def worker():
+            with cache.lock('12' * 32):
+                active.append(1)
+                overlaps.append(len(active))
+                time.sleep(0.01)
+                active.pop()
+        
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert overlaps == [1, 1, 1, 1]
+    
+    def test_distinct_keys_do_not_wait(self, temp_dir):
+        """Test that locks on different keys are held concurrently."""
+        import threading
+        from latex2docx import cache as cache_module
+        cache = FigureCache(temp_dir)
+        keys = [f'{n:064x}' for n in range(32)]
+        barrier = threading.Barrier(len(keys), timeout=5)
+        
+        def worker(key):
+            with cache.lock(key):
+                # Every thread must hold its lock at once to pass the barrier
+                barrier.wait()
+        
+        threads = [threading.Thread(target=worker, args=(key,)) for key in keys]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert not barrier.broken
+        assert cache_module._THREAD_LOCKS == {}
+
+
+@pytest.mark.skipif(os.name != 'posix', reason='POSIX permissions')
+class TestSharedPermissions:
+    """Test that cache files can be used by other users' jobs."""
+    
+    def test_published_files_follow_umask(self, temp_dir):
+        """Test that atomic writes are not left private (mkstemp uses 0600)."""
+        from latex2docx.cache import FILE_MODE
+        atomic_write_bytes(temp_dir / 'out.docx', b'data')
+        
+        assert stat.S_IMODE((temp_dir / 'out.docx').stat().st_mode) == FILE_MODE
+    
+    def test_cache_dirs_and_locks_are_group_writable(self, temp_dir):
+        """Test group write on cache directories, entries' locks and setgid."""
+        cache = FigureCache(temp_dir / 'cache')
+        png = temp_dir / 'figure.png'
+        png.write_bytes(b'png')
+        key = 'ab' * 32
+        
+        with cache.lock(key):
+            cache.store(key, png)
+        
+        directory = cache.path_for(key).parent
+        assert directory.stat().st_mode & (stat.S_IWGRP | stat.S_ISGID) == stat.S_IWGRP | stat.S_ISGID
+        assert cache.path_for(key).with_suffix('.lock').stat().st_mode & stat.S_IWGRP
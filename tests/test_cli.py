@@ -28,6 +28,28 @@ class TestCLIMain:
         result = main(['nonexistent.tex'])
         assert result == 1
     
+    def test_main_rejects_zero_jobs(self):
+        """Test that --jobs must be a positive number."""
+        with pytest.raises(SystemExit) as exc_info:
+            main(['input.tex', '--jobs', '0'])
+        assert exc_info.value.code == 2
+    
+    def test_main_rejects_bad_section_range(self):
+        """Test that --sections needs N or FIRST-LAST with FIRST <= LAST."""
+        for value in ['0', '3-2', 'two']:
+            with pytest.raises(SystemExit) as exc_info:
+                main(['input.tex', '--sections', value])
+            assert exc_info.value.code == 2
+    
+    @pytest.mark.parametrize('option', [
+        ['--clean'], ['--profile'], ['--metrics-json', 'metrics.json'],
+    ])
+    def test_main_rejects_options_ignored_by_watch(self, option):
+        """Test that --watch refuses options its rebuilds would not apply."""
+        with pytest.raises(SystemExit) as exc_info:
+            main(['input.tex', '--watch', *option])
+        assert exc_info.value.code == 2
+    
     def test_main_with_clean_only(self, temp_dir, monkeypatch):
         """Test --clean-only flag."""
         monkeypatch.chdir(temp_dir)
@@ -56,3 +78,13 @@ class TestCleanupTool:
         
         assert not (temp_dir / 'tikz_extracted').exists()
         assert not (temp_dir / 'tikz_png').exists()
+    
+    def test_cleanup_removes_stage_manifests(self, temp_dir, monkeypatch):
+        """Test that cleanup removes the .latex2docx state directory."""
+        monkeypatch.chdir(temp_dir)
+        (temp_dir / '.latex2docx').mkdir()
+        (temp_dir / '.latex2docx' / 'main.manifest.json').write_text('{}')
+        
+        CleanupTool.run()
+        
+        assert not (temp_dir / '.latex2docx').exists()
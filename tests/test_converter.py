@@ -7,9 +7,12 @@ Following TDD principles:
 3. Refactor
 """
 
+import os
+import re
 import pytest
 from pathlib import Path
-from latex2docx.converter import TexConverter
+from latex2docx.converter import DRAFT_DPI, FIGURE_IMAGE_PATTERN, TexConverter
+from latex2docx.history import timing_key
 
 
 class TestTexConverterInit:
@@ -38,6 +41,30 @@ class TestTexConverterInit:
         output_file = "custom_output.docx"
         converter = TexConverter(sample_tex_file, output_file)
         assert converter.output_path.name == output_file
+    
+    def test_paths_are_absolute(self, sample_tex_file, monkeypatch):
+        """Test that relative paths are fixed against the cwd at creation."""
+        monkeypatch.chdir(sample_tex_file.parent)
+        converter = TexConverter(sample_tex_file.name, 'out.docx')
+        monkeypatch.chdir('/')
+        
+        assert converter.input_path == sample_tex_file
+        assert converter.output_path == sample_tex_file.parent / 'out.docx'
+        assert converter.tikz_dir.is_absolute()
+    
+    def test_logging_is_per_instance(self, sample_tex_file, caplog):
+        """Test that no global logging setup happens and levels are per converter."""
+        import logging
+        handlers = list(logging.getLogger().handlers)
+        
+        with caplog.at_level('INFO'):
+            TexConverter(sample_tex_file, log_level=logging.WARNING)
+            quiet = len(caplog.records)
+            TexConverter(sample_tex_file)
+        
+        assert logging.getLogger().handlers == handlers
+        assert quiet == 0
+        assert caplog.records[0].document == str(sample_tex_file)
 
 
 class TestBracketReplacement:
@@ -67,35 +94,48 @@ class TestBracketReplacement:
         content = r"$\ab\{x\}$"
         result, iterations = TexConverter._replace_ab_brackets(content)
         assert r"\left\{x\right\}" in result
-
-
-class TestLabelExtraction:
-    """Test label extraction from LaTeX."""
     
-    def test_extract_single_label(self):
-        """Test extracting a single figure label."""
-        content = r"\label{fig:test}"
-        labels = TexConverter._extract_labels(content)
-        assert 'test' in labels
+    def test_square_bracket_replacement(self):
+        """Test \\ab[x] replacement."""
+        content = r"$\ab[x]$"
+        result, counts = TexConverter._replace_ab_brackets(content)
+        assert r"\left[x\right]" in result
+        assert counts['bracket'] == 1
     
-    def test_extract_multiple_labels(self):
-        """Test extracting multiple labels."""
-        content = r"""
-        \label{fig:first}
-        \label{fig:second}
-        \label{fig:third}
-        """
-        labels = TexConverter._extract_labels(content)
-        assert len(labels) == 3
-        assert 'first' in labels
-        assert 'second' in labels
-        assert 'third' in labels
+    def test_deep_nesting_replacement(self):
+        """Test that four or more nested levels are all converted."""
+        content = r"$\ab(a + \ab(b + \ab(c + \ab(d + \ab(e)))))$"
+        result, counts = TexConverter._replace_ab_brackets(content)
+        assert r"\ab" not in result
+        assert result.count(r"\left(") == 5
+        assert result.count(r"\right)") == 5
+        assert counts['paren'] == 5
+    
+    def test_plain_parentheses_inside_are_balanced(self):
+        """Test that ordinary parentheses do not close \\ab early."""
+        content = r"$\ab(f(g(x)) + h(y))$"
+        result, counts = TexConverter._replace_ab_brackets(content)
+        assert result == r"$\left(f(g(x)) + h(y)\right)$"
+    
+    def test_mixed_delimiters_are_counted(self):
+        """Test per-kind rewrite counts."""
+        content = r"$\ab|\ab(x)| + \ab\{\ab[y]\}$"
+        result, counts = TexConverter._replace_ab_brackets(content)
+        assert result == r"$\left|\left(x\right)\right| + \left\{\left[y\right]\right\}$"
+        assert counts == {'paren': 1, 'bracket': 1, 'brace': 1, 'pipe': 1}
+    
+    def test_unclosed_bracket_is_left_alone(self):
+        """Test that an unmatched \\ab( is not rewritten."""
+        content = r"$\ab(x + y$"
+        result, counts = TexConverter._replace_ab_brackets(content)
+        assert result == content
+        assert counts['paren'] == 0
     
-    def test_extract_no_labels(self):
-        """Test with content that has no labels."""
-        content = "No labels here"
-        labels = TexConverter._extract_labels(content)
-        assert len(labels) == 0
+    def test_similar_macros_are_ignored(self):
+        """Test that \\abs( is not mistaken for \\ab(."""
+        content = r"$\abs(x)$"
+        result, counts = TexConverter._replace_ab_brackets(content)
+        assert result == content
 
 
 class TestStandaloneTex:
@@ -169,6 +209,957 @@ class TestTikzExtraction:
         
         tex_files = list(converter.tikz_dir.glob('*.tex'))
         assert len(tex_files) == 2
+    
+    def test_extract_does_not_copy_data(self, sample_tikz_tex):
+        """Test that data/ stays where it is and TeX is pointed at it."""
+        data = sample_tikz_tex.parent / 'data'
+        data.mkdir()
+        (data / 'huge.dat').write_text('1 2\n')
+        converter = TexConverter(sample_tikz_tex)
+        converter.extract_tikz()
+        
+        assert not (converter.tikz_dir / 'data').exists()
+        texinputs = converter._tex_env()['TEXINPUTS'].split(os.pathsep)
+        assert str(sample_tikz_tex.parent) in texinputs
+    
+    def test_cwd_relative_data_is_linked(self, temp_dir, fake_toolchain, monkeypatch):
+        """Test that ./-relative files are linked into the figure's directory."""
+        from latex2docx import tools
+        (temp_dir / 'data').mkdir()
+        (temp_dir / 'data' / 'used.dat').write_text('1 2\n')
+        (temp_dir / 'data' / 'unused.dat').write_text('3 4\n')
+        tex_file = temp_dir / 'plot.tex'
+        tex_file.write_text(
+            "\\documentclass{article}\n\\begin{document}\n\\begin{figure}"
+            "\\begin{tikzpicture}\\begin{axis}\\addplot table {./data/used.dat};"
+            "\\end{axis}\\end{tikzpicture}\\label{fig:plot}\\end{figure}\n\\end{document}\n",
+            encoding='utf-8'
+        )
+        fake = tools.run_tool
+        visible = []
+        
+        def record(cmd, cwd=None, **kwargs):
+            if cmd[0] == 'pdflatex':
+                visible.extend(sorted(p.name for p in (Path(cwd) / 'data').glob('*')))
+            return fake(cmd, cwd=cwd, **kwargs)
+        
+        monkeypatch.setattr('latex2docx.tools.run_tool', record)
+        converter = TexConverter(tex_file, use_cache=False)
+        converter.extract_tikz()
+        converter.compile_tikz()
+        
+        assert visible == ['used.dat']
+    
+    def test_parent_relative_data_is_staged(self, temp_dir, fake_toolchain, monkeypatch):
+        """Test that ../-relative files resolve from the figure's directory as from the document's."""
+        from latex2docx import tools
+        (temp_dir / 'shared').mkdir()
+        (temp_dir / 'shared' / 'x.dat').write_text('1 2\n')
+        tex_file = temp_dir / 'doc' / 'plot.tex'
+        tex_file.parent.mkdir()
+        tex_file.write_text(
+            "\\documentclass{article}\n\\begin{document}\n\\begin{figure}"
+            "\\begin{tikzpicture}\\begin{axis}\\addplot table {../shared/x.dat};"
+            "\\end{axis}\\end{tikzpicture}\\label{fig:plot}\\end{figure}\n\\end{document}\n",
+            encoding='utf-8'
+        )
+        fake = tools.run_tool
+        seen = []
+        
+        def record(cmd, cwd=None, **kwargs):
+            if cmd[0] == 'pdflatex':
+                data = Path(cwd) / '..' / 'shared' / 'x.dat'
+                seen.append(data.read_text() if data.is_file() else None)
+                assert not Path(cwd).resolve().is_relative_to(temp_dir.resolve())
+            return fake(cmd, cwd=cwd, **kwargs)
+        
+        monkeypatch.setattr('latex2docx.tools.run_tool', record)
+        converter = TexConverter(tex_file)
+        converter.extract_tikz()
+        
+        assert converter.compile_tikz() == 1
+        assert seen == ['1 2\n']
+        # The cache key hashes the same file the figure was compiled with
+        source = converter._figure_source(converter.figure_files[0])
+        key = converter._figure_key(source)
+        (temp_dir / 'shared' / 'x.dat').write_text('3 4\n')
+        assert TexConverter(tex_file)._figure_key(source) != key
+
+
+class TestTikzCompilation:
+    """Test TikZ compilation to PNG."""
+    
+    def test_compile_creates_png_for_each_figure(self, sample_tikz_tex, fake_toolchain):
+        """Test that every extracted figure ends up as a PNG."""
+        converter = TexConverter(sample_tikz_tex, jobs=4)
+        converter.extract_tikz()
+        count = converter.compile_tikz()
+        
+        assert count == 2
+        assert (converter.png_dir / 'circle.png').exists()
+        assert (converter.png_dir / 'rectangle.png').exists()
+    
+    def test_compile_runs_tools_in_private_directory(self, sample_tikz_tex, fake_toolchain):
+        """Test that tools get an explicit private cwd instead of a global chdir."""
+        converter = TexConverter(sample_tikz_tex, jobs=2)
+        converter.extract_tikz()
+        converter.compile_tikz()
+        
+        tool_cwds = [cwd for cmd, cwd in fake_toolchain if cmd[-1] != '--version']
+        assert tool_cwds
+        assert all(cwd is not None and cwd != converter.tikz_dir for cwd in tool_cwds)
+    
+    def test_concurrent_jobs_compile_shared_figure_once(self, sample_tikz_tex, fake_toolchain, temp_dir):
+        """Test that jobs sharing a cache directory compile each figure once."""
+        import threading
+        cache_dir = temp_dir / 'shared-cache'
+        converters = [
+            TexConverter(sample_tikz_tex, cache_dir=cache_dir) for _ in range(3)
+        ]
+        converters[0].extract_tikz()
+        for converter in converters:
+            converter.figure_files = converters[0].figure_files
+        
+        threads = [threading.Thread(target=c.compile_tikz) for c in converters]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        pdflatex_runs = [
+            cmd for cmd, _ in fake_toolchain
+            if cmd[0] == 'pdflatex' and cmd[-1] != '--version'
+        ]
+        assert len(pdflatex_runs) == 2
+        assert (converters[0].png_dir / 'circle.png').exists()
+    
+    def test_compile_reports_failures_in_order(self, sample_tikz_tex, fake_toolchain, caplog):
+        """Test that per-figure results are reported in name order."""
+        converter = TexConverter(sample_tikz_tex, jobs=4)
+        converter.extract_tikz()
+        broken = converter.tikz_dir / 'circle.tex'
+        broken.write_text(broken.read_text().replace('circle', 'FAIL'))
+        
+        with caplog.at_level('INFO'):
+            count = converter.compile_tikz()
+        
+        assert count == 1
+        messages = [r.getMessage() for r in caplog.records]
+        assert messages.index('    ✗ Failed: circle.tex') < messages.index('    ✓ rectangle.pdf')
+    
+    def test_timed_out_figure_is_reported(self, sample_tikz_tex, fake_toolchain, monkeypatch, caplog):
+        """Test that a figure killed by the timeout says so and the rest continue."""
+        from latex2docx import tools
+        fake = tools.run_tool
+        
+        def hang_on_circle(cmd, cwd=None, limits=None, **kwargs):
+            if cmd[0] == 'pdflatex' and 'circle' in cmd[-1]:
+                assert limits.timeout == 5
+                return tools.ToolRun(list(cmd), -9, timed_out=True)
+            return fake(cmd, cwd=cwd, limits=limits, **kwargs)
+        
+        monkeypatch.setattr('latex2docx.tools.run_tool', hang_on_circle)
+        converter = TexConverter(sample_tikz_tex, timeout=5, use_cache=False)
+        converter.extract_tikz()
+        
+        with caplog.at_level('INFO'):
+            assert converter.compile_tikz() == 1
+        
+        messages = [r.getMessage() for r in caplog.records]
+        assert '    ✗ Failed: circle.tex (pdflatex timed out after 5 s)' in messages
+        assert converter.metrics.counters['timeouts'] == 1
+    
+    def test_fail_fast_stops_at_first_failure(self, sample_tikz_tex, fake_toolchain):
+        """Test that fail_fast skips figures not started and raises."""
+        converter = TexConverter(sample_tikz_tex, jobs=1, use_cache=False, fail_fast=True)
+        converter.extract_tikz()
+        broken = converter.tikz_dir / 'circle.tex'
+        broken.write_text(broken.read_text().replace('circle', 'FAIL'))
+        # Known to be the slowest figure, so it is scheduled first
+        converter.timings.record('circle', timing_key(broken.read_text()), {'pdflatex': 30.0})
+        
+        with pytest.raises(RuntimeError, match='circle'):
+            converter.compile_tikz()
+        
+        pdflatex = [cmd[-1] for cmd, _ in fake_toolchain if cmd[0] == 'pdflatex']
+        assert pdflatex == ['circle.tex']
+    
+    
+    def test_figure_sources_are_read_once(self, sample_tikz_tex, fake_toolchain, monkeypatch):
+        """Test that fingerprint, scheduling, compile and timings share one read."""
+        reads = []
+        original = TexConverter._read_text
+        read_text = Path.read_text
+        
+        def counting_read(self, path):
+            reads.append(path.name)
+            return original(self, path)
+        
+        def uncounted_read(path, *args, **kwargs):
+            assert path.parent.parent.name != 'tikz_extracted', f'uncounted read of {path}'
+            return read_text(path, *args, **kwargs)
+        
+        monkeypatch.setattr(TexConverter, '_read_text', counting_read)
+        monkeypatch.setattr(Path, 'read_text', uncounted_read)
+        converter = TexConverter(sample_tikz_tex, sample_tikz_tex.parent / 'out.docx', jobs=1)
+        converter.run_stages()
+        
+        assert sorted(name for name in reads if name in ('circle.tex', 'rectangle.tex')) == [
+            'circle.tex', 'rectangle.tex'
+        ]
+        assert sorted(converter.timings.figures) == ['circle', 'rectangle']
+    
+    def test_data_files_are_hashed_once(self, temp_dir, fake_toolchain, monkeypatch):
+        """Test that the stage fingerprint and the cache lookup share one figure key."""
+        (temp_dir / 'data').mkdir()
+        data = temp_dir / 'data' / 'points.dat'
+        data.write_text('1 2\n')
+        tex_file = temp_dir / 'plot.tex'
+        tex_file.write_text(
+            "\\documentclass{article}\n\\begin{document}\n\\begin{figure}"
+            "\\begin{tikzpicture}\\begin{axis}\\addplot table {data/points.dat};"
+            "\\end{axis}\\end{tikzpicture}\\label{fig:plot}\\end{figure}\n\\end{document}\n",
+            encoding='utf-8'
+        )
+        reads = []
+        read_bytes = Path.read_bytes
+        
+        def counting_read(path):
+            if path == data:
+                reads.append(path)
+            return read_bytes(path)
+        
+        monkeypatch.setattr(Path, 'read_bytes', counting_read)
+        TexConverter(tex_file, temp_dir / 'out.docx').run_stages()
+        
+        assert len(reads) == 1
+    
+    def test_slowest_figure_compiles_first(self, sample_tikz_tex, fake_toolchain):
+        """Test that recorded times decide the compile order for the next run."""
+        first = TexConverter(sample_tikz_tex, jobs=1, use_cache=False)
+        first.extract_tikz()
+        first.compile_tikz()
+        history = first.timings.figures
+        assert sorted(history) == ['circle', 'rectangle']
+        assert set(history['circle']['seconds']) == {'pdflatex', 'rasterize'}
+        
+        history['circle']['seconds']['pdflatex'] = 60.0
+        first.timings.save(['circle'])
+        fake_toolchain.clear()
+        second = TexConverter(sample_tikz_tex, jobs=1, use_cache=False)
+        second.extract_tikz()
+        second.compile_tikz()
+        
+        pdflatex = [cmd[-1] for cmd, _ in fake_toolchain if cmd[0] == 'pdflatex']
+        assert pdflatex == ['circle.tex', 'rectangle.tex']
+    
+    def test_second_compile_uses_cache(self, sample_tikz_tex, fake_toolchain):
+        """Test that unchanged figures skip pdflatex and convert."""
+        first = TexConverter(sample_tikz_tex)
+        first.extract_tikz()
+        first.compile_tikz()
+        
+        fake_toolchain.clear()
+        second = TexConverter(sample_tikz_tex)
+        second.extract_tikz()
+        count = second.compile_tikz()
+        
+        assert count == 2
+        assert not [cmd for cmd, _ in fake_toolchain if cmd[-1] != '--version']
+        assert (second.png_dir / 'circle.png').exists()
+    
+    def test_no_cache_always_compiles(self, sample_tikz_tex, fake_toolchain):
+        """Test that use_cache=False bypasses the cache."""
+        for _ in range(2):
+            fake_toolchain.clear()
+            converter = TexConverter(sample_tikz_tex, use_cache=False)
+            converter.extract_tikz()
+            converter.compile_tikz()
+        
+        assert [cmd[0] for cmd, _ in fake_toolchain].count('pdflatex') == 2
+
+
+class TestSingleRunCompilation:
+    """Test compiling all figures in one pdflatex run."""
+    
+    @staticmethod
+    def real_runs(calls, tool):
+        return [cmd for cmd, _ in calls if cmd[0] == tool and cmd[-1] != '--version']
+    
+    def test_single_run_compiles_once(self, sample_tikz_tex, fake_toolchain):
+        """Test that all figures share one pdflatex process."""
+        converter = TexConverter(sample_tikz_tex, single_run=True)
+        converter.extract_tikz()
+        count = converter.compile_tikz()
+        
+        assert count == 2
+        pdflatex = self.real_runs(fake_toolchain, 'pdflatex')
+        assert [cmd[-1] for cmd in pdflatex] == ['figures.tex']
+        pages = [cmd[cmd.index('-density') + 2] for cmd in self.real_runs(fake_toolchain, 'convert')]
+        assert sorted(pages) == ['figures.pdf[0]', 'figures.pdf[1]']
+        assert (converter.png_dir / 'circle.png').exists()
+        assert (converter.png_dir / 'rectangle.png').exists()
+    
+    def test_failed_single_run_falls_back(self, sample_tikz_tex, fake_toolchain):
+        """Test that a broken shared run is retried figure by figure."""
+        converter = TexConverter(sample_tikz_tex, single_run=True)
+        converter.extract_tikz()
+        broken = converter.tikz_dir / 'circle.tex'
+        broken.write_text(broken.read_text().replace('circle', 'FAIL'))
+        
+        count = converter.compile_tikz()
+        
+        assert count == 1
+        names = [cmd[-1] for cmd in self.real_runs(fake_toolchain, 'pdflatex')]
+        assert names[0] == 'figures.tex'
+        assert sorted(names[1:]) == ['circle.tex', 'rectangle.tex']
+    
+    def test_edited_preamble_is_compiled_separately(self, sample_tikz_tex, fake_toolchain):
+        """Test that a hand-edited standalone file keeps its own preamble.
+        
+        With a single standard figure left there is nothing to share, so
+        both figures are compiled on their own.
+        """
+        converter = TexConverter(sample_tikz_tex, single_run=True, use_cache=False)
+        converter.extract_tikz()
+        edited = converter.tikz_dir / 'circle.tex'
+        edited.write_text(edited.read_text().replace(
+            '\\usepackage{pgfplots}', '\\usepackage{pgfplots}\n\\usepackage{xcolor}'))
+        
+        converter.compile_tikz()
+        
+        names = [cmd[-1] for cmd in self.real_runs(fake_toolchain, 'pdflatex')]
+        assert sorted(names) == ['circle.tex', 'rectangle.tex']
+    
+    def test_multi_page_backend_renders_range_at_once(self, sample_tikz_tex, fake_toolchain):
+        """Test that pdftoppm rasterizes all pages of the shared PDF in one call."""
+        converter = TexConverter(
+            sample_tikz_tex, single_run=True, jobs=1, rasterizer='pdftoppm'
+        )
+        poppler = []
+        
+        def fake_pdftoppm(cmd, cwd=None, **kwargs):
+            poppler.append(list(cmd))
+            for page in (1, 2):
+                (Path(cwd) / f'{cmd[-1]}-{page}.png').write_bytes(b'\x89PNG')
+        
+        converter.rasterizer.runner = fake_pdftoppm
+        converter.extract_tikz()
+        
+        assert converter.compile_tikz() == 2
+        assert len(poppler) == 1
+        assert poppler[0][poppler[0].index('-f') + 1] == '1'
+        assert poppler[0][poppler[0].index('-l') + 1] == '2'
+        assert (converter.png_dir / 'circle.png').exists()
+    
+    def test_multi_tex_puts_each_figure_on_a_page(self):
+        """Test the combined document layout."""
+        result = TexConverter._make_multi_tex(['A', 'B'])
+        assert r"\documentclass[multi=true]{standalone}" in result
+        assert result.count(r"\begin{standalone}") == 2
+
+
+class TestPrecompiledPreamble:
+    """Test compiling figures with a dumped preamble format."""
+    
+    @staticmethod
+    def pdflatex_runs(calls):
+        return [cmd for cmd, _ in calls if cmd[0] == 'pdflatex' and cmd[-1] != '--version']
+    
+    def test_format_is_built_once_and_used(self, sample_tikz_tex, fake_toolchain):
+        """Test that figures compile with -fmt after a single -ini run."""
+        converter = TexConverter(sample_tikz_tex, precompile_preamble=True, use_cache=False)
+        converter.extract_tikz()
+        assert converter.compile_tikz() == 2
+        
+        runs = self.pdflatex_runs(fake_toolchain)
+        assert len([cmd for cmd in runs if '-ini' in cmd]) == 1
+        figure_runs = [cmd for cmd in runs if '-ini' not in cmd]
+        assert all(f'-fmt={converter.format_name}' in cmd for cmd in figure_runs)
+    
+    def test_format_is_reused_between_runs(self, sample_tikz_tex, fake_toolchain):
+        """Test that the cached format is not rebuilt."""
+        for _ in range(2):
+            converter = TexConverter(sample_tikz_tex, precompile_preamble=True, use_cache=False)
+            converter.extract_tikz()
+            converter.compile_tikz()
+        
+        runs = self.pdflatex_runs(fake_toolchain)
+        assert len([cmd for cmd in runs if '-ini' in cmd]) == 1
+    
+    def test_missing_format_falls_back(self, sample_tikz_tex, fake_toolchain, monkeypatch):
+        """Test that figures still compile if the format cannot be built."""
+        converter = TexConverter(sample_tikz_tex, precompile_preamble=True, use_cache=False)
+        monkeypatch.setattr(converter, '_prepare_format', lambda: None)
+        converter.extract_tikz()
+        
+        assert converter.compile_tikz() == 2
+        assert not any('-fmt' in ' '.join(cmd) for cmd in self.pdflatex_runs(fake_toolchain))
+
+
+class TestReferencedFiles:
+    """Test detection of files read by TikZ code."""
+    
+    def test_finds_plot_tables(self):
+        """Test \\addplot table and file references."""
+        code = r"""
+        \addplot table[x=a, y=b] {data/one.dat};
+        \addplot+ [mark=none] file {data/two.dat};
+        """
+        assert TexConverter._referenced_files(code) == ['data/one.dat', 'data/two.dat']
+    
+    def test_finds_input_and_graphics(self):
+        """Test \\input and \\includegraphics references."""
+        code = r"\input{parts/axis}\node {\includegraphics[width=1cm]{img.png}};"
+        assert TexConverter._referenced_files(code) == ['parts/axis', 'img.png']
+
+
+class TestStageFingerprints:
+    """Test skipping of pipeline stages whose inputs are unchanged."""
+    
+    @staticmethod
+    def run_pipeline(tex_file, **kwargs):
+        converter = TexConverter(tex_file, tex_file.parent / 'out.docx', **kwargs)
+        converter.run_stages()
+        return converter
+    
+    def test_unchanged_rerun_skips_everything(self, sample_tikz_tex, fake_toolchain):
+        """Test that a second run of an unchanged document runs no tools."""
+        first = self.run_pipeline(sample_tikz_tex)
+        pandoc_mtime = first.pandoc_path.stat().st_mtime_ns
+        
+        fake_toolchain.clear()
+        self.run_pipeline(sample_tikz_tex)
+        
+        assert [cmd for cmd, _ in fake_toolchain if cmd[-1] != '--version'] == []
+        assert first.pandoc_path.stat().st_mtime_ns == pandoc_mtime
+    
+    def test_deleted_output_is_rebuilt(self, sample_tikz_tex, fake_toolchain):
+        """Test that a missing DOCX makes pandoc run again."""
+        first = self.run_pipeline(sample_tikz_tex)
+        first.output_path.unlink()
+        
+        fake_toolchain.clear()
+        self.run_pipeline(sample_tikz_tex)
+        
+        assert [cmd[0] for cmd, _ in fake_toolchain if cmd[-1] != '--version'] == ['pandoc']
+    
+    def test_force_reruns_every_stage(self, sample_tikz_tex, fake_toolchain):
+        """Test that force=True ignores the manifest."""
+        self.run_pipeline(sample_tikz_tex)
+        
+        fake_toolchain.clear()
+        self.run_pipeline(sample_tikz_tex, force=True)
+        
+        assert 'pandoc' in [cmd[0] for cmd, _ in fake_toolchain]
+    
+    def test_failed_figures_are_retried(self, sample_tikz_tex, fake_toolchain):
+        """Test that a partially failed compile stage is not marked current."""
+        sample_tikz_tex.write_text(sample_tikz_tex.read_text().replace('circle', 'FAIL'))
+        self.run_pipeline(sample_tikz_tex)
+        
+        fake_toolchain.clear()
+        self.run_pipeline(sample_tikz_tex)
+        
+        assert 'pdflatex' in [cmd[0] for cmd, _ in fake_toolchain]
+
+
+class TestInMemoryPipeline:
+    """Test the pipeline without intermediate files."""
+    
+    def test_no_intermediate_files_written(self, sample_tikz_tex, fake_toolchain):
+        """Test that keep_intermediates=False writes only the DOCX."""
+        converter = TexConverter(
+            sample_tikz_tex, sample_tikz_tex.parent / 'out.docx',
+            keep_intermediates=False
+        )
+        converter.run_stages()
+        
+        assert converter.output_path.exists()
+        assert not converter.pandoc_path.exists()
+        assert not converter.images_path.exists()
+    
+    def test_final_latex_is_piped_to_pandoc(self, sample_tikz_tex, fake_toolchain, monkeypatch):
+        """Test that pandoc receives the final LaTeX on stdin."""
+        from latex2docx import tools
+        received = {}
+        fake_run = tools.run_tool
+        
+        def capture(cmd, **kwargs):
+            if cmd[0] == 'pandoc':
+                received['input'] = kwargs.get('input')
+            return fake_run(cmd, **kwargs)
+        
+        monkeypatch.setattr('latex2docx.tools.run_tool', capture)
+        converter = TexConverter(
+            sample_tikz_tex, sample_tikz_tex.parent / 'out.docx',
+            keep_intermediates=False
+        )
+        converter.run_stages()
+        
+        assert b'tikz_png/tikz_test/circle.png' in received['input']
+        assert b'\\begin{tikzpicture}' not in received['input']
+    
+    def test_input_is_read_once(self, sample_tikz_tex, fake_toolchain, monkeypatch):
+        """Test that the source document is opened only once, fingerprints included."""
+        import builtins
+        import io
+        opens = []
+        
+        def counting(original):
+            def counting_open(file, *args, **kwargs):
+                if isinstance(file, (str, os.PathLike)) and Path(file) == sample_tikz_tex:
+                    opens.append(file)
+                return original(file, *args, **kwargs)
+            return counting_open
+        
+        for module in (builtins, io, os):
+            monkeypatch.setattr(module, 'open', counting(module.open))
+        converter = TexConverter(
+            sample_tikz_tex, sample_tikz_tex.parent / 'out.docx',
+            keep_intermediates=False
+        )
+        converter.run_stages()
+        
+        assert len(opens) == 1
+    
+    def test_unchanged_rerun_still_skips_pandoc(self, sample_tikz_tex, fake_toolchain):
+        """Test that fingerprints work without intermediate files."""
+        for _ in range(2):
+            fake_toolchain.clear()
+            TexConverter(
+                sample_tikz_tex, sample_tikz_tex.parent / 'out.docx',
+                keep_intermediates=False
+            ).run_stages()
+        
+        assert 'pandoc' not in [cmd[0] for cmd, _ in fake_toolchain]
+
+
+class TestSplitPandoc:
+    """Test parallel pandoc runs over document parts."""
+    
+    def test_parts_are_converted_and_merged(self, temp_dir, fake_toolchain, monkeypatch):
+        """Test that each part gets its own pandoc run and only the first a TOC."""
+        tex_file = temp_dir / 'long.tex'
+        tex_file.write_text(
+            "\\documentclass{article}\n\\begin{document}\n"
+            + ''.join(f"\\section{{S{n}}}\n" + 'x' * 100 + "\n" for n in range(4))
+            + "\\end{document}\n",
+            encoding='utf-8'
+        )
+        merged = {}
+        
+        def fake_merge(parts, output):
+            merged['parts'] = [part.read_bytes() for part in parts]
+            output.write_bytes(b'PK merged')
+        
+        monkeypatch.setattr('latex2docx.converter.merge_docx', fake_merge)
+        converter = TexConverter(tex_file, temp_dir / 'out.docx', jobs=2, split_pandoc=True)
+        converter.run_stages()
+        
+        pandoc_runs = [cmd for cmd, _ in fake_toolchain if cmd[0] == 'pandoc']
+        assert len(pandoc_runs) == 2
+        assert ['--toc' in cmd for cmd in pandoc_runs] == [True, False]
+        assert len(merged['parts']) == 2
+        assert converter.output_path.read_bytes() == b'PK merged'
+    
+    def test_unsplittable_document_uses_one_run(self, sample_tex_file, fake_toolchain):
+        """Test the fallback for documents with a single section."""
+        converter = TexConverter(
+            sample_tex_file, sample_tex_file.parent / 'out.docx', jobs=4, split_pandoc=True
+        )
+        converter.run_stages()
+        
+        pandoc_runs = [cmd for cmd, _ in fake_toolchain if cmd[0] == 'pandoc']
+        assert len(pandoc_runs) == 1
+        assert converter.output_path.exists()
+
+
+class TestMultiFileProject:
+    """Test documents split over \\input/\\include files."""
+    
+    @pytest.fixture
+    def project(self, temp_dir):
+        """Main file including a chapter with a figure and an \\ab macro."""
+        (temp_dir / 'chapters').mkdir()
+        (temp_dir / 'chapters' / 'one.tex').write_text(
+            "\\section{One}\n$\\ab(x)$\n"
+            "\\begin{figure}\n\\begin{tikzpicture}\\draw (0,0) -- (1,1);\\end{tikzpicture}\n"
+            "\\label{fig:line}\n\\end{figure}\n",
+            encoding='utf-8'
+        )
+        (temp_dir / 'chapters' / 'two.tex').write_text("\\section{Two}\nText.\n", encoding='utf-8')
+        main = temp_dir / 'main.tex'
+        main.write_text(
+            "\\documentclass{article}\n\\usepackage{tikz}\n\\begin{document}\n"
+            "\\input{chapters/one}\n\\include{chapters/two}\n\\end{document}\n",
+            encoding='utf-8'
+        )
+        return main
+    
+    def test_included_files_are_processed(self, project, fake_toolchain):
+        """Test that figures and \\ab in included files are converted."""
+        converter = TexConverter(project, project.parent / 'out.docx', keep_intermediates=False)
+        converter.run_stages()
+        
+        assert (project.parent / 'tikz_png' / 'main' / 'line.png').exists()
+        assert '\\left(x\\right)' in converter.pandoc_text
+        assert 'tikz_png/main/line.png' in converter.images_text
+        assert '\\input{chapters/one}' not in converter.images_text
+    
+    def test_editing_a_chapter_reprocesses_only_it(self, project, fake_toolchain, monkeypatch):
+        """Test that unchanged files reuse their preprocessed text."""
+        converter = TexConverter(project, project.parent / 'out.docx', keep_intermediates=False)
+        converter.run_stages()
+        processed = []
+        original = TexConverter._preprocess_text
+        
+        def spy(content):
+            processed.append(content)
+            return original(content)
+        
+        monkeypatch.setattr(converter, '_preprocess_text', spy)
+        chapter = project.parent / 'chapters' / 'two.tex'
+        chapter.write_text("\\section{Two}\nEdited.\n", encoding='utf-8')
+        converter.run_stages()
+        
+        assert processed == ["\\section{Two}\nEdited.\n"]
+        assert 'Edited.' in converter.images_text
+    
+    def test_chapter_edit_invalidates_stages(self, project, fake_toolchain):
+        """Test that stage fingerprints cover included files."""
+        for text in ("\\section{Two}\nText.\n", "\\section{Two}\nNew.\n"):
+            (project.parent / 'chapters' / 'two.tex').write_text(text, encoding='utf-8')
+            fake_toolchain.clear()
+            TexConverter(project, project.parent / 'out.docx').run_stages()
+        
+        assert 'pandoc' in [cmd[0] for cmd, _ in fake_toolchain]
+
+
+class TestAsyncPipeline:
+    """Test the asyncio entry point."""
+    
+    def test_arun_converts(self, sample_tikz_tex, fake_toolchain):
+        """Test that arun produces the same outputs as run."""
+        import asyncio
+        converter = TexConverter(sample_tikz_tex, sample_tikz_tex.parent / 'out.docx')
+        
+        assert asyncio.run(converter.arun()) == 0
+        assert converter.output_path.exists()
+        assert (sample_tikz_tex.parent / 'tikz_png' / 'tikz_test' / 'circle.png').exists()
+        assert (sample_tikz_tex.parent / 'tikz_png' / 'tikz_test' / 'rectangle.png').exists()
+    
+    def test_arun_shares_the_manifest(self, sample_tikz_tex, fake_toolchain):
+        """Test that a sync run after an async one skips everything."""
+        import asyncio
+        asyncio.run(TexConverter(sample_tikz_tex, sample_tikz_tex.parent / 'out.docx').arun())
+        fake_toolchain.clear()
+        TexConverter(sample_tikz_tex, sample_tikz_tex.parent / 'out.docx').run_stages()
+        
+        assert [cmd[0] for cmd, _ in fake_toolchain] == []
+    
+    def test_figures_are_limited_to_jobs(self, temp_dir, fake_toolchain, monkeypatch):
+        """Test that at most ``jobs`` figures are compiled at once."""
+        import asyncio
+        from latex2docx import tools
+        figures = ''.join(
+            f"\\begin{{figure}}\\begin{{tikzpicture}}\\draw (0,0) -- ({n},1);"
+            f"\\end{{tikzpicture}}\\label{{fig:f{n}}}\\end{{figure}}\n"
+            for n in range(6)
+        )
+        tex_file = temp_dir / 'many.tex'
+        tex_file.write_text(
+            "\\documentclass{article}\n\\begin{document}\n" + figures + "\\end{document}\n",
+            encoding='utf-8'
+        )
+        fake = tools.arun_tool
+        running = []
+        peak = [0]
+        
+        async def slow(cmd, **kwargs):
+            running.append(cmd)
+            peak[0] = max(peak[0], len(running))
+            await asyncio.sleep(0.01)
+            result = await fake(cmd, **kwargs)
+            running.remove(cmd)
+            return result
+        
+        monkeypatch.setattr('latex2docx.tools.arun_tool', slow)
+        converter = TexConverter(tex_file, temp_dir / 'out.docx', jobs=2, use_cache=False)
+        
+        assert asyncio.run(converter.arun()) == 0
+        assert len(list((temp_dir / 'tikz_png' / 'many').glob('*.png'))) == 6
+        assert peak[0] == 2
+    
+    def test_cancelled_run_releases_cache_lock(self, sample_tikz_tex, fake_toolchain, monkeypatch):
+        """Test that cancelling arun mid-compile leaves no cache lock held."""
+        import asyncio
+        import time
+        from latex2docx import cache, tools
+        fake = tools.run_tool
+        
+        def slow(cmd, **kwargs):
+            time.sleep(0.2)
+            return fake(cmd, **kwargs)
+        
+        monkeypatch.setattr('latex2docx.tools.run_tool', slow)
+        converter = TexConverter(sample_tikz_tex, sample_tikz_tex.parent / 'out.docx')
+        
+        async def cancel_soon():
+            await asyncio.wait_for(converter.arun(), timeout=0.1)
+        
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(cancel_soon())
+        # asyncio.run waits for the worker threads, which release their locks
+        assert cache._THREAD_LOCKS == {}
+
+
+class TestPngOptimization:
+    """Test figure optimization and duplicate embedding."""
+    
+    def test_identical_figures_are_embedded_once(self, temp_dir, fake_toolchain, caplog):
+        """Test that byte-identical PNGs share one image path."""
+        figure = "\\begin{tikzpicture}\\draw (0,0) -- (1,1);\\end{tikzpicture}"
+        tex_file = temp_dir / 'twice.tex'
+        tex_file.write_text(
+            "\\documentclass{article}\n\\begin{document}\n"
+            f"\\begin{{figure}}{figure}\\label{{fig:first}}\\end{{figure}}\n"
+            f"\\begin{{figure}}{figure}\\label{{fig:second}}\\end{{figure}}\n"
+            "\\end{document}\n",
+            encoding='utf-8'
+        )
+        converter = TexConverter(tex_file, temp_dir / 'out.docx', optimize_png=True)
+        
+        with caplog.at_level('INFO'):
+            converter.run_stages()
+        
+        assert converter.images_text.count('tikz_png/twice/first.png') == 2
+        assert 'tikz_png/twice/second.png' not in converter.images_text
+        assert converter.metrics.counters['png_bytes_saved'] > 0
+        assert any('duplicate figures once' in r.getMessage() for r in caplog.records)
+    
+    def test_optimizer_is_part_of_cache_key(self, sample_tikz_tex, fake_toolchain):
+        """Test that optimized and plain PNGs are cached separately."""
+        source = "\\documentclass{standalone}\\begin{document}x\\end{document}"
+        plain = TexConverter(sample_tikz_tex)._figure_key(source)
+        optimized = TexConverter(sample_tikz_tex, optimize_png=True)._figure_key(source)
+        
+        assert plain != optimized
+    
+    def test_duplicates_are_left_alone_without_optimization(self, temp_dir, fake_toolchain):
+        """Test that the default output keeps one image per figure."""
+        figure = "\\begin{tikzpicture}\\draw (0,0) -- (1,1);\\end{tikzpicture}"
+        tex_file = temp_dir / 'twice.tex'
+        tex_file.write_text(
+            "\\documentclass{article}\n\\begin{document}\n"
+            f"\\begin{{figure}}{figure}\\label{{fig:first}}\\end{{figure}}\n"
+            f"\\begin{{figure}}{figure}\\label{{fig:second}}\\end{{figure}}\n"
+            "\\end{document}\n",
+            encoding='utf-8'
+        )
+        converter = TexConverter(tex_file, temp_dir / 'out.docx')
+        converter.run_stages()
+        
+        assert 'tikz_png/twice/second.png' in converter.images_text
+
+
+class TestFigureNames:
+    """Test that figures keep the same names through every stage."""
+    
+    def test_names_follow_own_labels(self, temp_dir, fake_toolchain):
+        """Test that non-TikZ labels and unlabeled figures do not mix up PNGs."""
+        tex = temp_dir / 'mixed.tex'
+        tex.write_text(
+            "\\documentclass{article}\n\\begin{document}\n"
+            "\\begin{figure}\\includegraphics{photo}\\label{fig:photo}\\end{figure}\n"
+            "\\begin{tikzpicture}\\draw (0,0) -- (1,1);\\end{tikzpicture}\n"
+            "\\begin{figure}\\begin{tikzpicture}\\draw (0,0) -- (2,1);\\end{tikzpicture}"
+            "\\label{fig:plot}\\end{figure}\n\\end{document}\n",
+            encoding='utf-8'
+        )
+        converter = TexConverter(tex, temp_dir / 'mixed.docx')
+        
+        converter.run_stages()
+        
+        pngs = sorted(path.name for path in converter.png_dir.glob('*.png'))
+        assert pngs == ['plot.png', 'tikz-01.png']
+        images = FIGURE_IMAGE_PATTERN.findall(converter._images_content())
+        assert images == ['tikz_png/mixed/tikz-01.png', 'tikz_png/mixed/plot.png']
+        assert b'(2,1)' in (converter.png_dir / 'plot.png').read_bytes()
+
+
+class TestDraftMode:
+    """Test quick previews with reused and placeholder figures."""
+    
+    def test_stale_figures_are_reused(self, sample_tikz_tex, fake_toolchain, temp_dir):
+        """Test that a draft takes existing PNGs instead of recompiling."""
+        TexConverter(sample_tikz_tex, temp_dir / 'out.docx').run_stages()
+        before = (temp_dir / 'tikz_png' / 'tikz_test' / 'circle.png').read_bytes()
+        sample_tikz_tex.write_text(
+            sample_tikz_tex.read_text().replace('circle (1cm)', 'circle (2cm)'), encoding='utf-8'
+        )
+        fake_toolchain.clear()
+        
+        TexConverter(sample_tikz_tex, temp_dir / 'out.docx', draft=True).run_stages()
+        
+        tools = [cmd for cmd, _ in fake_toolchain if cmd[0] in ('pdflatex', 'convert', 'pandoc')]
+        assert [cmd[0] for cmd in tools] == ['pandoc']
+        assert '--toc' not in tools[0]
+        assert (temp_dir / 'tikz_png' / 'tikz_test' / 'circle.png').read_bytes() == before
+    
+    def test_new_figures_at_draft_dpi_and_placeholders(self, sample_tikz_tex, fake_toolchain, temp_dir):
+        """Test that new figures are rasterized at low DPI and failures become placeholders."""
+        sample_tikz_tex.write_text(
+            sample_tikz_tex.read_text().replace('circle', 'FAIL'), encoding='utf-8'
+        )
+        converter = TexConverter(sample_tikz_tex, temp_dir / 'out.docx', draft=True)
+        
+        converter.run_stages()
+        
+        converts = [cmd for cmd, _ in fake_toolchain if cmd[0] == 'convert']
+        assert [cmd[cmd.index('-density') + 1] for cmd in converts] == [str(DRAFT_DPI)]
+        images = re.findall(r'includegraphics\[[^]]*\]\{([^}]+)\}', converter._images_content())
+        assert images == ['.latex2docx/placeholder.png', 'tikz_png/tikz_test/rectangle.png']
+        assert (temp_dir / '.latex2docx' / 'placeholder.png').read_bytes().startswith(b'\x89PNG')
+    
+    def test_sections_range(self, temp_dir, fake_toolchain):
+        """Test that only the selected sections reach pandoc."""
+        received = {}
+        tex = temp_dir / 'sections.tex'
+        tex.write_text(
+            "\\documentclass{article}\n\\begin{document}\n"
+            "\\section{One}\nfirst\n\\section{Two}\nsecond\n\\section{Three}\nthird\n"
+            "\\end{document}\n",
+            encoding='utf-8'
+        )
+        converter = TexConverter(tex, temp_dir / 'out.docx', sections=(2, 2))
+        run_tool = converter._run_tool
+        
+        def record(cmd, label='', **kwargs):
+            received.update(kwargs)
+            return run_tool(cmd, label, **kwargs)
+        
+        converter._run_tool = record
+        converter.run_stages()
+        
+        assert b'second' in received['input']
+        assert b'first' not in received['input'] and b'third' not in received['input']
+
+
+class TestIncrementalDocx:
+    """Test replacing changed figures inside the existing DOCX."""
+    
+    @pytest.fixture
+    def docx_toolchain(self, fake_toolchain, monkeypatch):
+        """Fake tools writing real PNG headers and a real DOCX zip."""
+        import re
+        import struct
+        import zipfile
+        from latex2docx import tools
+        fake = tools.run_tool
+        
+        def run_tool(cmd, cwd=None, input=None, **kwargs):
+            if cmd[0] == 'pandoc':
+                fake_toolchain.append((list(cmd), cwd))
+                text = input.decode('utf-8')
+                output = Path(cwd) / cmd[cmd.index('-o') + 1]
+                with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as docx:
+                    docx.writestr('word/document.xml', text)
+                    for n, name in enumerate(re.findall(r'tikz_png/[^}]+', text), 1):
+                        docx.writestr(f'word/media/image{n}.png', (Path(cwd) / name).read_bytes())
+                return tools.ToolRun(list(cmd), 0)
+            result = fake(cmd, cwd=cwd, input=input, **kwargs)
+            if cmd[0] == 'convert':
+                png = Path(cwd) / cmd[-1]
+                width = 200 if b'wide' in png.read_bytes() else 100
+                header = b'\x89PNG\r\n\x1a\n\0\0\0\rIHDR' + struct.pack('>II', width, 50)
+                png.write_bytes(header + png.read_bytes())
+            return result
+        
+        monkeypatch.setattr('latex2docx.tools.run_tool', run_tool)
+        return fake_toolchain
+    
+    @staticmethod
+    def pandoc_runs(calls):
+        return [cmd for cmd, _ in calls if cmd[0] == 'pandoc']
+    
+    @staticmethod
+    def media(docx):
+        import zipfile
+        with zipfile.ZipFile(docx) as archive:
+            assert archive.testzip() is None
+            return {name: archive.read(name) for name in archive.namelist() if 'media' in name}
+    
+    def test_figure_change_skips_pandoc(self, sample_tikz_tex, docx_toolchain):
+        """Test that only the changed image entry is replaced."""
+        output = sample_tikz_tex.parent / 'out.docx'
+        TexConverter(sample_tikz_tex, output).run_stages()
+        before = self.media(output)
+        sample_tikz_tex.write_text(
+            sample_tikz_tex.read_text().replace('circle (1cm)', 'circle (2cm)'), encoding='utf-8'
+        )
+        docx_toolchain.clear()
+        
+        TexConverter(sample_tikz_tex, output).run_stages()
+        after = self.media(output)
+        
+        assert self.pandoc_runs(docx_toolchain) == []
+        assert b'circle (2cm)' in after['word/media/image1.png']
+        assert after['word/media/image2.png'] == before['word/media/image2.png']
+    
+    def test_text_change_runs_pandoc(self, sample_tikz_tex, docx_toolchain):
+        """Test that edited text goes through pandoc again."""
+        output = sample_tikz_tex.parent / 'out.docx'
+        TexConverter(sample_tikz_tex, output).run_stages()
+        sample_tikz_tex.write_text(
+            sample_tikz_tex.read_text().replace('\\caption{Circle}', '\\caption{Round}'), encoding='utf-8'
+        )
+        docx_toolchain.clear()
+        
+        TexConverter(sample_tikz_tex, output).run_stages()
+        
+        assert len(self.pandoc_runs(docx_toolchain)) == 1
+    
+    def test_new_aspect_ratio_runs_pandoc(self, sample_tikz_tex, docx_toolchain):
+        """Test that a figure whose shape changes is laid out by pandoc again."""
+        output = sample_tikz_tex.parent / 'out.docx'
+        TexConverter(sample_tikz_tex, output).run_stages()
+        sample_tikz_tex.write_text(
+            sample_tikz_tex.read_text().replace('circle (1cm)', 'circle (1cm) node {wide}'), encoding='utf-8'
+        )
+        docx_toolchain.clear()
+        
+        TexConverter(sample_tikz_tex, output).run_stages()
+        
+        assert len(self.pandoc_runs(docx_toolchain)) == 1
+
+
+class TestConcurrentConverters:
+    """Test several converters in threads of one process."""
+    
+    def test_documents_convert_in_parallel_threads(self, temp_dir, fake_toolchain):
+        """Test that converters in different directories do not interfere."""
+        from concurrent.futures import ThreadPoolExecutor
+        converters = []
+        for n in range(4):
+            tex_file = temp_dir / f'doc{n}' / 'main.tex'
+            tex_file.parent.mkdir()
+            tex_file.write_text(
+                "\\documentclass{article}\n\\begin{document}\n"
+                f"\\begin{{figure}}\\begin{{tikzpicture}}\\draw (0,0) -- ({n},1);"
+                "\\end{tikzpicture}\\label{fig:plot}\\end{figure}\n\\end{document}\n",
+                encoding='utf-8'
+            )
+            converters.append(TexConverter(tex_file, tex_file.with_suffix('.docx'), jobs=2))
+        
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            codes = list(pool.map(lambda converter: converter.run(), converters))
+        
+        assert codes == [0, 0, 0, 0]
+        for n, converter in enumerate(converters):
+            png = converter.png_dir / 'plot.png'
+            assert f'({n},1)'.encode() in png.read_bytes()
+            assert converter.output_path.exists()
 
 
 class TestCleanup:
@@ -197,3 +1188,48 @@ class TestCleanup:
         converter.cleanup()
         
         assert not converter.pandoc_path.exists()
+    
+    def test_cleanup_keeps_other_documents_logs(self, sample_tikz_tex, fake_toolchain, temp_dir):
+        """Test that pandoc logs are per document and cleanup removes only its own."""
+        other = temp_dir / 'other.tex'
+        other.write_text(sample_tikz_tex.read_text(), encoding='utf-8')
+        first = TexConverter(sample_tikz_tex, temp_dir / 'out.docx')
+        second = TexConverter(other, temp_dir / 'other.docx')
+        first.run_stages()
+        second.run_stages()
+        assert first.pandoc_log.name == 'tikz_test_pandoc.log'
+        assert first.pandoc_log.exists() and second.pandoc_log.exists()
+        
+        first.cleanup()
+        
+        assert not first.pandoc_log.exists()
+        assert second.pandoc_log.exists()
+        assert (temp_dir / 'tikz_png' / 'other').is_dir()
+    
+    def test_cleanup_removes_step_state_like_the_cli(self, sample_tikz_tex, fake_toolchain, temp_dir):
+        """Test that manifest, timings and draft placeholder go, as with --clean-only."""
+        sample_tikz_tex.write_text(
+            sample_tikz_tex.read_text().replace('circle', 'FAIL'), encoding='utf-8'
+        )
+        converter = TexConverter(sample_tikz_tex, temp_dir / 'out.docx', draft=True)
+        converter.run_stages()
+        assert converter.timings.path.exists()
+        assert (converter.state_dir / 'placeholder.png').exists()
+        
+        converter.cleanup()
+        
+        assert not converter.state_dir.exists()
+    
+    def test_cleanup_keeps_other_documents_state(self, sample_tikz_tex, fake_toolchain, temp_dir):
+        """Test that the shared placeholder stays while another document uses the directory."""
+        other = temp_dir / 'other.tex'
+        other.write_text(sample_tikz_tex.read_text().replace('circle', 'FAIL'), encoding='utf-8')
+        TexConverter(other, temp_dir / 'other.docx', draft=True).run_stages()
+        converter = TexConverter(sample_tikz_tex, temp_dir / 'out.docx')
+        converter.run_stages()
+        
+        converter.cleanup()
+        
+        assert sorted(path.name for path in converter.state_dir.iterdir()) == [
+            'other.manifest.json', 'other.timings.json', 'other.timings.json.lock', 'placeholder.png'
+        ]
@@ -0,0 +1,153 @@
+"""
+Unit tests for merging pandoc DOCX parts.
+"""
+
+import zipfile
+from pathlib import Path
+
+from latex2docx.docx_merge import merge_docx, renumber_sections
+
+W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+IMAGE = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/image'
+STYLES = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles'
+
+
+def heading(number: str, title: str) -> str:
+    return (
+        '<w:p><w:r><w:rPr><w:rStyle w:val="SectionNumber" /></w:rPr>'
+        f'<w:t xml:space="preserve">{number}</w:t></w:r>'
+        f'<w:r><w:t>{title}</w:t></w:r></w:p>'
+    )
+
+
+def make_part(path: Path, body: str, image: bytes = b'', footnote: str = '') -> Path:
+    """Write a minimal DOCX shaped like pandoc's output."""
+    rels = f'<Relationship Id="rId1" Type="{STYLES}" Target="styles.xml" />'
+    if image:
+        rels += f'<Relationship Id="rId20" Type="{IMAGE}" Target="media/fig.png" />'
+    with zipfile.ZipFile(path, 'w') as docx:
+        docx.writestr(
+            '[Content_Types].xml',
+            '<Types><Default Extension="xml" ContentType="application/xml" />'
+            + ('<Default Extension="png" ContentType="image/png" />' if image else '')
+            + '</Types>'
+        )
+        docx.writestr(
+            'word/document.xml',
+            f'<w:document {W}><w:body>{body}<w:sectPr /></w:body></w:document>'
+        )
+        docx.writestr('word/_rels/document.xml.rels', f'<Relationships>{rels}</Relationships>')
+        docx.writestr(
+            'word/numbering.xml',
+            f'<w:numbering {W}><w:abstractNum w:abstractNumId="0"><w:lvl /></w:abstractNum>'
+            '<w:num w:numId="1"><w:abstractNumId w:val="0" /></w:num></w:numbering>'
+        )
+        docx.writestr(
+            'word/footnotes.xml',
+            f'<w:footnotes {W}><w:footnote w:type="separator" w:id="-1"><w:p /></w:footnote>'
+            + (f'<w:footnote w:id="1"><w:p><w:r><w:t>{footnote}</w:t></w:r></w:p></w:footnote>'
+               if footnote else '')
+            + '</w:footnotes>'
+        )
+        docx.writestr('word/styles.xml', f'<w:styles {W} />')
+        if image:
+            docx.writestr('word/media/fig.png', image)
+    return path
+
+
+def read(path: Path, name: str) -> str:
+    with zipfile.ZipFile(path) as docx:
+        return docx.read(name).decode('utf-8')
+
+
+class TestRenumberSections:
+    """Test continuous heading numbers."""
+    
+    def test_numbers_continue_across_parts(self):
+        """Test that each part's restarted numbering is recounted."""
+        xml = heading('1', 'A') + heading('1.1', 'A1') + heading('1', 'B') + heading('1.1', 'B1')
+        
+        result = renumber_sections(xml)
+        
+        assert '>2</w:t>' in result
+        assert '>2.1</w:t>' in result
+        assert result.count('>1.1</w:t>') == 1
+
+
+class TestMergeDocx:
+    """Test merging whole DOCX files."""
+    
+    def test_bodies_are_concatenated_in_order(self, temp_dir):
+        """Test that the parts' text ends up before one final sectPr."""
+        parts = [
+            make_part(temp_dir / 'a.docx', heading('1', 'First')),
+            make_part(temp_dir / 'b.docx', heading('1', 'Second')),
+        ]
+        output = temp_dir / 'out.docx'
+        
+        merge_docx(parts, output)
+        
+        document = read(output, 'word/document.xml')
+        assert document.index('First') < document.index('Second')
+        assert document.count('<w:sectPr') == 1
+        assert '>2</w:t>' in document
+    
+    def test_media_and_relationships_are_renamed(self, temp_dir):
+        """Test that images of both parts survive under distinct names."""
+        image_body = '<w:p><a:blip r:embed="rId20" /><wp:docPr id="1" /></w:p>'
+        parts = [
+            make_part(temp_dir / 'a.docx', image_body, image=b'first'),
+            make_part(temp_dir / 'b.docx', image_body, image=b'second'),
+        ]
+        output = temp_dir / 'out.docx'
+        
+        merge_docx(parts, output)
+        
+        with zipfile.ZipFile(output) as docx:
+            assert docx.read('word/media/fig.png') == b'first'
+            assert docx.read('word/media/p1-fig.png') == b'second'
+        rels = read(output, 'word/_rels/document.xml.rels')
+        assert 'Id="p1rId20"' in rels
+        assert 'Target="media/p1-fig.png"' in rels
+        assert rels.count(STYLES) == 1
+        document = read(output, 'word/document.xml')
+        assert 'r:embed="rId20"' in document
+        assert 'r:embed="p1rId20"' in document
+        assert '<wp:docPr id="2"' in document
+    
+    def test_content_types_gain_missing_extensions(self, temp_dir):
+        """Test that a format only used by a later part is declared."""
+        parts = [
+            make_part(temp_dir / 'a.docx', '<w:p />'),
+            make_part(temp_dir / 'b.docx', '<w:p><a:blip r:embed="rId20" /></w:p>', image=b'x'),
+        ]
+        output = temp_dir / 'out.docx'
+        
+        merge_docx(parts, output)
+        
+        assert 'Extension="png"' in read(output, '[Content_Types].xml')
+    
+    def test_lists_and_footnotes_get_new_ids(self, temp_dir):
+        """Test that list and footnote ids of later parts do not collide."""
+        body = (
+            '<w:p><w:pPr><w:numPr><w:numId w:val="1" /></w:numPr></w:pPr>'
+            '<w:r><w:footnoteReference w:id="1" /></w:r></w:p>'
+        )
+        parts = [
+            make_part(temp_dir / 'a.docx', body, footnote='note A'),
+            make_part(temp_dir / 'b.docx', body, footnote='note B'),
+        ]
+        output = temp_dir / 'out.docx'
+        
+        merge_docx(parts, output)
+        
+        numbering = read(output, 'word/numbering.xml')
+        assert 'w:abstractNumId="1"' in numbering
+        assert '<w:num w:numId="2"><w:abstractNumId w:val="1" />' in numbering
+        assert numbering.index('<w:abstractNum w:abstractNumId="1"') < numbering.index('<w:num ')
+        document = read(output, 'word/document.xml')
+        assert '<w:numId w:val="2" />' in document
+        assert '<w:footnoteReference w:id="2" />' in document
+        footnotes = read(output, 'word/footnotes.xml')
+        assert '<w:footnote w:id="2"><w:p><w:r><w:t>note B' in footnotes
+        assert footnotes.count('w:type="separator"') == 1
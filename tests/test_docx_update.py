@@ -0,0 +1,64 @@
+"""
+Unit tests for replacing images inside an existing DOCX.
+"""
+
+import struct
+import zipfile
+
+import pytest
+
+from latex2docx.docx_update import media_digests, png_size, replace_members
+
+
+@pytest.fixture
+def docx(temp_dir):
+    """Small DOCX-like archive with compressed text and one image."""
+    path = temp_dir / 'in.docx'
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('word/document.xml', '<w:document/>' * 100)
+        archive.writestr('word/media/image1.png', b'old')
+    return path
+
+
+class TestReplaceMembers:
+    """Test rewriting an archive with some members replaced."""
+    
+    def test_untouched_members_keep_compressed_bytes(self, docx, temp_dir):
+        """Test that other members are copied without recompression."""
+        output = temp_dir / 'out.docx'
+        replace_members(docx, {'word/media/image1.png': b'new'}, output)
+        
+        with zipfile.ZipFile(docx) as old, zipfile.ZipFile(output) as new:
+            assert new.testzip() is None
+            assert new.read('word/media/image1.png') == b'new'
+            assert new.read('word/document.xml') == old.read('word/document.xml')
+            assert new.getinfo('word/document.xml').compress_type == zipfile.ZIP_DEFLATED
+            assert (new.getinfo('word/document.xml').compress_size
+                    == old.getinfo('word/document.xml').compress_size)
+    
+    def test_in_place(self, docx):
+        """Test that the archive can be its own output."""
+        replace_members(docx, {'word/media/image1.png': b'new'}, docx)
+        
+        with zipfile.ZipFile(docx) as archive:
+            assert archive.read('word/media/image1.png') == b'new'
+    
+    def test_unknown_member(self, docx, temp_dir):
+        """Test that replacing a missing member is an error."""
+        with pytest.raises(KeyError):
+            replace_members(docx, {'word/media/image9.png': b'new'}, temp_dir / 'out.docx')
+
+
+class TestHelpers:
+    """Test media digests and PNG headers."""
+    
+    def test_media_digests(self, docx):
+        """Test that only media entries are hashed."""
+        assert list(media_digests(docx)) == ['word/media/image1.png']
+    
+    def test_png_size(self):
+        """Test reading dimensions from the IHDR chunk."""
+        header = b'\x89PNG\r\n\x1a\n\0\0\0\rIHDR' + struct.pack('>II', 640, 480)
+        
+        assert png_size(header) == (640, 480)
+        assert png_size(b'GIF89a' + header) is None
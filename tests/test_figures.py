@@ -0,0 +1,64 @@
+"""
+Unit tests for the document figure index.
+"""
+
+from latex2docx.figures import index_figures
+
+PICTURE = "\\begin{tikzpicture}\\draw (0,0) -- (%d,1);\\end{tikzpicture}"
+
+
+class TestIndexFigures:
+    """Test pairing pictures with their own labels."""
+    
+    def test_labels_of_other_figures_are_ignored(self):
+        """Test that a labelled image figure does not shift TikZ names."""
+        text = (
+            "\\begin{figure}\\includegraphics{photo}\\label{fig:photo}\\end{figure}\n"
+            "\\begin{figure}" + PICTURE % 1 + "\\label{fig:plot}\\end{figure}\n"
+        )
+        index = index_figures(text)
+        
+        assert [figure.name for figure in index.figures] == ['plot']
+        assert index.labels == ['photo', 'plot']
+    
+    def test_unlabeled_pictures_are_numbered_by_position(self):
+        """Test tikz-NN names for pictures outside labelled figures."""
+        text = PICTURE % 1 + "\\begin{figure}" + PICTURE % 2 + "\\label{fig:b}\\end{figure}" + PICTURE % 3
+        
+        assert [figure.name for figure in index_figures(text).figures] == ['tikz-01', 'b', 'tikz-03']
+    
+    def test_subfigures(self):
+        """Test that subfigure labels win and unlabeled subfigures use the figure label."""
+        text = (
+            "\\begin{figure}"
+            "\\begin{subfigure}" + PICTURE % 1 + "\\label{fig:left}\\end{subfigure}"
+            "\\begin{subfigure}" + PICTURE % 2 + "\\end{subfigure}"
+            "\\label{fig:pair}\\end{figure}"
+        )
+        
+        assert [figure.name for figure in index_figures(text).figures] == ['left', 'pair']
+    
+    def test_duplicate_labels(self):
+        """Test that a label used twice names one picture only."""
+        figure = "\\begin{figure}" + PICTURE + "\\label{fig:same}\\end{figure}"
+        text = figure % 1 + figure % 2
+        
+        assert [figure.name for figure in index_figures(text).figures] == ['same', 'tikz-02']
+    
+    def test_spans_and_digests(self):
+        """Test that spans cover the code and equal code hashes equally."""
+        text = "a " + PICTURE % 1 + " b " + PICTURE % 2 + " c " + PICTURE % 1
+        index = index_figures(text)
+        first, second, third = index.figures
+        
+        assert index.code(first) == PICTURE % 1
+        assert index.code(second) == PICTURE % 2
+        assert first.digest == third.digest != second.digest
+        assert index.replace(lambda figure: figure.name) == "a tikz-01 b tikz-02 c tikz-03"
+    
+    def test_every_figure_label_is_listed(self):
+        """Test that all fig: labels are collected, with or without a picture."""
+        text = "\\label{fig:first}\n\\label{sec:intro}\n\\label{fig:second}\n"
+        
+        assert index_figures(text).labels == ['first', 'second']
+        assert index_figures("No labels here").labels == []
@@ -0,0 +1,82 @@
+"""
+Unit tests for the figure compile-time history.
+"""
+
+from latex2docx.figures import index_figures
+from latex2docx.history import BASE_SECONDS, SECONDS_PER_PLOT, FigureTimings, estimate_seconds, timing_key
+
+
+class TestEstimate:
+    """Test the cost model for figures without history."""
+    
+    def test_plots_cost_more(self):
+        """Test that every \\addplot adds to the estimate."""
+        plain = "\\draw (0,0) -- (1,1);"
+        plots = plain + "\\addplot table {a.dat};" * 3
+        
+        assert BASE_SECONDS < estimate_seconds(plain) < estimate_seconds(plots)
+        assert estimate_seconds(plots) - estimate_seconds(plain) > 3 * SECONDS_PER_PLOT
+
+
+class TestTimingKey:
+    """Test what history entries are matched against."""
+    
+    def test_key_follows_the_picture_digest(self):
+        """Test that the key is the figure index digest, whatever the preamble."""
+        picture = "\\begin{tikzpicture}\\draw (0,0) -- (1,1);\\end{tikzpicture}"
+        source = "\\documentclass{standalone}\n\\begin{document}\n%s\n\\end{document}\n"
+        digest = index_figures(picture).figures[0].digest
+        
+        assert timing_key(source % picture).sha256 == digest
+        assert timing_key("\\usepackage{pgfplots}\n" + source % picture).sha256 == digest
+        assert timing_key(source % picture, digest) == timing_key(source % picture)
+
+
+class TestFigureTimings:
+    """Test recording, expectations and saving."""
+    
+    def test_recorded_source_uses_measured_time(self, temp_dir):
+        """Test that an unchanged figure is expected to take its last time."""
+        timings = FigureTimings(temp_dir / 'doc.timings.json')
+        timings.record('plot', timing_key('source'), {'pdflatex': 4.0, 'rasterize': 1.0})
+        
+        assert timings.expected('plot', timing_key('source')) == 5.0
+    
+    def test_edited_source_scales_measured_time(self, temp_dir):
+        """Test that an edit is scaled by the change of the estimate."""
+        timings = FigureTimings(temp_dir / 'doc.timings.json')
+        source = "\\addplot table {a.dat};"
+        timings.record('plot', timing_key(source), {'pdflatex': 10.0})
+        edited = timing_key(source * 2)
+        
+        assert timings.expected('plot', edited) > 10.0
+        assert timings.expected('new', edited) == estimate_seconds(source * 2)
+    
+    def test_longest_first(self, temp_dir):
+        """Test ordering by expected time."""
+        timings = FigureTimings(temp_dir / 'doc.timings.json')
+        timings.record('slow', timing_key('a'), {'pdflatex': 20.0})
+        timings.record('fast', timing_key('b'), {'pdflatex': 0.1})
+        
+        assert timings.longest_first({
+            'fast': timing_key('b'), 'new': timing_key('c'), 'slow': timing_key('a'),
+        }) == ['slow', 'new', 'fast']
+    
+    def test_save_merges_other_jobs(self, temp_dir):
+        """Test that saving keeps entries another converter wrote meanwhile."""
+        path = temp_dir / 'doc.timings.json'
+        first = FigureTimings(path)
+        second = FigureTimings(path)
+        first.record('a', timing_key('a'), {'pdflatex': 1.0})
+        first.save(['a'])
+        second.record('b', timing_key('b'), {'pdflatex': 2.0})
+        second.save(['b'])
+        
+        assert sorted(FigureTimings(path).figures) == ['a', 'b']
+    
+    def test_unreadable_history_is_ignored(self, temp_dir):
+        """Test that a corrupt file starts an empty history."""
+        path = temp_dir / 'doc.timings.json'
+        path.write_text('{not json')
+        
+        assert FigureTimings(path).figures == {}
@@ -0,0 +1,86 @@
+"""
+Unit tests for conversion metrics and their export.
+"""
+
+import json
+from latex2docx.converter import TexConverter
+from latex2docx.metrics import Metrics
+from latex2docx.tools import ToolRun
+
+
+class TestMetrics:
+    """Test the collector on its own."""
+    
+    def test_stage_and_process_summary(self):
+        """Test per-stage, per-process and per-tool entries."""
+        metrics = Metrics()
+        with metrics.stage('compile_tikz'):
+            metrics.record_process(ToolRun(['pdflatex', 'a.tex'], 0, wall=0.5, cpu=0.4), 'a')
+            metrics.record_process(ToolRun(['/usr/bin/pdflatex', 'b.tex'], 1, wall=0.25, cpu=0.2), 'b')
+        metrics.count('cache_hits', 2)
+        
+        summary = metrics.summary()
+        assert 'compile_tikz' in summary['stages']
+        assert [p['label'] for p in summary['processes']] == ['a', 'b']
+        assert summary['tools']['pdflatex']['count'] == 2
+        assert summary['tools']['pdflatex']['wall'] == 0.75
+        assert summary['counters']['cache_hits'] == 2
+        assert summary['counters']['bytes_read'] == 0
+    
+    def test_trace_events(self, temp_dir):
+        """Test the Chrome trace-event export."""
+        metrics = Metrics()
+        with metrics.stage('convert_to_docx'):
+            metrics.record_process(ToolRun(['pandoc'], 0, wall=0.1), 'out.docx')
+        
+        trace_path = metrics.write_json(temp_dir / 'metrics.json')
+        
+        assert trace_path == temp_dir / 'metrics.trace.json'
+        events = json.loads(trace_path.read_text())['traceEvents']
+        spans = [event for event in events if event['ph'] == 'X']
+        assert {event['name'] for event in spans} == {'convert_to_docx', 'pandoc out.docx'}
+        assert all(event['dur'] >= 0 for event in spans)
+        assert json.loads((temp_dir / 'metrics.json').read_text())['stages']
+
+
+class TestConverterMetrics:
+    """Test metrics collected during a conversion."""
+    
+    def test_processes_are_labelled(self, sample_tikz_tex, fake_toolchain):
+        """Test that every external process is recorded with its figure."""
+        converter = TexConverter(sample_tikz_tex, sample_tikz_tex.parent / 'out.docx')
+        converter.run_stages()
+        
+        summary = converter.metrics.summary()
+        assert list(summary['stages']) == [
+            'preprocess_tex', 'extract_tikz', 'compile_tikz', 'replace_tikz', 'convert_to_docx'
+        ]
+        labels = {(p['tool'], p['label']) for p in summary['processes']}
+        assert ('pdflatex', 'circle') in labels
+        assert ('convert', 'rectangle') in labels
+        assert ('pandoc', 'out.docx') in labels
+        assert summary['counters']['cache_misses'] == 2
+        assert summary['counters']['bytes_read'] > 0
+        assert summary['counters']['bytes_written'] > 0
+    
+    def test_cache_hits_and_skipped_stages(self, sample_tikz_tex, fake_toolchain):
+        """Test counters and skip flags on a rerun."""
+        output = sample_tikz_tex.parent / 'out.docx'
+        TexConverter(sample_tikz_tex, output).run_stages()
+        converter = TexConverter(sample_tikz_tex, output, force=True)
+        converter.run_stages()
+        
+        counters = converter.metrics.summary()['counters']
+        assert counters['cache_hits'] == 2
+        assert counters['cache_misses'] == 0
+        
+        converter = TexConverter(sample_tikz_tex, output)
+        converter.run_stages()
+        assert converter.metrics.summary()['stages']['convert_to_docx']['skipped']
+    
+    def test_run_exports_metrics(self, sample_tikz_tex, fake_toolchain, temp_dir):
+        """Test that run() writes the JSON summary and the trace."""
+        converter = TexConverter(sample_tikz_tex, sample_tikz_tex.parent / 'out.docx')
+        assert converter.run(profile=True, metrics_json=temp_dir / 'm.json') == 0
+        assert (temp_dir / 'm.json').exists()
+        assert (temp_dir / 'm.trace.json').exists()
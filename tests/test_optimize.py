@@ -0,0 +1,94 @@
+"""
+Unit tests for figure PNG optimization.
+"""
+
+import struct
+import zlib
+
+import pytest
+
+from latex2docx.optimize import PNG_SIGNATURE, PngOptimizer, _chunks, recompress_png
+
+
+def make_png(width=64, height=64, extra=b''):
+    """Uncompressed RGB PNG of white line art with a black diagonal."""
+    def chunk(kind, body):
+        return struct.pack('>I4s', len(body), kind) + body + struct.pack('>I', zlib.crc32(kind + body))
+    
+    rows = b''.join(
+        b'\0' + b''.join(b'\0\0\0' if x == y else b'\xff\xff\xff' for x in range(width))
+        for y in range(height)
+    )
+    return (
+        PNG_SIGNATURE
+        + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+        + chunk(b'pHYs', struct.pack('>IIB', 11811, 11811, 1))
+        + chunk(b'tEXt', b'Comment\0' + b'x' * 200)
+        + extra
+        + chunk(b'IDAT', zlib.compress(rows, 0))
+        + chunk(b'IEND', b'')
+    )
+
+
+def pixels(data):
+    return zlib.decompress(b''.join(body for kind, body in _chunks(data) if kind == b'IDAT'))
+
+
+class TestRecompressPng:
+    """Test the built-in lossless recompression."""
+    
+    def test_shrinks_without_changing_pixels(self):
+        """Test that image data survives and the file gets smaller."""
+        original = make_png()
+        smaller = recompress_png(original)
+        
+        assert len(smaller) < len(original)
+        assert pixels(smaller) == pixels(original)
+    
+    def test_keeps_display_chunks_only(self):
+        """Test that pHYs (used for the DPI) stays and text goes."""
+        kinds = [kind for kind, _ in _chunks(recompress_png(make_png()))]
+        
+        assert kinds == [b'IHDR', b'pHYs', b'IDAT', b'IEND']
+    
+    def test_rejects_non_png(self):
+        """Test that other data is reported instead of mangled."""
+        with pytest.raises(ValueError):
+            recompress_png(b'GIF89a')
+
+
+class TestPngOptimizer:
+    """Test tool selection and in-place optimization."""
+    
+    def test_builtin_fallback(self, temp_dir, monkeypatch):
+        """Test optimizing without any external tool."""
+        monkeypatch.setattr('shutil.which', lambda name: None)
+        png = temp_dir / 'figure.png'
+        png.write_bytes(make_png())
+        optimizer = PngOptimizer(colors=16)
+        
+        saved = optimizer.optimize(png)
+        
+        assert saved > 0
+        assert png.stat().st_size == len(make_png()) - saved
+        assert optimizer.identity() == 'optimize builtin'
+    
+    def test_external_tools_keep_smaller_output(self, temp_dir, monkeypatch):
+        """Test that pngquant and oxipng run in order and larger output is discarded."""
+        monkeypatch.setattr('shutil.which', lambda name: f'/usr/bin/{name}')
+        calls = []
+        
+        def runner(cmd, cwd=None, label=None):
+            calls.append(cmd[0])
+            out = cmd[cmd.index('--out' if cmd[0] == 'oxipng' else '--output') + 1]
+            # pngquant halves the file; oxipng makes it bigger
+            size = (cwd / 'figure.png').stat().st_size
+            (cwd / out).write_bytes(b'x' * (size // 2 if cmd[0] == 'pngquant' else size * 2))
+        
+        png = temp_dir / 'figure.png'
+        png.write_bytes(b'y' * 1000)
+        optimizer = PngOptimizer(colors=64, runner=runner)
+        
+        assert optimizer.optimize(png) == 500
+        assert calls == ['pngquant', 'oxipng']
+        assert sorted(path.name for path in temp_dir.iterdir()) == ['figure.png']
@@ -0,0 +1,127 @@
+"""
+Unit tests for the multi-file project graph.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from latex2docx.project import ProjectGraph
+
+
+def write(path: Path, text: str) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding='utf-8')
+    return path
+
+
+class TestProjectGraph:
+    """Test discovery of included files."""
+    
+    def test_follows_input_include_and_subfile(self, temp_dir):
+        """Test that every include command adds its file, recursively."""
+        write(temp_dir / 'chapters' / 'intro.tex', '\\input{chapters/details}\n')
+        write(temp_dir / 'chapters' / 'details.tex', 'details\n')
+        write(temp_dir / 'appendix.tex', 'appendix\n')
+        write(temp_dir / 'extra.tex', 'extra\n')
+        main = write(
+            temp_dir / 'main.tex',
+            '\\include{chapters/intro}\n\\subfile{appendix.tex}\n\\input{extra}\n'
+        )
+        
+        graph = ProjectGraph(main)
+        
+        assert graph.paths() == [
+            main,
+            temp_dir / 'chapters' / 'intro.tex',
+            temp_dir / 'chapters' / 'details.tex',
+            temp_dir / 'appendix.tex',
+            temp_dir / 'extra.tex',
+        ]
+        assert graph.files[main].includes == [
+            temp_dir / 'chapters' / 'intro.tex',
+            temp_dir / 'appendix.tex',
+            temp_dir / 'extra.tex',
+        ]
+    
+    def test_commented_and_data_inputs_are_ignored(self, temp_dir):
+        """Test that only uncommented LaTeX sources are followed."""
+        write(temp_dir / 'data' / 'table.dat', '1 2\n')
+        write(temp_dir / 'hidden.tex', 'hidden\n')
+        main = write(temp_dir / 'main.tex', '% \\input{hidden}\n\\input{data/table.dat}\n')
+        
+        graph = ProjectGraph(main)
+        
+        assert graph.paths() == [main]
+        assert graph.missing == []
+    
+    def test_includes_outside_allowed_directories_are_refused(self, temp_dir):
+        """Test that absolute, ../ and symlinked includes cannot leave the allowed roots."""
+        write(temp_dir / 'secret.tex', 'secret\n')
+        write(temp_dir / 'project' / 'inside.tex', 'inside\n')
+        (temp_dir / 'project' / 'link.tex').symlink_to(temp_dir / 'secret.tex')
+        allowed = [temp_dir / 'project']
+        
+        for include in [str(temp_dir / 'secret'), '../secret', 'link', '../secret.dat']:
+            main = write(temp_dir / 'project' / 'main.tex', f'\\input{{{include}}}\n')
+            with pytest.raises(PermissionError):
+                ProjectGraph(main, allowed=allowed)
+        main = write(temp_dir / 'project' / 'main.tex', '\\input{inside}\n')
+        assert len(ProjectGraph(main, allowed=allowed).files) == 2
+    
+    def test_missing_files_are_reported(self, temp_dir):
+        """Test that includes of files that do not exist yet are listed."""
+        main = write(temp_dir / 'main.tex', '\\input{chapters/todo}\n')
+        
+        graph = ProjectGraph(main)
+        
+        assert graph.missing == [temp_dir / 'chapters' / 'todo.tex']
+        assert graph.expand() == '\\input{chapters/todo}\n'
+    
+    def test_fingerprint_per_file(self, temp_dir):
+        """Test that editing one file only changes its own fingerprint."""
+        chapter = write(temp_dir / 'one.tex', 'one\n')
+        main = write(temp_dir / 'main.tex', '\\input{one}\n')
+        before = ProjectGraph(main).fingerprints()
+        
+        chapter.write_text('changed\n', encoding='utf-8')
+        after = ProjectGraph(main).fingerprints()
+        
+        assert before[main] == after[main]
+        assert before[chapter] != after[chapter]
+
+
+class TestExpand:
+    """Test inlining included files."""
+    
+    def test_includes_are_inlined(self, temp_dir):
+        """Test that include commands are replaced by file contents."""
+        write(temp_dir / 'a.tex', 'A \\input{b} A')
+        write(temp_dir / 'b.tex', 'B')
+        main = write(temp_dir / 'main.tex', 'start \\input{a} end')
+        
+        assert ProjectGraph(main).expand() == 'start A B A end'
+    
+    def test_subfile_contributes_its_body(self, temp_dir):
+        """Test that a subfile's own preamble is dropped."""
+        write(
+            temp_dir / 'part.tex',
+            '\\documentclass[main]{subfiles}\n\\begin{document}\nBody\n\\end{document}\n'
+        )
+        main = write(temp_dir / 'main.tex', '\\subfile{part}')
+        
+        assert ProjectGraph(main).expand() == '\nBody\n'
+    
+    def test_replacement_texts(self, temp_dir):
+        """Test that preprocessed texts are used where given."""
+        chapter = write(temp_dir / 'one.tex', 'raw')
+        main = write(temp_dir / 'main.tex', '[\\input{one}]')
+        
+        assert ProjectGraph(main).expand({chapter: 'processed'}) == '[processed]'
+    
+    def test_cycles_are_not_expanded(self, temp_dir):
+        """Test that a file including itself indirectly terminates."""
+        write(temp_dir / 'a.tex', 'a\\input{main}')
+        main = write(temp_dir / 'main.tex', 'm\\input{a}')
+        
+        assert ProjectGraph(main).expand() == 'ma\\input{main}'
@@ -0,0 +1,186 @@
+"""
+Unit tests for the PDF to PNG rasterizer backends.
+"""
+
+import asyncio
+import subprocess
+import sys
+import threading
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from latex2docx.rasterize import (
+    ImageMagickRasterizer,
+    PdftocairoRasterizer,
+    PdftoppmRasterizer,
+    PyMuPDFRasterizer,
+    get_rasterizer,
+)
+
+
+class FakePoppler:
+    """Stand-in for pdftoppm/pdftocairo writing zero-padded page files."""
+    
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = []
+    
+    def __call__(self, cmd, cwd=None, **kwargs):
+        self.calls.append(list(cmd))
+        first = int(cmd[cmd.index('-f') + 1])
+        last = int(cmd[cmd.index('-l') + 1])
+        root = Path(cwd) / cmd[-1]
+        if '-singlefile' in cmd:
+            root.with_name(f'{root.name}.png').write_bytes(b'\x89PNG %d' % first)
+        else:
+            width = len(str(self.pages))
+            for page in range(first, min(last, self.pages) + 1):
+                path = root.with_name(f'{root.name}-{page:0{width}d}.png')
+                path.write_bytes(b'\x89PNG %d' % page)
+        return subprocess.CompletedProcess(cmd, 0, '', '')
+
+
+class TestBackendSelection:
+    """Test choosing a backend."""
+    
+    def test_auto_prefers_poppler(self, monkeypatch):
+        """Test that auto picks pdftoppm when it is installed."""
+        monkeypatch.setattr(
+            'latex2docx.rasterize.shutil.which',
+            lambda tool: f'/usr/bin/{tool}' if tool in ('pdftoppm', 'convert') else None
+        )
+        assert get_rasterizer('auto').name == 'pdftoppm'
+    
+    def test_auto_falls_back_to_imagemagick(self, monkeypatch):
+        """Test that auto keeps ImageMagick when nothing faster is found."""
+        monkeypatch.setattr('latex2docx.rasterize.shutil.which', lambda tool: None)
+        monkeypatch.setattr(
+            'latex2docx.rasterize.PyMuPDFRasterizer.available', lambda self: False
+        )
+        assert get_rasterizer('auto').name == 'imagemagick'
+    
+    def test_unknown_backend(self):
+        """Test that an unknown backend name is rejected."""
+        with pytest.raises(ValueError):
+            get_rasterizer('ghostscript')
+
+
+class TestPopplerBackend:
+    """Test pdftoppm/pdftocairo commands and output naming."""
+    
+    def test_single_page(self, temp_dir):
+        """Test that one page is rendered straight to the requested name."""
+        fake = FakePoppler(pages=3)
+        png = temp_dir / 'fig.png'
+        assert PdftoppmRasterizer(fake).rasterize(temp_dir / 'doc.pdf', png, 150, page=1)
+        assert fake.calls[0][:5] == ['pdftoppm', '-png', '-r', '150', '-f']
+        assert png.read_bytes() == b'\x89PNG 2'
+    
+    def test_page_range_in_one_call(self, temp_dir):
+        """Test that a page range is rendered by a single process."""
+        fake = FakePoppler(pages=12)
+        pngs = [temp_dir / f'{name}.png' for name in ('a', 'b', 'c')]
+        flags = PdftocairoRasterizer(fake).rasterize_pages(
+            temp_dir / 'doc.pdf', pngs, 300, first=9
+        )
+        assert flags == [True, True, True]
+        assert len(fake.calls) == 1
+        assert fake.calls[0][0] == 'pdftocairo'
+        assert [png.read_bytes() for png in pngs] == [b'\x89PNG 10', b'\x89PNG 11', b'\x89PNG 12']
+    
+    def test_async_single_page(self, temp_dir):
+        """Test that arasterize runs the same command through the async runner."""
+        fake = FakePoppler(pages=2)
+        
+        async def arunner(cmd, cwd=None, **kwargs):
+            return fake(cmd, cwd=cwd)
+        
+        png = temp_dir / 'fig.png'
+        rasterizer = PdftoppmRasterizer(arunner=arunner)
+        assert asyncio.run(rasterizer.arasterize(temp_dir / 'doc.pdf', png, 150, page=1))
+        assert fake.calls == [rasterizer.command(temp_dir / 'doc.pdf', png, 150, page=1)]
+        assert png.read_bytes() == b'\x89PNG 2'
+    
+    def test_missing_pages_are_reported(self, temp_dir):
+        """Test that pages the tool did not write are flagged."""
+        fake = FakePoppler(pages=1)
+        pngs = [temp_dir / 'a.png', temp_dir / 'b.png']
+        flags = PdftoppmRasterizer(fake).rasterize_pages(temp_dir / 'doc.pdf', pngs, 300)
+        assert flags == [True, False]
+
+
+class TestImageMagickBackend:
+    """Test the ImageMagick command line."""
+    
+    def test_command_matches_previous_default(self, temp_dir):
+        """Test that single figures are converted as before."""
+        calls = []
+        
+        def fake_run(cmd, cwd=None, **kwargs):
+            calls.append((list(cmd), cwd))
+            return subprocess.CompletedProcess(cmd, 0, '', '')
+        
+        png = temp_dir / 'fig.png'
+        ImageMagickRasterizer(fake_run).rasterize(temp_dir / 'fig.pdf', png, 300)
+        assert calls == [(
+            ['convert', '-density', '300', 'fig.pdf', '-quality', '90', str(png)],
+            temp_dir
+        )]
+
+
+class FakeFitz:
+    """Stand-in for the ``fitz`` module that records overlapping calls."""
+    
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.guard = threading.Lock()
+    
+    def open(self, pdf):
+        fake = self
+        
+        class Pixmap:
+            def save(self, png):
+                Path(png).write_bytes(b'\x89PNG')
+        
+        class Page:
+            def get_pixmap(self, dpi):
+                time.sleep(0.01)
+                return Pixmap()
+        
+        class Document:
+            page_count = 1
+            
+            def __getitem__(self, page):
+                return Page()
+            
+            def __enter__(self):
+                with fake.guard:
+                    fake.active += 1
+                    fake.peak = max(fake.peak, fake.active)
+                return self
+            
+            def __exit__(self, *exc):
+                with fake.guard:
+                    fake.active -= 1
+        
+        return Document()
+
+
+class TestPyMuPDFBackend:
+    """Test the in-process PyMuPDF backend."""
+    
+    def test_threads_are_serialized(self, temp_dir, monkeypatch):
+        """Test that PyMuPDF is never used from two threads at once."""
+        fake = FakeFitz()
+        monkeypatch.setitem(sys.modules, 'fitz', fake)
+        rasterizer = PyMuPDFRasterizer()
+        pngs = [temp_dir / f'fig{n}.png' for n in range(8)]
+        
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            flags = list(pool.map(
+                lambda png: rasterizer.rasterize(temp_dir / 'doc.pdf', png, 150), pngs
+            ))
+        assert flags == [True] * 8
+        assert fake.peak == 1
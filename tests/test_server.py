@@ -0,0 +1,304 @@
+"""
+Unit tests for the conversion server.
+"""
+
+import http.client
+import json
+import socket
+import threading
+
+import pytest
+
+from latex2docx.cli import main
+from latex2docx.converter import TexConverter
+from latex2docx.server import ConversionService, make_server
+
+
+@pytest.fixture
+def service(temp_dir):
+    """Service with a private payload directory, serving ``temp_dir``."""
+    service = ConversionService(jobs=2, work_dir=temp_dir / 'payloads', roots=[temp_dir])
+    yield service
+    service.close()
+
+
+@pytest.fixture
+def server(service):
+    """TCP server on a free localhost port, serving in a thread."""
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def request(server, method, path, body=b'', headers=None):
+    """Send one request; returns (status, headers, body)."""
+    host, port = server.server_address[:2]
+    connection = http.client.HTTPConnection(host, port, timeout=10)
+    connection.request(method, path, body=body, headers=headers or {})
+    response = connection.getresponse()
+    result = response.status, dict(response.getheaders()), response.read()
+    connection.close()
+    return result
+
+
+class TestConversionService:
+    """Test conversions without the HTTP layer."""
+    
+    def test_converter_is_reused(self, service, sample_tikz_tex, fake_toolchain):
+        """Test that a document keeps its converter between requests."""
+        first = service.convert_path(sample_tikz_tex)
+        fake_toolchain.clear()
+        second = service.convert_path(sample_tikz_tex)
+        
+        assert first == second == sample_tikz_tex.absolute().with_suffix('.docx')
+        assert len(service.converters) == 1
+        assert [cmd[0] for cmd, _ in fake_toolchain] == []
+        assert service.status()['converted'] == 2
+    
+    def test_payload_directory_is_removed(self, service, fake_toolchain):
+        """Test that a payload leaves neither files nor a converter behind."""
+        source = "\\documentclass{article}\\begin{document}Hi\\end{document}\n"
+        
+        assert service.convert_source(source) == b'PK fake docx'
+        assert list(service.work_dir.iterdir()) == []
+        assert len(service.converters) == 0
+    
+    def test_texts_are_dropped_after_each_run(self, service, sample_tikz_tex, fake_toolchain):
+        """Test that a kept converter does not hold on to document texts."""
+        service.convert_path(sample_tikz_tex)
+        converter = next(iter(service.converters.values()))
+        
+        assert converter.project is None
+        assert converter.source_text is converter.pandoc_text is converter.images_text is None
+        assert converter.figure_indexes == {}
+    
+    def test_unchanged_files_stay_preprocessed(self, service, temp_dir, fake_toolchain, monkeypatch):
+        """Test that the next request only preprocesses the files that changed."""
+        document = temp_dir / 'main.tex'
+        chapter = temp_dir / 'chapter.tex'
+        appendix = temp_dir / 'appendix.tex'
+        chapter.write_text("Chapter\n", encoding='utf-8')
+        appendix.write_text("Appendix\n", encoding='utf-8')
+        body = "\\documentclass{article}\\begin{document}%s\\end{document}\n"
+        document.write_text(body % "\\input{chapter}\\input{appendix}", encoding='utf-8')
+        service.convert_path(document)
+        converter = next(iter(service.converters.values()))
+        preprocessed = []
+        preprocess = TexConverter._preprocess_text
+        monkeypatch.setattr(
+            TexConverter, '_preprocess_text',
+            lambda self, text: preprocessed.append(text) or preprocess(text)
+        )
+        
+        document.write_text(body % "Intro \\input{chapter}", encoding='utf-8')
+        service.convert_path(document)
+        
+        assert len(preprocessed) == 1 and 'Intro' in preprocessed[0]
+        assert set(converter.preprocessed) == {document, chapter}
+    
+    def test_least_recently_used_converter_is_evicted(self, temp_dir, fake_toolchain):
+        """Test that at most ``max_documents`` converters are kept."""
+        service = ConversionService(
+            jobs=1, work_dir=temp_dir / 'payloads', max_documents=2, roots=[temp_dir]
+        )
+        documents = []
+        for name in ('a', 'b', 'c'):
+            document = temp_dir / f'{name}.tex'
+            document.write_text(
+                "\\documentclass{article}\\begin{document}Hi\\end{document}\n", encoding='utf-8'
+            )
+            documents.append(document)
+        try:
+            service.convert_path(documents[0])
+            service.convert_path(documents[1])
+            service.convert_path(documents[0])
+            service.convert_path(documents[2])
+        finally:
+            service.close()
+        
+        assert [input_path.stem for input_path, _ in service.converters] == ['a', 'c']
+        assert service._document_locks == {}
+    
+    def test_missing_input(self, service, temp_dir):
+        """Test that a missing document is reported as such."""
+        with pytest.raises(FileNotFoundError):
+            service.convert_path(temp_dir / 'missing.tex')
+    
+    def test_paths_outside_roots_are_refused(self, temp_dir, sample_tikz_tex, fake_toolchain):
+        """Test that only documents and outputs under the roots are allowed."""
+        root = temp_dir / 'served'
+        root.mkdir()
+        (root / 'escape.tex').symlink_to(sample_tikz_tex)
+        service = ConversionService(jobs=1, work_dir=temp_dir / 'payloads', roots=[root])
+        try:
+            with pytest.raises(PermissionError):
+                service.convert_path(sample_tikz_tex)
+            with pytest.raises(PermissionError):
+                service.convert_path(root / 'escape.tex')
+            with pytest.raises(PermissionError):
+                service.convert_path(root / 'missing.tex', root / '..' / 'out.docx')
+        finally:
+            service.close()
+        
+        assert not (temp_dir / 'out.docx').exists()
+        assert fake_toolchain == []
+
+
+class TestHTTPServer:
+    """Test the HTTP API."""
+    
+    def test_health(self, server):
+        """Test the status endpoint."""
+        status, _, body = request(server, 'GET', '/health')
+        
+        assert status == 200
+        assert json.loads(body)['status'] == 'ok'
+    
+    def test_convert_path_returns_docx(self, server, sample_tikz_tex, fake_toolchain):
+        """Test converting a document on disk."""
+        status, headers, body = request(
+            server, 'POST', '/convert',
+            json.dumps({'path': str(sample_tikz_tex)}).encode(),
+            {'Content-Type': 'application/json'}
+        )
+        
+        assert status == 200
+        assert body == b'PK fake docx'
+        assert headers['X-Latex2docx-Output'].endswith('tikz_test.docx')
+    
+    def test_convert_path_can_return_location(self, server, sample_tikz_tex, fake_toolchain, temp_dir):
+        """Test that clients on the same machine can skip the download."""
+        output = temp_dir / 'out' / 'result.docx'
+        output.parent.mkdir()
+        status, _, body = request(
+            server, 'POST', '/convert',
+            json.dumps({
+                'path': str(sample_tikz_tex), 'output': str(output), 'return_docx': False,
+            }).encode(),
+            {'Content-Type': 'application/json'}
+        )
+        
+        assert status == 200
+        assert json.loads(body) == {'output': str(output)}
+        assert output.exists()
+    
+    def test_convert_payload(self, server, fake_toolchain):
+        """Test converting LaTeX sent in the request body."""
+        status, _, body = request(
+            server, 'POST', '/convert',
+            b"\\documentclass{article}\\begin{document}Hi\\end{document}\n",
+            {'Content-Type': 'application/x-tex'}
+        )
+        
+        assert status == 200
+        assert body == b'PK fake docx'
+    
+    def test_errors(self, server, temp_dir):
+        """Test missing documents, bad requests and unknown paths."""
+        missing = request(
+            server, 'POST', '/convert',
+            json.dumps({'path': str(temp_dir / 'missing.tex')}).encode(),
+            {'Content-Type': 'application/json'}
+        )
+        outside = request(
+            server, 'POST', '/convert',
+            json.dumps({'path': '/etc/hostname'}).encode(),
+            {'Content-Type': 'application/json'}
+        )
+        bad = request(server, 'POST', '/convert', b'{}', {'Content-Type': 'application/json'})
+        unknown = request(server, 'GET', '/nowhere')
+        
+        assert missing[0] == 404
+        assert outside[0] == 403
+        assert bad[0] == 400
+        assert unknown[0] == 404
+    
+    
+    @pytest.mark.parametrize('kind', ['path', 'payload'])
+    def test_includes_outside_roots_are_refused(self, kind, temp_dir, fake_toolchain):
+        """Test that neither request kind can inline a file outside the roots."""
+        secret = temp_dir / 'secret.tex'
+        secret.write_text('TOP SECRET', encoding='utf-8')
+        root = temp_dir / 'served'
+        root.mkdir()
+        source = (
+            "\\documentclass{article}\\begin{document}\n"
+            f"\\input{{{secret}}}\n\\input{{../secret}}\n\\end{{document}}\n"
+        )
+        service = ConversionService(jobs=1, work_dir=temp_dir / 'payloads', roots=[root])
+        server = make_server(service, port=0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            if kind == 'path':
+                document = root / 'main.tex'
+                document.write_text(source, encoding='utf-8')
+                status, _, body = request(
+                    server, 'POST', '/convert',
+                    json.dumps({'path': str(document)}).encode(),
+                    {'Content-Type': 'application/json'}
+                )
+            else:
+                status, _, body = request(
+                    server, 'POST', '/convert', source.encode(), {'Content-Type': 'application/x-tex'}
+                )
+        finally:
+            server.shutdown()
+            server.server_close()
+            service.close()
+        
+        assert status == 403
+        assert 'secret' in json.loads(body)['error']
+        assert [cmd for cmd, _ in fake_toolchain if cmd[0] == 'pandoc'] == []
+    
+    def test_payload_may_include_from_roots(self, service, temp_dir, fake_toolchain):
+        """Test that payloads can still include files below the served roots."""
+        (temp_dir / 'shared.tex').write_text('Shared', encoding='utf-8')
+        source = (
+            "\\documentclass{article}\\begin{document}\n"
+            f"\\input{{{temp_dir / 'shared'}}}\n\\end{{document}}\n"
+        )
+        
+        assert service.convert_source(source) == b'PK fake docx'
+
+
+class TestUnixSocketServer:
+    """Test serving on a Unix domain socket."""
+    
+    def test_health_over_socket(self, service, temp_dir):
+        """Test that the same API answers on a Unix socket."""
+        path = temp_dir / 'latex2docx.sock'
+        server = make_server(service, socket_path=path)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+                client.connect(str(path))
+                client.sendall(b'GET /health HTTP/1.0\r\n\r\n')
+                response = b''
+                while chunk := client.recv(65536):
+                    response += chunk
+        finally:
+            server.shutdown()
+            server.server_close()
+        
+        head, _, body = response.partition(b'\r\n\r\n')
+        assert head.startswith(b'HTTP/1.1 200')
+        assert json.loads(body)['status'] == 'ok'
+
+
+class TestServeCommand:
+    """Test the CLI entry point."""
+    
+    def test_serve_help(self, capsys):
+        """Test that ``serve`` has its own options."""
+        with pytest.raises(SystemExit) as exc_info:
+            main(['serve', '--help'])
+        
+        assert exc_info.value.code == 0
+        out = capsys.readouterr().out
+        assert '--socket' in out and '--root' in out
+        assert '--host' not in out
@@ -0,0 +1,167 @@
+"""
+Unit tests for splitting documents into parts for parallel pandoc runs.
+"""
+
+import re
+
+from latex2docx.split import (
+    label_numbers,
+    resolve_cross_references,
+    select_sections,
+    split_document,
+    strip_front_matter,
+)
+
+
+def make_document(body: str) -> str:
+    return (
+        "\\documentclass{report}\n\\title{Thesis}\n\\author{A. Student}\n"
+        "\\begin{document}\n\\maketitle\n" + body + "\\end{document}\n"
+    )
+
+
+def chapters(count: int, length: int = 200) -> str:
+    return ''.join(
+        f"\\chapter{{Chapter {n}}}\n" + 'x' * length + '\n'
+        for n in range(1, count + 1)
+    )
+
+
+class TestSplitDocument:
+    """Test cutting documents at top-level headings."""
+    
+    def test_splits_at_chapters_into_balanced_parts(self):
+        """Test that equal chapters are grouped into equal parts."""
+        document = split_document(make_document(chapters(4)), 2)
+        
+        assert len(document.bodies) == 2
+        assert document.bodies[0].count('\\chapter') == 2
+        assert document.bodies[1].count('\\chapter') == 2
+    
+    def test_never_makes_more_parts_than_requested(self):
+        """Test that the number of parts is capped by ``pieces``."""
+        document = split_document(make_document(chapters(10)), 3)
+        
+        assert len(document.bodies) == 3
+        assert sum(body.count('\\chapter') for body in document.bodies) == 10
+    
+    def test_pieces_reassemble_the_body(self):
+        """Test that no text is lost or duplicated."""
+        text = make_document("Intro\n" + chapters(5))
+        document = split_document(text, 4)
+        
+        assert document.preamble + ''.join(document.bodies) + document.ending == text
+    
+    def test_falls_back_to_sections(self):
+        """Test that documents without chapters are cut at sections."""
+        body = ''.join(f"\\section{{S{n}}}\n" + 'y' * 100 + '\n' for n in range(4))
+        document = split_document(make_document(body), 2)
+        
+        assert len(document.bodies) == 2
+        assert document.bodies[1].startswith('\\section')
+    
+    def test_subsections_are_never_cut(self):
+        """Test that only top-level headings start a part."""
+        body = "\\chapter{One}\n" + "\\section{A}\nz\n" * 20 + "\\chapter{Two}\nz\n"
+        document = split_document(make_document(body), 8)
+        
+        assert all(part.lstrip().startswith(('\\chapter', '\\maketitle')) for part in document.bodies)
+    
+    def test_commented_headings_are_ignored(self):
+        """Test that a commented-out heading is no cut point."""
+        body = "\\section{One}\nx\n% \\section{Hidden}\nx\n"
+        
+        assert split_document(make_document(body), 2) is None
+    
+    def test_single_part_returns_none(self):
+        """Test that nothing is split when one job is requested."""
+        assert split_document(make_document(chapters(4)), 1) is None
+
+
+class TestFrontMatter:
+    """Test stripping the title block from later parts."""
+    
+    def test_strip_front_matter(self):
+        """Test that title, author and date are removed with their arguments."""
+        preamble = "\\title{A {nested} title}\n\\author{Me}\n\\date{\\today}\n\\usepackage{x}\n"
+        
+        assert strip_front_matter(preamble).split() == ['\\usepackage{x}']
+    
+    def test_only_first_source_keeps_title(self):
+        """Test that the title block appears once across all sources."""
+        sources = split_document(make_document(chapters(3)), 3).sources()
+        
+        assert '\\title{Thesis}' in sources[0]
+        assert all('\\title' not in source for source in sources[1:])
+        assert all(source.rstrip().endswith('\\end{document}') for source in sources)
+
+
+class TestCrossReferences:
+    """Test resolving references between parts."""
+    
+    def test_label_numbers(self):
+        """Test section, figure and table numbering with chapters."""
+        body = (
+            "\\chapter{A}\\label{ch:a}\n"
+            "\\section{B}\n\\label{sec:b}\n"
+            "\\begin{figure}\\caption{F}\\label{fig:f}\\end{figure}\n"
+            "\\chapter{C}\n"
+            "\\begin{table}\\caption{T}\\label{tab:t}\\end{table}\n"
+            "\\begin{figure}\\caption{G}\\label{fig:g}\\end{figure}\n"
+        )
+        
+        assert label_numbers(body) == {
+            'ch:a': '1', 'sec:b': '1.1', 'fig:f': '1.1', 'tab:t': '2.1', 'fig:g': '2.1',
+        }
+    
+    def test_starred_headings_are_not_numbered(self):
+        """Test that unnumbered headings do not advance the counters."""
+        body = "\\section*{Preface}\n\\section{One}\\label{sec:one}\n"
+        
+        assert label_numbers(body) == {'sec:one': '1'}
+    
+    def test_cross_part_refs_become_hyperrefs(self):
+        """Test that only references into other parts are rewritten."""
+        body = (
+            "\\chapter{One}\\label{ch:one}\nSee \\ref{ch:two} and \\ref{ch:one}.\n"
+            + 'x' * 100 + "\n"
+            "\\chapter{Two}\\label{ch:two}\nBack to \\ref{ch:one}.\n"
+            + 'x' * 100 + "\n"
+        )
+        document = resolve_cross_references(split_document(make_document(body), 2))
+        
+        assert '\\hyperref[ch:two]{2}' in document.bodies[0]
+        assert '\\ref{ch:one}' in document.bodies[0]
+        assert '\\hyperref[ch:one]{1}' in document.bodies[1]
+    
+    def test_unknown_labels_are_left_alone(self):
+        """Test that references pandoc can report as missing are kept."""
+        body = "\\section{One}\n\\ref{missing}\n" + 'x' * 50 + "\n\\section{Two}\nx\n"
+        document = resolve_cross_references(split_document(make_document(body), 2))
+        
+        assert '\\ref{missing}' in document.bodies[0]
+
+
+class TestSelectSections:
+    """Test converting a range of top-level sections."""
+    
+    def test_keeps_range_and_preamble(self):
+        """Test that front matter and other chapters are left out."""
+        text = select_sections(make_document(chapters(4)), 2, 3)
+        
+        assert text.startswith("\\documentclass{report}\n\\title{Thesis}")
+        assert "\\maketitle" not in text
+        assert re.findall(r'\\chapter\{[^}]*\}', text) == [
+            "\\chapter{Chapter 2}", "\\chapter{Chapter 3}",
+        ]
+        assert text.endswith("\\end{document}\n")
+    
+    def test_refs_to_left_out_sections_become_numbers(self):
+        """Test that references outside the range keep their numbers."""
+        body = "\\chapter{One}\\label{ch:one}\n\\chapter{Two}\nsee \\ref{ch:one}\n"
+        
+        assert '\\hyperref[ch:one]{1}' in select_sections(make_document(body), 2, 2)
+    
+    def test_missing_section(self):
+        """Test that a range past the end is reported."""
+        assert select_sections(make_document(chapters(2)), 3, 4) is None
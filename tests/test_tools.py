@@ -0,0 +1,134 @@
+"""
+Unit tests for running external tools.
+"""
+
+import asyncio
+import sys
+import pytest
+from latex2docx.tools import Limits, arun_tool, run_tool
+
+
+class TestRunTool:
+    """Test process execution and accounting."""
+    
+    def test_captures_output_and_status(self, temp_dir):
+        """Test stdout, stderr, exit status and working directory."""
+        code = "import os, sys; print(os.getcwd()); sys.stderr.write('warn'); sys.exit(3)"
+        run = run_tool([sys.executable, '-c', code], cwd=temp_dir)
+        assert run.returncode == 3
+        assert run.stdout.strip() == str(temp_dir.resolve())
+        assert run.stderr == 'warn'
+        assert run.tool.startswith('python')
+    
+    def test_feeds_stdin(self):
+        """Test that input bytes reach the child."""
+        code = "import sys; print(sys.stdin.read().upper())"
+        run = run_tool([sys.executable, '-c', code], input=b'latex')
+        assert run.stdout.strip() == 'LATEX'
+    
+    def test_measures_child_cpu(self):
+        """Test that the child's own CPU time is reported."""
+        code = "sum(i * i for i in range(2_000_000))"
+        run = run_tool([sys.executable, '-c', code])
+        assert run.wall > 0
+        if hasattr(__import__('os'), 'wait4'):
+            assert run.cpu is not None and run.cpu > 0
+    
+    def test_missing_tool_raises(self):
+        """Test that a missing executable is an OSError like subprocess.run."""
+        with pytest.raises(OSError):
+            run_tool(['latex2docx-no-such-tool'])
+
+
+class TestLimits:
+    """Test timeouts, rlimits and capped logs."""
+    
+    def test_timeout_kills_process(self):
+        """Test that a hanging tool is killed and reported as timed out."""
+        import time
+        start = time.perf_counter()
+        run = run_tool(
+            [sys.executable, '-c', 'import time; time.sleep(30)'],
+            limits=Limits(timeout=0.3)
+        )
+        assert run.timed_out
+        assert run.returncode != 0
+        assert time.perf_counter() - start < 10
+    
+    def test_fast_tool_is_not_timed_out(self):
+        """Test that a tool finishing in time keeps its result."""
+        run = run_tool([sys.executable, '-c', 'print("ok")'], limits=Limits(timeout=30))
+        assert not run.timed_out
+        assert run.stdout.strip() == 'ok'
+    
+    def test_log_keeps_head_and_tail(self):
+        """Test that long output is capped with a marker in the middle."""
+        code = "print('HEAD' + 'x' * 100000 + 'TAIL')"
+        run = run_tool([sys.executable, '-c', code], limits=Limits(log_bytes=1000))
+        assert run.stdout.startswith('HEAD')
+        assert run.stdout.rstrip().endswith('TAIL')
+        assert 'bytes omitted' in run.stdout
+        assert len(run.stdout) < 1100
+    
+    @pytest.mark.skipif(sys.platform == 'win32', reason='rlimits are POSIX only')
+    def test_memory_limit_applies_to_tool(self):
+        """Test that the address space limit reaches the child."""
+        code = "import resource; print(resource.getrlimit(resource.RLIMIT_AS)[0])"
+        run = run_tool([sys.executable, '-c', code], limits=Limits(memory_mb=4096, cpu_seconds=60))
+        assert run.returncode == 0
+        assert int(run.stdout) == 4096 * 1024 * 1024
+        assert run.args == [sys.executable, '-c', code]
+    
+    def test_scaled(self):
+        """Test that time limits grow with the work of a process."""
+        limits = Limits(timeout=2, memory_mb=100, cpu_seconds=5).scaled(3)
+        assert (limits.timeout, limits.memory_mb, limits.cpu_seconds) == (6, 100, 15)
+
+
+class TestAsyncRunTool:
+    """Test the asyncio variant."""
+    
+    def test_captures_output_and_stdin(self, temp_dir):
+        """Test output, status, working directory and stdin."""
+        code = "import os, sys; print(os.getcwd(), sys.stdin.read()); sys.exit(2)"
+        run = asyncio.run(arun_tool([sys.executable, '-c', code], cwd=temp_dir, input=b'tex'))
+        assert run.returncode == 2
+        assert run.stdout.split() == [str(temp_dir.resolve()), 'tex']
+        assert run.wall > 0
+    
+    def test_runs_concurrently(self):
+        """Test that several tools run at the same time."""
+        code = "import time; time.sleep(0.3)"
+        
+        async def three():
+            return await asyncio.gather(*(
+                arun_tool([sys.executable, '-c', code]) for _ in range(3)
+            ))
+        
+        import time
+        start = time.perf_counter()
+        runs = asyncio.run(three())
+        assert [run.returncode for run in runs] == [0, 0, 0]
+        assert time.perf_counter() - start < 0.9 + 0.5
+    
+    def test_missing_tool_raises(self):
+        """Test that a missing executable is an OSError."""
+        with pytest.raises(OSError):
+            asyncio.run(arun_tool(['latex2docx-no-such-tool']))
+    
+    def test_timeout_kills_process(self):
+        """Test that a hanging tool is killed and reported as timed out."""
+        run = asyncio.run(arun_tool(
+            [sys.executable, '-c', 'import time; time.sleep(30)'],
+            limits=Limits(timeout=0.3)
+        ))
+        assert run.timed_out
+        assert run.returncode != 0
+    
+    def test_log_is_capped(self):
+        """Test that streamed output keeps head and tail only."""
+        code = "print('HEAD' + 'x' * 200000 + 'TAIL')"
+        run = asyncio.run(arun_tool([sys.executable, '-c', code], limits=Limits(log_bytes=1000)))
+        assert run.stdout.startswith('HEAD')
+        assert run.stdout.rstrip().endswith('TAIL')
+        assert 'bytes omitted' in run.stdout
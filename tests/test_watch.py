@@ -0,0 +1,81 @@
+"""
+Unit tests for watch mode.
+"""
+
+import os
+import pytest
+from pathlib import Path
+from latex2docx.converter import TexConverter
+from latex2docx.watch import Watcher
+
+
+def touch(path: Path, text: str) -> None:
+    """Rewrite a file and move its mtime forward."""
+    path.write_text(text, encoding='utf-8')
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def tool_runs(calls, tool):
+    """Number of real (non --version) invocations of ``tool``."""
+    return len([cmd for cmd, _ in calls if cmd[0] == tool and cmd[-1] != '--version'])
+
+
+@pytest.fixture
+def watcher(sample_tikz_tex, fake_toolchain):
+    """Watcher that has already done its initial conversion."""
+    converter = TexConverter(sample_tikz_tex, sample_tikz_tex.parent / 'out.docx')
+    watcher = Watcher(converter, interval=0)
+    watcher.state = watcher.snapshot()
+    assert watcher.rebuild() is True
+    fake_toolchain.clear()
+    return watcher
+
+
+class TestWatchedPaths:
+    """Test discovery of files to watch."""
+    
+    def test_includes_inputs_and_data(self, temp_dir):
+        """Test that included files and data/ are watched."""
+        (temp_dir / 'chapters').mkdir()
+        (temp_dir / 'chapters' / 'intro.tex').write_text(r'\input{chapters/more}')
+        (temp_dir / 'chapters' / 'more.tex').write_text('text')
+        (temp_dir / 'data').mkdir()
+        (temp_dir / 'data' / 'sample.dat').write_text('1 2')
+        main_tex = temp_dir / 'main.tex'
+        main_tex.write_text('\\include{chapters/intro}\n% \\input{ignored}\n')
+        
+        paths = TexConverter(main_tex).watched_paths()
+        
+        assert main_tex in paths
+        assert temp_dir / 'chapters' / 'intro.tex' in paths
+        assert temp_dir / 'chapters' / 'more.tex' in paths
+        assert temp_dir / 'data' / 'sample.dat' in paths
+        assert temp_dir / 'ignored.tex' not in paths
+
+
+class TestWatcherPoll:
+    """Test change detection and incremental rebuilds."""
+    
+    def test_no_change_does_nothing(self, watcher, fake_toolchain):
+        """Test that an unchanged tree triggers no rebuild."""
+        assert watcher.poll() is False
+        assert fake_toolchain == []
+    
+    def test_text_change_reruns_pandoc_only(self, watcher, fake_toolchain, sample_tikz_tex):
+        """Test that a text-only edit does not recompile figures."""
+        touch(sample_tikz_tex, sample_tikz_tex.read_text().replace(
+            r'\begin{document}', '\\begin{document}\nNew paragraph.'))
+        
+        assert watcher.poll() is True
+        assert tool_runs(fake_toolchain, 'pdflatex') == 0
+        assert tool_runs(fake_toolchain, 'pandoc') == 1
+    
+    def test_figure_change_recompiles_that_figure(self, watcher, fake_toolchain, sample_tikz_tex):
+        """Test that editing one figure recompiles only that figure."""
+        touch(sample_tikz_tex, sample_tikz_tex.read_text().replace(
+            'circle (1cm)', 'circle (2cm)'))
+        
+        assert watcher.poll() is True
+        assert tool_runs(fake_toolchain, 'pdflatex') == 1
+        assert tool_runs(fake_toolchain, 'pandoc') == 1